@@ -3,8 +3,10 @@
 import sys
 import argparse
 
-from odfuzz.constants import INFINITY_TIMEOUT, YEAR_IN_SECONDS
+from odfuzz.constants import INFINITY_TIMEOUT, YEAR_IN_SECONDS, DEFAULT_COORDINATOR_PORT, MIGRATION_INTERVAL, \
+    MIGRATION_SIZE
 from odfuzz.exceptions import ArgParserError
+from odfuzz.databases import STORES
 
 FUZZER_DESC = 'Fuzzer for testing applications communicating via the OData protocol'
 
@@ -22,6 +24,44 @@ class ArgParser:
             raise ArgParserError('Cannot parse command line arguments')
         if parsed_arguments.timeout >= YEAR_IN_SECONDS:
             raise ArgParserError('Fuzzer cannot run for over a year')
+        if parsed_arguments.max_rps is not None and parsed_arguments.max_rps <= 0:
+            raise ArgParserError('A maximal number of requests per second has to be positive')
+        if parsed_arguments.batch is not None:
+            if parsed_arguments.batch < 2:
+                raise ArgParserError('A $batch request has to contain at least 2 queries')
+            if not parsed_arguments.asynchronous:
+                raise ArgParserError('Queries can be packed into $batch requests only in the asynchronous mode')
+        if parsed_arguments.workers < 1:
+            raise ArgParserError('A number of worker processes has to be positive')
+        if parsed_arguments.coordinator and parsed_arguments.worker:
+            raise ArgParserError('Fuzzer cannot run as a coordinator and as a worker at the same time')
+        if parsed_arguments.worker and parsed_arguments.workers > 1:
+            raise ArgParserError('A worker of the coordinator cannot fork worker processes')
+        if parsed_arguments.store == 'memory' and parsed_arguments.workers > 1 and not parsed_arguments.coordinator:
+            raise ArgParserError('Worker processes cannot share a population kept in memory')
+        if parsed_arguments.islands < 1:
+            raise ArgParserError('A number of islands has to be positive')
+        if parsed_arguments.islands > 1:
+            if parsed_arguments.workers > 1 or parsed_arguments.coordinator or parsed_arguments.worker:
+                raise ArgParserError('Islands cannot be combined with worker processes or with a coordinator')
+            if parsed_arguments.store == 'memory':
+                raise ArgParserError('Populations of islands cannot be kept in memory')
+        if parsed_arguments.store == 'sqlite' and (parsed_arguments.workers > 1 or parsed_arguments.islands > 1
+                                                   or parsed_arguments.coordinator or parsed_arguments.worker):
+            # a process holds the write lock of the whole file until it commits its transaction
+            raise ArgParserError('A population stored in SQLite can be written only by a single process')
+        if parsed_arguments.migration_interval < 1:
+            raise ArgParserError('A migration interval has to be positive')
+        if parsed_arguments.migration_size < 1:
+            raise ArgParserError('A number of migrating queries has to be positive')
+        if parsed_arguments.resume:
+            if parsed_arguments.store == 'memory':
+                raise ArgParserError('A population kept in memory cannot be resumed')
+            if parsed_arguments.workers > 1 or parsed_arguments.islands > 1 or parsed_arguments.coordinator \
+                    or parsed_arguments.worker:
+                raise ArgParserError('Only a fuzzer running in a single process can be resumed')
+        if parsed_arguments.seed_corpus and parsed_arguments.coordinator:
+            raise ArgParserError('A coordinator does not seed populations, the seed corpus is passed to its workers')
         return parsed_arguments
 
     def _add_arguments(self):
@@ -37,6 +77,39 @@ class ArgParser:
                                   help='Automatically determine which entities are queryable')
         self._parser.add_argument('-c', '--credentials', type=str, metavar='USERNAME:PASSWORD',
                                   help='User name and password used for authentication')
+        self._parser.add_argument('--max-rps', type=float, metavar='REQUESTS',
+                                  help='A maximal number of HTTP requests sent per second')
+        self._parser.add_argument('--batch', type=int, metavar='SIZE',
+                                  help='Pack SIZE queries into a single $batch request (requires -a)')
+        self._parser.add_argument('--workers', type=int, default=1, metavar='N',
+                                  help='A number of worker processes fuzzing disjoint groups of entity sets')
+        self._parser.add_argument('--islands', type=int, default=1, metavar='N',
+                                  help='A number of island processes evolving their own populations of all entity sets')
+        self._parser.add_argument('--migration-interval', type=int, default=MIGRATION_INTERVAL, metavar='GENERATIONS',
+                                  help='A number of generations after which islands exchange their best queries')
+        self._parser.add_argument('--migration-size', type=int, default=MIGRATION_SIZE, metavar='K',
+                                  help='A number of the best queries sent by an island to the next one')
+        self._parser.add_argument('--coordinator', action='store_true', default=False,
+                                  help='Hand out entity sets to N workers (--workers) instead of fuzzing')
+        self._parser.add_argument('--port', type=int, default=DEFAULT_COORDINATOR_PORT,
+                                  help='A port on which the coordinator listens')
+        self._parser.add_argument('--worker', type=str, metavar='URL',
+                                  help='Fuzz entity sets leased from the coordinator running at URL')
+        self._parser.add_argument('--store', type=str, choices=STORES.keys(), default='mongodb',
+                                  help='A storage of the population of queries')
+        self._parser.add_argument('--db-explain', action='store_true', default=False,
+                                  help='Log query plans of the database operations run in every iteration')
+        self._parser.add_argument('--resume', type=str, metavar='COLLECTION',
+                                  help='Resume the fuzzing of the population stored in COLLECTION from its checkpoint')
+        self._parser.add_argument('--seed-corpus', type=str, metavar='SOURCE',
+                                  help='Seed the population with queries of a previous run instead of random ones; '
+                                       'SOURCE is a collection or a list_urls file')
+        self._parser.add_argument('--minimize', action='store_true', default=False,
+                                  help='Keep only queries with distinct responses and options in the seeded population '
+                                       'and in the seed corpus')
+        self._parser.add_argument('--minimize-failures', action='store_true', default=False,
+                                  help='Reduce a query causing a new cluster of server errors to the shortest query '
+                                       'causing the same error code')
 
     def _handle_help_option(self, arguments):
         if '-h' in arguments or '--help' in arguments:
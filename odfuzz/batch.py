@@ -0,0 +1,135 @@
+"""This module contains classes for packing GET queries into a single OData $batch request and for splitting
+the multipart response back into responses of the particular queries."""
+
+import re
+import uuid
+
+from datetime import timedelta
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from odfuzz.exceptions import BatchError
+
+CRLF = b'\r\n'
+HEADERS_SEPARATOR = re.compile(b'\r?\n\r?\n')
+STATUS_LINE = re.compile(r'HTTP/\d\.\d\s+(\d{3})\s*(.*)')
+BOUNDARY = re.compile(r'boundary=(?:"([^"]+)"|([^;\s]+))', re.IGNORECASE)
+
+
+class BatchRequestBuilder:
+    """A builder of a multipart/mixed body of the $batch request that contains only retrieve operations."""
+
+    def __init__(self, queries):
+        self._queries = queries
+        self._boundary = 'batch_{}'.format(uuid.uuid4())
+
+    @property
+    def content_type(self):
+        return 'multipart/mixed; boundary={}'.format(self._boundary)
+
+    def build(self):
+        delimiter = '--{}'.format(self._boundary)
+        lines = []
+        for query in self._queries:
+            lines.extend([
+                delimiter,
+                'Content-Type: application/http',
+                'Content-Transfer-Encoding: binary',
+                '',
+                # a standalone request is encoded by requests; spaces of $filter and $orderby would split the line
+                'GET {} HTTP/1.1'.format(requests.utils.requote_uri(query)),
+                '',
+                ''
+            ])
+        lines.append(delimiter + '--')
+        lines.append('')
+        return '\r\n'.join(lines).encode('utf-8')
+
+
+class BatchResponseParser:
+    """A parser of the multipart response to the $batch request.
+
+    Every part is converted to an instance of requests.Response, so it can be analyzed the same way as a response
+    to a standalone request. Response time of a part cannot be measured; it is estimated as an equal share of the
+    whole $batch response time and the response is flagged by the attribute `elapsed_estimated`.
+    """
+
+    def __init__(self, batch_response, urls):
+        self._batch_response = batch_response
+        self._urls = urls
+
+    def parse(self):
+        boundary = self._get_boundary()
+        parts = split_multipart(self._batch_response.content, boundary)
+        if len(parts) != len(self._urls):
+            raise BatchError('The $batch response contains {} parts instead of {}'.format(len(parts), len(self._urls)))
+
+        elapsed = self._batch_response.elapsed / len(parts) if parts else timedelta(0)
+        return [self._build_response(part, url, elapsed) for part, url in zip(parts, self._urls)]
+
+    def _get_boundary(self):
+        content_type = self._batch_response.headers.get('content-type', '')
+        match = BOUNDARY.search(content_type)
+        if not content_type.lower().startswith('multipart/mixed') or not match:
+            raise BatchError('The $batch request failed with HTTP {} and a response of the type \'{}\''
+                             .format(self._batch_response.status_code, content_type))
+        return match.group(1) or match.group(2)
+
+    def _build_response(self, part, url, elapsed):
+        _, http_message = split_headers(part)
+        status_and_headers, body = split_headers(http_message)
+        status_line, _, raw_headers = status_and_headers.partition(b'\n')
+
+        status_match = STATUS_LINE.match(status_line.decode('iso-8859-1').strip())
+        if not status_match:
+            raise BatchError('The $batch response part does not start with a status line: {}'.format(status_line))
+
+        headers = parse_headers(raw_headers)
+        if 'content-length' not in headers:
+            headers['content-length'] = str(len(body))
+
+        response = requests.Response()
+        response.status_code = int(status_match.group(1))
+        response.reason = status_match.group(2)
+        response.headers = headers
+        response.url = url
+        response.elapsed = elapsed
+        response.encoding = requests.utils.get_encoding_from_headers(headers)
+        response._content = body  # pylint: disable=protected-access
+        response.request = requests.PreparedRequest()
+        response.request.method = 'GET'
+        response.request.url = url
+        setattr(response, 'elapsed_estimated', True)
+        return response
+
+
+def split_multipart(content, boundary):
+    """Return bodies of all parts of the multipart content, without the delimiters."""
+    delimiter = b'--' + boundary.encode('iso-8859-1')
+    parts = []
+    for chunk in content.split(delimiter)[1:]:
+        if chunk.startswith(b'--'):
+            break
+        # the line break right after the delimiter and the one right before the next delimiter belong to them
+        chunk = chunk[2:] if chunk.startswith(CRLF) else chunk.lstrip(b'\n')
+        chunk = chunk[:-2] if chunk.endswith(CRLF) else chunk.rstrip(b'\n')
+        parts.append(chunk)
+    return parts
+
+
+def split_headers(message):
+    """Split the message to the header section and the rest of the message."""
+    split_message = HEADERS_SEPARATOR.split(message, 1)
+    if len(split_message) == 1:
+        return split_message[0], b''
+    return split_message[0], split_message[1]
+
+
+def parse_headers(raw_headers):
+    headers = CaseInsensitiveDict()
+    for line in raw_headers.decode('iso-8859-1').splitlines():
+        name, separator, value = line.partition(':')
+        if separator:
+            headers[name.strip()] = value.strip()
+    return headers
@@ -0,0 +1,116 @@
+"""This module contains checkpoints which allow an interrupted fuzzing campaign to be resumed with its population."""
+
+import os
+import json
+
+from odfuzz.exceptions import CheckpointError
+from odfuzz.constants import CHECKPOINT_FILE_NAME
+
+
+class Checkpoint:
+    """A state of the fuzzer which is not stored in the database together with the population.
+
+    The seeding progress maps query groups of entity sets to numbers of iterations of the seed phase which were
+    completed. The failures are records of clusters of server errors (see FailureTriage) and the mutation operators
+    are records of their uses and successes (see MutationOperators).
+    """
+
+    def __init__(self, collection_name, random_state, counters, selector_state, seeded, seed_completed,
+                 coverage_state, failures, mutation_operators):
+        self._collection_name = collection_name
+        self._random_state = random_state
+        self._counters = counters
+        self._selector_state = selector_state
+        self._seeded = seeded
+        self._seed_completed = seed_completed
+        self._coverage_state = coverage_state
+        self._failures = failures
+        self._mutation_operators = mutation_operators
+
+    @property
+    def collection_name(self):
+        return self._collection_name
+
+    @property
+    def random_state(self):
+        return self._random_state
+
+    @property
+    def counters(self):
+        return self._counters
+
+    @property
+    def selector_state(self):
+        return self._selector_state
+
+    @property
+    def seeded(self):
+        return self._seeded
+
+    @property
+    def seed_completed(self):
+        return self._seed_completed
+
+    @property
+    def coverage_state(self):
+        return self._coverage_state
+
+    @property
+    def failures(self):
+        return self._failures
+
+    @property
+    def mutation_operators(self):
+        return self._mutation_operators
+
+    def to_dict(self):
+        version, internal_state, gauss_next = self._random_state
+        return {
+            'collection_name': self._collection_name,
+            'random_state': [version, list(internal_state), gauss_next],
+            'counters': self._counters,
+            'selector_state': self._selector_state,
+            'seeded': self._seeded,
+            'seed_completed': self._seed_completed,
+            'coverage_state': self._coverage_state,
+            'failures': self._failures,
+            'mutation_operators': self._mutation_operators
+        }
+
+    @classmethod
+    def from_dict(cls, dictionary):
+        version, internal_state, gauss_next = dictionary['random_state']
+        return cls(dictionary['collection_name'], (version, tuple(internal_state), gauss_next),
+                   dictionary['counters'], dictionary['selector_state'], dictionary['seeded'],
+                   dictionary['seed_completed'], dictionary['coverage_state'], dictionary['failures'],
+                   dictionary['mutation_operators'])
+
+
+class CheckpointFile:
+    """A JSON file holding the latest checkpoint of the population stored in the collection."""
+
+    def __init__(self, directory, collection_name):
+        self._collection_name = collection_name
+        self._path = os.path.join(directory, CHECKPOINT_FILE_NAME.format(collection_name))
+
+    @property
+    def collection_name(self):
+        return self._collection_name
+
+    @property
+    def path(self):
+        return self._path
+
+    def save(self, checkpoint):
+        # the previous checkpoint is replaced at once, so that an interruption cannot leave a truncated file behind
+        temporary_path = self._path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump(checkpoint.to_dict(), checkpoint_file)
+        os.replace(temporary_path, self._path)
+
+    def load(self):
+        try:
+            with open(self._path, encoding='utf-8') as checkpoint_file:
+                return Checkpoint.from_dict(json.load(checkpoint_file))
+        except (EnvironmentError, ValueError, KeyError, TypeError) as error:
+            raise CheckpointError('Cannot load the checkpoint \'{}\': {}'.format(self._path, error))
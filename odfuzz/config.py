@@ -11,6 +11,10 @@ from odfuzz.constants import (
     DEFAULT_IGNORE_METADATA_RESTRICTIONS,
     DEFAULT_CLI_RUNNER_SEED,
     DEFAULT_SAP_VENDOR_ENABLED,
+    DEFAULT_RETRY_MAX_ATTEMPTS,
+    DEFAULT_ADAPTIVE_CONCURRENCY,
+    DEFAULT_ASYNC_REQUESTS_MAX,
+    DEFAULT_RESPONSE_BYTES_LIMIT,
     ENV_ASYNC_REQUESTS_NUM,
     ENV_DATA_FORMAT,
     ENV_USE_ENCODER,
@@ -20,6 +24,10 @@ from odfuzz.constants import (
     ENV_IGNORE_METADATA_RESTRICTIONS,
     ENV_CLI_RUNNER_SEED,
     ENV_SAP_VENDOR_ENABLED,
+    ENV_RETRY_MAX_ATTEMPTS,
+    ENV_ADAPTIVE_CONCURRENCY,
+    ENV_ASYNC_REQUESTS_MAX,
+    ENV_RESPONSE_BYTES_LIMIT,
 )
 
 
@@ -85,7 +93,13 @@ class DispatcherConfig:
         self._data_format = os.getenv(ENV_DATA_FORMAT, DEFAULT_DATA_FORMAT)
         async_requests_num =   os.getenv(ENV_ASYNC_REQUESTS_NUM, DEFAULT_ASYNC_REQUESTS_NUM)
         self._async_requests_num = int(async_requests_num)
-
+        retry_max_attempts = os.getenv(ENV_RETRY_MAX_ATTEMPTS, DEFAULT_RETRY_MAX_ATTEMPTS)
+        self._retry_max_attempts = int(retry_max_attempts)
+        self._adaptive_concurrency = os.getenv(ENV_ADAPTIVE_CONCURRENCY, DEFAULT_ADAPTIVE_CONCURRENCY) == 'True'
+        async_requests_max = os.getenv(ENV_ASYNC_REQUESTS_MAX, DEFAULT_ASYNC_REQUESTS_MAX)
+        self._async_requests_max = int(async_requests_max)
+        response_bytes_limit = os.getenv(ENV_RESPONSE_BYTES_LIMIT, DEFAULT_RESPONSE_BYTES_LIMIT)
+        self._response_bytes_limit = int(response_bytes_limit)
 
     @property
     def has_certificate(self):
@@ -100,6 +114,22 @@ class DispatcherConfig:
     def async_requests_num(self):
         return self._async_requests_num
 
+    @property
+    def retry_max_attempts(self):
+        return self._retry_max_attempts
+
+    @property
+    def adaptive_concurrency(self):
+        return self._adaptive_concurrency
+
+    @property
+    def async_requests_max(self):
+        return self._async_requests_max
+
+    @property
+    def response_bytes_limit(self):
+        return self._response_bytes_limit
+
 
 class Config:
     fuzzer = None
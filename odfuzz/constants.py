@@ -15,6 +15,11 @@ FILTER_LOGS_NAME = 'stats_filter'
 DATA_RESPONSES_NAME = 'data_responses'
 URLS_LOGS_NAME = 'list_urls'
 RUNTIME_FILE_NAME = 'runtime_info.txt'
+# clusters of HTTP 500 responses (triage.py)
+FAILURES_FILE_NAME = 'failures.csv'
+# a checkpoint of the fuzzer is saved to the statistics directory every CHECKPOINT_INTERVAL seconds (fuzzer.py)
+CHECKPOINT_FILE_NAME = 'checkpoint_{}.json'
+CHECKPOINT_INTERVAL = 300
 
 # this set of constants must be equal to the corresponding
 # logger keys defined in the CONFIG_PATH
@@ -27,6 +32,14 @@ RESPONSE_LOGGER = 'data'
 # used in databases.py as a name of the database in MongoDB (https://docs.mongodb.com/manual/core/databases-and-collections/);
 # collections are created for each OData service separately
 MONGODB_NAME = 'odfuzz'
+# entries are unique by a hash of the URL, the field is indexed
+URL_HASH = 'url_hash'
+# inserts and deletes are written to the database at once when there are WRITE_BUFFER_SIZE of them or when the oldest
+# one has been waiting for WRITE_BUFFER_INTERVAL seconds
+WRITE_BUFFER_SIZE = 100
+WRITE_BUFFER_INTERVAL = 5
+# seconds for which an SQLite connection waits for a lock held by another process
+SQLITE_TIMEOUT = 30
 
 # used for mounting adapters in the module `requests` (this may be located right in Dispatcher)
 ACCESS_PROTOCOL = 'https://'
@@ -43,6 +56,11 @@ ENV_USE_ENCODER = 'ODFUZZ_USE_ENCODER'
 ENV_IGNORE_METADATA_RESTRICTIONS = 'ODFUZZ_IGNORE_METADATA_RESTRICTIONS'
 ENV_CLI_RUNNER_SEED = 'ODFUZZ_CLI_RUNNER_SEED' #ability to set the "random.seed()" in CLI runner for example for debugging or experiments.
 ENV_SAP_VENDOR_ENABLED = 'ODFUZZ_SAP_VENDOR_ENABLED'
+ENV_RETRY_MAX_ATTEMPTS = 'ODFUZZ_RETRY_MAX_ATTEMPTS'
+ENV_ADAPTIVE_CONCURRENCY = 'ODFUZZ_ADAPTIVE_CONCURRENCY'
+ENV_ASYNC_REQUESTS_MAX = 'ODFUZZ_ASYNC_REQUESTS_MAX'
+ENV_RESPONSE_BYTES_LIMIT = 'ODFUZZ_RESPONSE_BYTES_LIMIT'
+ENV_SQLITE_PATH = 'ODFUZZ_SQLITE_PATH'
 
 # default configuration values; these values are retrieved by default if no environment variable overwrites them
 DEFAULT_SAP_CLIENT = '500'
@@ -53,6 +71,11 @@ DEFAULT_IGNORE_METADATA_RESTRICTIONS = 'False'
 DEFAULT_USE_ENCODER = 'True'
 DEFAULT_CLI_RUNNER_SEED = datetime.now() #the default value for random.seed() in CLI runner, as was in fuzzer.py hardcoded
 DEFAULT_SAP_VENDOR_ENABLED = 'False'
+DEFAULT_RETRY_MAX_ATTEMPTS = 5
+DEFAULT_ADAPTIVE_CONCURRENCY = 'False'
+DEFAULT_ASYNC_REQUESTS_MAX = 50
+DEFAULT_RESPONSE_BYTES_LIMIT = 1048576
+DEFAULT_SQLITE_PATH = 'odfuzz.sqlite'
 
 
 # names of restrictions which are used for searching for keywords; these constants are also used in the module fuzzer.py
@@ -60,6 +83,7 @@ DEFAULT_SAP_VENDOR_ENABLED = 'False'
 # can change its names based on different versions of OData protocol (the only known difference is in search -> $search)
 EXCLUDE = 'Exclude'
 INCLUDE = 'Include'
+RATE_LIMIT = 'RateLimit'
 GLOBAL_ENTITY_SET = '$ENTITY_SET$'
 GLOBAL_ENTITY = '$ENTITY$'
 GLOBAL_ENTITY_ASSOC = '$ENTITY_ASSOC$'
@@ -133,6 +157,26 @@ OPTION_DEL_PROB = 0.1
 MAX_MULTI_VALUES = 3
 MAX_EXPAND_VALUES = 3
 FILTER_SAMPLE_SIZE = 30
+# scores of recently selected parents are cached by Analyzer, which compares offspring with their predecessors
+PREDECESSOR_CACHE_SIZE = 256
+# a minimized corpus keeps this number of queries with the same outcome and options (corpus.py); two, so that parents
+# of a minimized entity set can still be crossed
+SIGNATURE_ENTRIES_NUM = 2
+# random combinations of query options drawn when generating a query; the least sent one is used (fuzzer.py)
+OPTIONS_CANDIDATES_NUM = 3
+# a query causing a new cluster of server errors is reduced in at most this number of rounds (minimizer.py)
+MINIMIZATION_ROUNDS = 20
+# at most MINIMIZERS_NUM queries are minimized at the same time; minimizations still running when the fuzzing stops
+# get MINIMIZATION_JOIN_TIMEOUT seconds to finish before the failures are written (fuzzer.py)
+MINIMIZERS_NUM = 2
+MINIMIZATION_JOIN_TIMEOUT = 30
+# outcomes of previous queries of a query group are multiplied by this factor whenever the group is selected, so that
+# query groups which stop finding new responses lose their preference (scheduler.py)
+SCHEDULER_DISCOUNT = 0.95
+# islands (islands.py) exchange their MIGRATION_SIZE best queries after every MIGRATION_INTERVAL generations
+MIGRATION_INTERVAL = 50
+MIGRATION_SIZE = 5
+MIGRATION_READ_SIZE = 65536
 MAX_BEST_QUERIES = 30
 INLINECOUNT_ALL_PAGES_PROB = 0.5
 
@@ -144,8 +188,38 @@ CSV_RESPONSES_HEADER = 'Time;Data;EntitySet;URL;Brief'
 INFINITY_TIMEOUT = -1
 YEAR_IN_SECONDS = 31622400
 REQUEST_TIMEOUT = 600
+# requests in flight when the fuzzer is interrupted get PIPELINE_STOP_TIMEOUT seconds to complete, the others are
+# dropped (fuzzer.py)
+PIPELINE_STOP_TIMEOUT = 5
+# failed requests are re-sent after an exponentially growing delay (RETRY_BASE_DELAY * 2^attempt) with a random jitter;
+# RETRY_TIMEOUT is the upper bound of the delay
+RETRY_BASE_DELAY = 1
 RETRY_TIMEOUT = 100
 
+# used by ConcurrencyController (fuzzer.py); the number of concurrent requests is increased by one after every window
+# of responses that are not slower than CONCURRENCY_LATENCY_TOLERANCE times the usual 95th percentile of response time,
+# and it is multiplied by CONCURRENCY_DECREASE_FACTOR on timeouts, overload status codes or rising response times
+MIN_ASYNC_REQUESTS_NUM = 1
+CONCURRENCY_WINDOW_SIZE = 20
+CONCURRENCY_LATENCY_TOLERANCE = 1.5
+CONCURRENCY_DECREASE_FACTOR = 0.5
+CONCURRENCY_BASELINE_WEIGHT = 0.2
+OVERLOAD_STATUS_CODES = (429, 503)
+
+# bodies of responses to generated queries are read in chunks of RESPONSE_CHUNK_SIZE bytes (fuzzer.py); only the first
+# ODFUZZ_RESPONSE_BYTES_LIMIT bytes are kept, which is enough for extracting error codes and counting entries
+RESPONSE_CHUNK_SIZE = 65536
+
+# used by the coordinator and the workers (distributed.py); a worker sends a heartbeat every HEARTBEAT_INTERVAL seconds
+# and loses its entity sets if the coordinator does not hear from it for LEASE_TIMEOUT seconds
+DEFAULT_COORDINATOR_PORT = 7900
+HEARTBEAT_INTERVAL = 10
+LEASE_TIMEOUT = 60
+COORDINATOR_TIMEOUT = 30
+
+# the $batch mode (fuzzer.py) is turned off after BATCH_ERRORS_LIMIT consecutive $batch requests that could not be split
+BATCH_ERRORS_LIMIT = 3
+
 # range for basic charsets for generator (generators.py) and mutators (mutators.py)
 HEX_BINARY = 'ABCDEFabcdef0123456789'
 
@@ -0,0 +1,424 @@
+"""This module contains a seed corpus, i.e. queries of a previous run which seed a population instead of random ones.
+
+The corpus is loaded from a collection of the previous run or from its list_urls file. URLs of the file are parsed
+back into the option structures of the population, so the imported queries can be crossed and mutated the same way
+as generated ones.
+"""
+
+import os
+import re
+import logging
+
+from collections import Counter
+
+from odfuzz.entities import FilterOption, QueryGroupMultiple, QueryGroupSingle, QueryGroupAssociation, \
+    QueryGroupAssociationSet
+from odfuzz.exceptions import CorpusError
+from odfuzz.constants import FUZZER_LOGGER, URL_HASH, FILTER, ORDERBY, TOP, SKIP, EXPAND, SEARCH, INLINECOUNT, \
+    LOGICAL_OPERATORS, EXPRESSION_OPERATORS, SIGNATURE_ENTRIES_NUM
+
+OPTION_NAMES = (FILTER, ORDERBY, TOP, SKIP, EXPAND, SEARCH, INLINECOUNT)
+# added to every URL by Query.build_string()
+APPENDIX_NAMES = ('sap-client', '$format')
+# a literal may contain the character '&', options are split only in front of a known option name
+OPTIONS_SEPARATOR = re.compile('&(?=(?:{})=)'.format('|'.join(re.escape(name)
+                                                              for name in OPTION_NAMES + APPENDIX_NAMES)))
+
+IDENTIFIER = re.compile(r'[A-Za-z_][\w./]*')
+LITERAL_PREFIX = re.compile(r"[A-Za-z]*'")
+BARE_LITERAL = re.compile(r'[^\s)]+')
+WORD = re.compile(r'[a-z]+')
+SPACES = re.compile(r'\s*')
+
+FUNCTION_RETURN_TYPES = {
+    'substringof': 'Edm.Boolean', 'endswith': 'Edm.Boolean', 'startswith': 'Edm.Boolean',
+    'length': 'Edm.Int32', 'indexof': 'Edm.Int32', 'day': 'Edm.Int32', 'hour': 'Edm.Int32', 'minute': 'Edm.Int32',
+    'month': 'Edm.Int32', 'second': 'Edm.Int32', 'year': 'Edm.Int32', 'round': 'Edm.Int32', 'floor': 'Edm.Int32',
+    'ceiling': 'Edm.Int32', 'replace': 'Edm.String', 'substring': 'Edm.String', 'tolower': 'Edm.String',
+    'toupper': 'Edm.String', 'trim': 'Edm.String', 'concat': 'Edm.String'
+}
+
+
+class SeedCorpus:
+    """Entries of a population imported from a previous run.
+
+    An entry holds at least the string of the query, its accessible entity and its options in the same format as
+    Query.dictionary; entries of a collection hold the name of their entity set as well.
+    """
+
+    def __init__(self, entries):
+        self._entries = entries
+        self._logger = logging.getLogger(FUZZER_LOGGER)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def from_database(cls, database):
+        return cls(list(database.find_all_entries()))
+
+    @classmethod
+    def from_urls_file(cls, path):
+        """Parse the lines 'URL_HASH:QUERY_STRING' written by URLsLogger; lines which cannot be parsed are skipped."""
+        logger = logging.getLogger(FUZZER_LOGGER)
+        entries = []
+        url_hashes = set()
+        try:
+            with open(path, encoding='utf-8') as urls_file:
+                for line in urls_file:
+                    url_hash, _, query_string = line.rstrip('\n').partition(':')
+                    if not query_string or url_hash in url_hashes:
+                        continue
+                    try:
+                        entry = parse_query_string(query_string)
+                    except CorpusError as error:
+                        logger.warning('Skipping the URL \'{}\' of the seed corpus: {}'.format(query_string, error))
+                        continue
+                    entry[URL_HASH] = url_hash
+                    url_hashes.add(url_hash)
+                    entries.append(entry)
+        except EnvironmentError as error:
+            raise CorpusError('Cannot read the seed corpus \'{}\': {}'.format(path, error))
+        return cls(entries)
+
+    def assign(self, entities):
+        """Return pairs of queryable entities and lists of the entries which they rebuild, in the order of the entities.
+
+        Every entry is assigned to the first entity which accepts it. Entries which no entity accepts, e.g. because
+        the service has changed since the previous run, are skipped.
+        """
+        assigned = [(queryable, []) for queryable in entities.all()]
+        skipped_num = 0
+        for entry in self._entries:
+            for queryable, entries in assigned:
+                if accepts_entry(queryable, entry):
+                    entries.append(entry)
+                    break
+            else:
+                skipped_num += 1
+        if skipped_num:
+            self._logger.warning('{} queries of the seed corpus do not match any queryable entity'.format(skipped_num))
+        return assigned
+
+    def minimize(self):
+        """Remove entries whose signatures are kept by other entries; return the number of removed entries.
+
+        Entries parsed from a list_urls file carry no responses, so all of them are kept; the population seeded
+        by them can be minimized once the responses are known.
+        """
+        redundant_ids = {id(entry) for entry in redundant_entries(entry for entry in self._entries if 'http' in entry)}
+        self._entries = [entry for entry in self._entries if id(entry) not in redundant_ids]
+        return len(redundant_ids)
+
+
+def entry_signature(entry):
+    """Return the outcome of the entry and the shape of its query: (status code, error code, entity set, options)."""
+    return (entry.get('http'), str(entry.get('error_code') or ''), entry.get('entity_set'),
+            tuple(sorted(entry.get('order') or ())))
+
+
+def redundant_entries(entries, signature_entries_num=SIGNATURE_ENTRIES_NUM):
+    """Return the entries which can be removed without losing any signature of the entries (cf. afl-cmin).
+
+    Up to signature_entries_num entries of every signature are kept; entries with higher scores and shorter query
+    strings are preferred.
+    """
+    kept_nums = Counter()
+    redundant = []
+    for entry in sorted(entries, key=lambda entry: (-entry.get('score', 0), len(entry['string']))):
+        signature = entry_signature(entry)
+        if kept_nums[signature] < signature_entries_num:
+            kept_nums[signature] += 1
+        else:
+            redundant.append(entry)
+    return redundant
+
+
+def load_seed_corpus(source, database_classes):
+    """Load the corpus from the list_urls file if the source is a path of a file, from the collection otherwise."""
+    if os.path.isfile(source):
+        seed_corpus = SeedCorpus.from_urls_file(source)
+    else:
+        database_handler, database_client = database_classes
+        seed_corpus = SeedCorpus.from_database(database_handler(database_client(source)))
+    if not seed_corpus:
+        raise CorpusError('The seed corpus \'{}\' does not contain any queries'.format(source))
+    return seed_corpus
+
+
+def accepts_entry(queryable, entry):
+    """Tell whether the queryable entity rebuilds the entry with the same accessible entity and options."""
+    if entry.get('order') is None or not isinstance(queryable, accessible_query_groups(entry)):
+        return False
+    accessible_entity = queryable.get_existing_accessible_entity(entry['accessible_keys'], entry['accessible_set'])
+    if accessible_entity.principal_entity_name != entry['accessible_set']:
+        return False
+    if entry.get('entity_set') is not None:
+        if entry['entity_set'] != queryable.entity_set.name:
+            return False
+    elif accessible_entity.path != entry['string'].partition('?')[0]:
+        return False
+
+    option_names = {option.name for option in queryable.query_options()}
+    if not all(option_name[1:] in option_names for option_name in entry['order']):
+        return False
+    if entry.get('_' + FILTER):
+        return accepts_filter(queryable, entry['_' + FILTER])
+    return True
+
+
+def accessible_query_groups(entry):
+    if entry['accessible_set']:
+        return QueryGroupAssociation, QueryGroupAssociationSet
+    if entry['accessible_keys']:
+        return (QueryGroupSingle,)
+    return (QueryGroupMultiple,)
+
+
+def accepts_filter(queryable, filter_data):
+    """Check that the filtered properties still exist; parsed parts are marked as replaceable like generated ones."""
+    proprties = {proprty.name: proprty
+                 for proprty in queryable.query_option(FILTER).entity_set.entity_type.proprties()}
+    for part in filter_data['parts']:
+        if 'func' in part:
+            if not all(proprty_name in proprties for proprty_name in part['proprties']):
+                return False
+        else:
+            proprty = proprties.get(part['name'])
+            if proprty is None:
+                return False
+            part.setdefault('replaceable', not getattr(proprty, 'required_in_filter', False))
+    return True
+
+
+def parse_query_string(query_string):
+    """Parse the query string built by Query.build_string() into an entry of the population."""
+    path, _, options_string = query_string.partition('?')
+    accessible_set, accessible_keys = parse_resource_path(path)
+    entry = {'string': query_string, 'accessible_set': accessible_set, 'accessible_keys': accessible_keys,
+             'order': []}
+    if not options_string:
+        return entry
+
+    for option_string in OPTIONS_SEPARATOR.split(options_string):
+        option_name, separator, value = option_string.partition('=')
+        if option_name in APPENDIX_NAMES:
+            continue
+        if not separator or option_name not in OPTION_NAMES or '_' + option_name in entry:
+            raise CorpusError('Unexpected query option \'{}\''.format(option_string))
+        entry['order'].append('_' + option_name)
+        entry['_' + option_name] = parse_option(option_name, value)
+    return entry
+
+
+def parse_option(option_name, value):
+    if option_name == FILTER:
+        return FilterParser(value).parse()
+    if option_name == ORDERBY:
+        orderby = []
+        for proprty_order in value.split(','):
+            proprty_name, _, order = proprty_order.partition(' ')
+            orderby.append([proprty_name, order])
+        return orderby
+    if option_name == EXPAND:
+        return value.split(',')
+    return value
+
+
+def parse_resource_path(path):
+    """Return the name of the principal entity set and key values of the path built by AccessibleEntity.
+
+    The principal entity set is set only for entities accessed through a navigation property, e.g. for the path
+    Customers(CustomerID='ALFKI')/Orders, as AccessibleEntity.principal_entity_name does.
+    """
+    match = IDENTIFIER.match(path)
+    if not match:
+        raise CorpusError('Unexpected resource path \'{}\''.format(path))
+    entity_set_name = match.group()
+    position = match.end()
+    key_pairs = {}
+    if path.startswith('(', position):
+        keys_end = find_closing_parenthesis(path, position)
+        key_pairs = parse_key_values(path[position + 1:keys_end])
+        position = keys_end + 1
+
+    rest = path[position:]
+    if not rest:
+        return None, key_pairs
+    if rest.startswith('/') and IDENTIFIER.fullmatch(rest[1:]) and key_pairs:
+        return entity_set_name, key_pairs
+    raise CorpusError('Unexpected resource path \'{}\''.format(path))
+
+
+def parse_key_values(string):
+    key_pairs = {}
+    for key_value in split_arguments(string):
+        proprty_name, separator, value = key_value.partition('=')
+        if not separator or not IDENTIFIER.fullmatch(proprty_name):
+            raise CorpusError('Unexpected key value \'{}\''.format(key_value))
+        key_pairs[proprty_name] = value
+    return key_pairs
+
+
+def split_arguments(string):
+    """Split the string by commas which are not part of literals."""
+    arguments = []
+    start = position = 0
+    while position < len(string):
+        if string[position] == '\'':
+            position = find_literal_end(string, position)
+            continue
+        if string[position] == ',':
+            arguments.append(string[start:position].strip())
+            start = position + 1
+        position += 1
+    arguments.append(string[start:].strip())
+    return arguments
+
+
+def find_literal_end(string, quote_position):
+    """Return the position right after the literal starting at the quote; quotes in literals are doubled."""
+    position = quote_position + 1
+    while True:
+        position = string.find('\'', position)
+        if position == -1:
+            raise CorpusError('Unterminated literal in \'{}\''.format(string))
+        if not string.startswith('\'', position + 1):
+            return position + 1
+        position += 2
+
+
+def find_closing_parenthesis(string, opening_position):
+    depth = 0
+    position = opening_position
+    while position < len(string):
+        character = string[position]
+        if character == '\'':
+            position = find_literal_end(string, position)
+            continue
+        if character == '(':
+            depth += 1
+        elif character == ')':
+            depth -= 1
+            if depth == 0:
+                return position
+        position += 1
+    raise CorpusError('Unbalanced parentheses in \'{}\''.format(string))
+
+
+class FilterParser:
+    """A parser of the $filter option built by FilterOptionBuilder.
+
+    Parts and parenthesized groups are joined by logical operators. The parser creates the same cross-references
+    of logicals, parts and groups as FilterQuery does when it generates the option.
+    """
+
+    def __init__(self, filter_string):
+        self._string = filter_string
+        self._position = 0
+        self._option = FilterOption([], [], [])
+
+    def parse(self):
+        self._parse_sequence(None)
+        self._skip_spaces()
+        if self._position != len(self._string):
+            raise CorpusError('Unexpected \'{}\' in the filter \'{}\''
+                              .format(self._string[self._position:], self._string))
+        self._option.reverse_logicals()
+        self._option.delete_redundancies()
+        return self._option.data
+
+    def _parse_sequence(self, group):
+        """Parse elements joined by logical operators; return the last element."""
+        element = self._parse_element()
+        while True:
+            self._skip_spaces()
+            match = WORD.match(self._string, self._position)
+            if not match or match.group() not in LOGICAL_OPERATORS:
+                return element
+            self._position = match.end()
+
+            self._option.add_logical()
+            logical = self._option.last_logical
+            logical['name'] = match.group()
+            logical['left_id'] = element['id']
+            element['right_id'] = logical['id']
+            if group:
+                logical['group_id'] = group['id']
+                group['logicals'].append(logical['id'])
+
+            element = self._parse_element()
+            logical['right_id'] = element['id']
+            element['left_id'] = logical['id']
+
+    def _parse_element(self):
+        self._skip_spaces()
+        if not self._string.startswith('(', self._position):
+            return self._parse_part()
+
+        self._position += 1
+        self._option.add_group()
+        group = self._option.last_group
+        element = self._parse_sequence(group)
+        self._skip_spaces()
+        if not self._string.startswith(')', self._position):
+            raise CorpusError('Unbalanced parentheses in the filter \'{}\''.format(self._string))
+        self._position += 1
+        if not group['logicals']:
+            # a parenthesized part is not a group
+            self._option.groups.remove(group)
+            return element
+        return group
+
+    def _parse_part(self):
+        self._option.add_part()
+        part = self._option.last_part
+        match = IDENTIFIER.match(self._string, self._position)
+        if not match:
+            raise CorpusError('Expected a property or a function at \'{}\''.format(self._string[self._position:]))
+        if self._string.startswith('(', match.end()):
+            self._parse_function(part, match)
+        else:
+            part['name'] = match.group()
+            self._position = match.end()
+
+        self._skip_spaces()
+        match = WORD.match(self._string, self._position)
+        if not match or match.group() not in EXPRESSION_OPERATORS:
+            raise CorpusError('Expected an operator at \'{}\''.format(self._string[self._position:]))
+        part['operator'] = match.group()
+        self._position = match.end()
+
+        self._skip_spaces()
+        part['operand'] = self._parse_operand()
+        return part
+
+    def _parse_function(self, part, name_match):
+        function_name = name_match.group()
+        if function_name not in FUNCTION_RETURN_TYPES:
+            raise CorpusError('Unknown filter function \'{}\''.format(function_name))
+        arguments_end = find_closing_parenthesis(self._string, name_match.end())
+        arguments = split_arguments(self._string[name_match.end() + 1:arguments_end])
+        params = [argument for argument in arguments if not IDENTIFIER.fullmatch(argument)]
+
+        part['name'] = self._string[name_match.start():arguments_end + 1]
+        part['proprties'] = [argument for argument in arguments if IDENTIFIER.fullmatch(argument)]
+        part['params'] = params or None
+        part['func'] = function_name
+        part['return_type'] = FUNCTION_RETURN_TYPES[function_name]
+        self._position = arguments_end + 1
+
+    def _parse_operand(self):
+        start = self._position
+        match = LITERAL_PREFIX.match(self._string, start)
+        if match:
+            self._position = find_literal_end(self._string, match.end() - 1)
+        else:
+            match = BARE_LITERAL.match(self._string, start)
+            if not match:
+                raise CorpusError('Expected an operand at \'{}\''.format(self._string[start:]))
+            self._position = match.end()
+        return self._string[start:self._position]
+
+    def _skip_spaces(self):
+        self._position = SPACES.match(self._string, self._position).end()
@@ -0,0 +1,72 @@
+"""This module contains a coverage map which records how the service responded to particular shapes of queries."""
+
+from collections import Counter
+
+from odfuzz.constants import FILTER
+
+
+class CoverageMap:
+    """Counters of signatures of analyzed queries.
+
+    A signature is a tuple (entity set, property, operator or function, options, status code, error code). Every
+    part of the $filter option adds one signature; a query without filter parts adds a signature with an empty
+    property and operator. The options are the combination of query options of the query, e.g. '$filter,$top'.
+
+    Besides the signatures, the map counts queries sent with every combination of options, so that the generation
+    of queries can prefer shapes which were not explored yet.
+    """
+
+    def __init__(self):
+        self._signatures = Counter()
+        self._combinations = Counter()
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def update(self, entry):
+        """Count signatures of the analyzed query; return the number of signatures which were not covered before."""
+        entity_set_name = entry['entity_set']
+        combination = options_combination(entry.get('order'))
+        self._combinations[(entity_set_name, combination)] += 1
+
+        new_num = 0
+        for proprty_name, operator in filter_features(entry.get('_' + FILTER)):
+            signature = (entity_set_name, proprty_name, operator, combination, entry['http'],
+                         str(entry.get('error_code') or ''))
+            if signature not in self._signatures:
+                new_num += 1
+            self._signatures[signature] += 1
+        return new_num
+
+    def combination_hits(self, entity_set_name, option_names):
+        """Return the number of analyzed queries of the entity set sent with exactly the given options."""
+        return self._combinations[(entity_set_name, options_combination(option_names))]
+
+    def state(self):
+        return {
+            'signatures': [list(signature) + [hits] for signature, hits in self._signatures.items()],
+            'combinations': [list(combination) + [hits] for combination, hits in self._combinations.items()]
+        }
+
+    def restore_state(self, state):
+        self._signatures = Counter({tuple(item[:-1]): item[-1] for item in state['signatures']})
+        self._combinations = Counter({tuple(item[:-1]): item[-1] for item in state['combinations']})
+
+
+def options_combination(option_names):
+    """Return a key of the combination of options; the names may be prefixed by an underscore as in entries."""
+    return ','.join(sorted(option_name.lstrip('_') for option_name in option_names or ()))
+
+
+def filter_features(filter_data):
+    """Return pairs (property, operator or function) of parts of the $filter option."""
+    parts = filter_data.get('parts') if isinstance(filter_data, dict) else None
+    if not parts:
+        return [('', '')]
+    features = []
+    for part in parts:
+        if 'func' in part:
+            features.extend((proprty_name, part['func']) for proprty_name in part['proprties'])
+        else:
+            features.append((part['name'], part['operator']))
+    return features
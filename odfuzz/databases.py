@@ -1,14 +1,34 @@
-"""This module defines an interface for local databases. At the moment, the only supported database is mongoDB."""
+"""This module defines an interface for local databases. Populations can be stored in mongoDB, SQLite or in memory."""
 
+import os
+import heapq
 import random
 import uuid
+import hashlib
+import itertools
+import sqlite3
+import gevent
+
+from copy import deepcopy
+from gevent.lock import Semaphore
 
 
 # pylint: disable=unused-import
 from abc import ABCMeta, abstractmethod
-from pymongo import errors, MongoClient, ASCENDING, DESCENDING
+from pymongo import errors, MongoClient, ASCENDING, DESCENDING, UpdateOne, DeleteMany
+from bson import json_util
+from bson.objectid import ObjectId
+
+from odfuzz.constants import MONGODB_NAME, FILTER_PARTS_NUM, FILTER_SAMPLE_SIZE, MAX_BEST_QUERIES, URL_HASH, \
+    WRITE_BUFFER_SIZE, WRITE_BUFFER_INTERVAL, ENV_SQLITE_PATH, DEFAULT_SQLITE_PATH, SQLITE_TIMEOUT
+
+
+DUPLICATE_KEY_ERROR = 11000
 
-from odfuzz.constants import MONGODB_NAME, FILTER_PARTS_NUM, FILTER_SAMPLE_SIZE, MAX_BEST_QUERIES
+
+def generate_url_hash(query_string):
+    """Return the same hash as Query.url_hash; used for entries which were saved without it."""
+    return hashlib.md5(query_string.encode('utf-8')).hexdigest()
 
 
 class CollectionCreator:
@@ -42,26 +62,169 @@ class DatabaseOperationsHandler:
     def delete_worst_entries(self, number):
         pass
 
+    def delete_entries(self, entries):
+        """Delete the entries found e.g. by find_all_entries(); entries need at least _id, entity_set and score."""
+        for entry in entries:
+            self.delete_entry(entry['_id'])
+
     @abstractmethod
     def delete_collection(self):
         pass
 
-    @abstractmethod
-    def total_entries(self):
-        pass
+    def total_entries(self, entity_set_name=None):
+        """Return the number of entries of the population or of the entity set; maintained by every write."""
+        return self._aggregates.entries(entity_set_name)
+
+    def total_score(self, entity_set_name=None):
+        """Return the sum of scores of the population or of the entity set; maintained by every write."""
+        return self._aggregates.score(entity_set_name)
+
+    def sample_filter_entry(self, entity_set_name, exclude_id):
+        """Return a crossable entry of the entity set picked from the crossover pool, or None if there is none."""
+        entry_id = self._crossover_pool.tournament(entity_set_name, exclude_id)
+        if entry_id is None:
+            return None
+        entry = self.find_entry(entry_id)
+        if entry is None:
+            # the entry was deleted by another process sharing the population
+            self._crossover_pool.remove(entry_id)
+        return entry
     
     @abstractmethod
-    def total_score(self):
+    def find_best_entries(self):
         pass
-    
+
     @abstractmethod
-    def sample_filter_entry(self, entity_set_name, exclude_id):
+    def find_top_entries(self, number):
+        """Return the number of entries with the highest scores in the whole population, the best first."""
         pass
-    
+
     @abstractmethod
-    def find_best_entries(self):
+    def find_all_entries(self):
+        pass
+
+    def flush(self):
+        """Write all pending changes to the database; handlers without a write buffer have nothing to write."""
         pass
 
+    def restrict(self, entity_set_names):
+        """Restrict the aggregates and deletions of the worst entries to the entity sets, e.g. of a worker process.
+
+        Only handlers of populations which can be shared by several processes have something to restrict.
+        """
+        pass
+
+    def explain(self, entity_set_name):
+        """Return query plans of the operations run in every iteration, keyed by the names of the operations.
+
+        Handlers which do not query a database engine return an empty dictionary.
+        """
+        return {}
+
+    def _entry_added(self, entry):
+        self._aggregates.add(entry)
+        self._crossover_pool.add(entry)
+
+    def _entry_removed(self, entry):
+        """Account for the removed entry; the entry has to contain at least _id, entity_set and score."""
+        self._aggregates.remove(entry)
+        self._crossover_pool.remove(entry['_id'])
+
+
+class PopulationAggregates:
+    """A running sum of scores and a number of entries of a population, in total and per entity set.
+
+    Handlers update the aggregates on every insert and delete, so that they can be read in constant time.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._score = 0
+        self._entries = 0
+        self._entity_sets = {}
+
+    def load(self, groups):
+        """Replace the aggregates by the (entity_set, score, entries) groups computed by the database."""
+        self.clear()
+        for entity_set_name, score, entries in groups:
+            self._score += score
+            self._entries += entries
+            self._entity_sets[entity_set_name] = [score, entries]
+
+    def add(self, entry):
+        self._update(entry['entity_set'], entry['score'], 1)
+
+    def remove(self, entry):
+        self._update(entry['entity_set'], -entry['score'], -1)
+
+    def score(self, entity_set_name=None):
+        if entity_set_name is None:
+            return self._score
+        return self._entity_sets.get(entity_set_name, [0, 0])[0]
+
+    def entries(self, entity_set_name=None):
+        if entity_set_name is None:
+            return self._entries
+        return self._entity_sets.get(entity_set_name, [0, 0])[1]
+
+    def _update(self, entity_set_name, score, entries):
+        self._score += score
+        self._entries += entries
+        entity_set = self._entity_sets.setdefault(entity_set_name, [0, 0])
+        entity_set[0] += score
+        entity_set[1] += entries
+
+
+class CrossoverPool:
+    """Entries which can be crossed, grouped by entity sets, with their scores.
+
+    A parent is the winner of a tournament: up to FILTER_SAMPLE_SIZE entries of the entity set are sampled
+    uniformly and the one with the highest score wins. Handlers update the pool on every insert and delete,
+    so that no query is sent to the database to pick a parent.
+    """
+
+    def __init__(self, id_key=None):
+        # handlers which do not keep the original type of _id in the database compare the converted ones
+        self._id_key = id_key or (lambda id: id)
+        self.clear()
+
+    def clear(self):
+        self._entity_sets = {}
+        self._entries = {}
+
+    def load(self, rows):
+        """Replace the pool by the (_id, entity_set, score) rows of crossable entries."""
+        self.clear()
+        for id, entity_set_name, score in rows:
+            self._put(id, entity_set_name, score)
+
+    def add(self, entry):
+        if has_crossable_filter(entry):
+            self._put(entry['_id'], entry['entity_set'], entry['score'])
+
+    def remove(self, id):
+        id = self._id_key(id)
+        pooled_entry = self._entries.pop(id, None)
+        if pooled_entry is not None:
+            self._entity_sets[pooled_entry[0]].discard(id)
+
+    def tournament(self, entity_set_name, exclude_id, size=FILTER_SAMPLE_SIZE):
+        candidates = self._entity_sets.get(entity_set_name)
+        if not candidates:
+            return None
+        exclude_id = None if exclude_id is None else self._id_key(exclude_id)
+        sampled_ids = [id for id in candidates.sample(size + 1) if id != exclude_id][:size]
+        if not sampled_ids:
+            return None
+        return max(sampled_ids, key=lambda id: self._entries[id][1])
+
+    def _put(self, id, entity_set_name, score):
+        id = self._id_key(id)
+        self._entries[id] = (entity_set_name, score)
+        self._entity_sets.setdefault(entity_set_name, SampleableSet()).add(id)
+
 
 class MongoDB:
     def __init__(self, collection_name):
@@ -76,59 +239,121 @@ class MongoDB:
 
 
 class MongoDBHandler(DatabaseOperationsHandler):
+    """A handler of a population stored in a collection of MongoDB.
+
+    The aggregates are computed from the collection when the handler is created and then they follow writes
+    of the handler. Worker processes sharing the collection (--workers) restrict their handlers to their own
+    entity sets, so that every handler counts, and deletes, only entries which no other process writes.
+    """
+
     def __init__(self, mongodb_client):
         self._collection = mongodb_client.collection
-    
+        # a filter of the entries handled by this process, see restrict()
+        self._scope = {}
+        self._aggregates = PopulationAggregates()
+        self._crossover_pool = CrossoverPool()
+        self._create_indexes()
+        self._load_aggregates()
+        self._load_crossover_pool()
+
+    def _create_indexes(self):
+        # sparse, so that the index can be built even over entries saved by older versions without the hash
+        self._collection.create_index(URL_HASH, unique=True, sparse=True)
+        # delete_worst_entries(), unrestricted and restricted to entity sets
+        self._collection.create_index([('score', ASCENDING)])
+        self._collection.create_index([('entity_set', ASCENDING), ('score', ASCENDING)])
+        # find_best_entries() and find_distinct_errorous_entity_names()
+        self._collection.create_index([('http', ASCENDING), ('entity_set', ASCENDING), ('score', DESCENDING)])
+        # loading of the crossover pool; the parts are subdocuments, so only entries which have some are indexed
+        self._collection.create_index([('entity_set', ASCENDING), ('score', DESCENDING)],
+                                      name='crossable_entity_set_score',
+                                      partialFilterExpression={'_$filter.parts': {'$exists': True}})
+
+    def _load_aggregates(self):
+        groups = self._collection.aggregate([
+            {'$match': self._scope},
+            {'$group': {'_id': '$entity_set', 'score': {'$sum': '$score'}, 'entries': {'$sum': 1}}}
+        ])
+        self._aggregates.load((group['_id'], group['score'], group['entries']) for group in groups)
+
+    def _load_crossover_pool(self):
+        self._crossover_pool.clear()
+        entries = self._collection.find(dict(self._scope, **{'_$filter.parts': {'$exists': True}}),
+                                        {'entity_set': 1, 'score': 1, '_$filter.parts': 1})
+        for entry in entries:
+            self._crossover_pool.add(entry)
+
     def save_entry(self, data):
-        if self._collection.find(data).count() == 0:
-            self._collection.insert_one(data)
+        """Save the entry unless an entry with the same URL is already saved."""
+        url_hash = data.get(URL_HASH) or generate_url_hash(data['string'])
+        try:
+            result = self._collection.update_one({URL_HASH: url_hash}, {'$setOnInsert': dict(data, url_hash=url_hash)},
+                                                 upsert=True)
+        except errors.DuplicateKeyError:
+            # another process has just saved the same URL
+            return
+        if result.upserted_id is not None:
+            self._entry_added(dict(data, _id=result.upserted_id))
     
     def find_entry(self, id):
         queries = list(self._collection.find({'_id': id}))
         return next(iter(queries), None)
     
     def delete_entry(self, id):
-        result = self._collection.delete_one({'_id': id})
-        return result.deleted_count
+        deleted_entry = self._collection.find_one_and_delete({'_id': id}, {'entity_set': 1, 'score': 1})
+        if deleted_entry is None:
+            return 0
+        self._entry_removed(deleted_entry)
+        return 1
     
     def delete_worst_entries(self, number):
         if number > 0:
-            queries = self._collection.find().sort('score', ASCENDING).limit(number)
+            queries = list(self._worst_entries(number))
 
             ids_to_remove = [query['_id'] for query in queries]
             self._collection.delete_many({'_id': {'$in': ids_to_remove}})
+            for query in queries:
+                self._entry_removed(query)
+
+    def delete_entries(self, entries):
+        entries = list(entries)
+        if entries:
+            self._collection.delete_many({'_id': {'$in': [entry['_id'] for entry in entries]}})
+            for entry in entries:
+                self._entry_removed(entry)
+
+    def restrict(self, entity_set_names):
+        self._scope = {'entity_set': {'$in': list(entity_set_names)}}
+        self._load_aggregates()
+        self._load_crossover_pool()
 
     def delete_collection(self):
         self._collection.drop()
+        self._aggregates.clear()
+        self._crossover_pool.clear()
+        self._create_indexes()
 
-    def total_entries(self):
-        return self._collection.find().count()
-    
-    def total_score(self):
-        scores = list(self._collection.aggregate([
-            {'$project': {'score': 1}},
-            {'$group': {'_id': None, 'overall': {'$sum': '$score'}}}
-        ]))
-        if  scores:
-            overall_score = scores[0]['overall']
-        else:
-            overall_score = 0
-        return overall_score
-    
-    def sample_filter_entry(self, entity_set_name, exclude_id):
-        queries = list(self._collection.aggregate([
-            {'$match': {'entity_set': entity_set_name, '_id': {'$ne': exclude_id},
-                        '_$filter.parts': {'$exists': True},
-                        '$expr': {'$gte': [{'$size': '$_$filter.parts'}, FILTER_PARTS_NUM]}}},
-            {'$sample': {'size': FILTER_SAMPLE_SIZE}},
-            {'$sort': {'score': DESCENDING}}, {'$limit': 1}
-        ]))
-        return next(iter(queries), None)
-    
     def find_best_entries(self, entity_set_name):
-        queries = self._collection.find(
-            {'entity_set': entity_set_name, 'http': '500'}).sort([('score', DESCENDING)]).limit(MAX_BEST_QUERIES)
-        return list(queries)
+        return list(self._best_entries(entity_set_name))
+
+    def find_top_entries(self, number):
+        return list(self._collection.find({}).sort('score', DESCENDING).limit(number))
+
+    def find_all_entries(self):
+        return self._collection.find({})
+
+    def explain(self, entity_set_name):
+        return {
+            'delete_worst_entries': summarize_plan(self._worst_entries(1).explain()),
+            'find_best_entries': summarize_plan(self._best_entries(entity_set_name).explain())
+        }
+
+    def _worst_entries(self, number):
+        return self._collection.find(self._scope, {'entity_set': 1, 'score': 1}).sort('score', ASCENDING).limit(number)
+
+    def _best_entries(self, entity_set_name):
+        return self._collection.find(
+            {'http': '500', 'entity_set': entity_set_name}).sort([('score', DESCENDING)]).limit(MAX_BEST_QUERIES)
 
     def find_distinct_errorous_entity_names(self):
         entity_names = self._collection.aggregate([
@@ -136,3 +361,525 @@ class MongoDBHandler(DatabaseOperationsHandler):
             {'$group': {'_id': '$entity_set'}}
         ])
         return [entity_name['_id'] for entity_name in entity_names]
+
+
+def summarize_plan(explanation):
+    """Return the stages of the winning plan from the output of explain, e.g. 'LIMIT <- FETCH <- IXSCAN(score_1)'."""
+    query_planner = explanation.get('queryPlanner')
+    if query_planner is None:
+        # a pipeline which is not executed by the query engine entirely has the plan nested in the $cursor stage
+        cursor_stages = [stage['$cursor'] for stage in explanation.get('stages', []) if '$cursor' in stage]
+        if not cursor_stages:
+            return 'unknown plan'
+        query_planner = cursor_stages[0]['queryPlanner']
+
+    stages = []
+    stage = query_planner['winningPlan']
+    while stage:
+        if 'indexName' in stage:
+            stages.append('{}({})'.format(stage['stage'], stage['indexName']))
+        else:
+            stages.append(stage['stage'])
+        stage = stage.get('inputStage') or next(iter(stage.get('inputStages', [])), None)
+    return ' <- '.join(stages)
+
+
+class BufferedMongoDBHandler(MongoDBHandler):
+    """A handler which collects inserts and deletes in a write buffer instead of writing them one by one.
+
+    Entries which are still in the buffer are visible to find_entry() and delete_entry() and they are counted in
+    the aggregates. Queries over the whole collection flush the buffer first. flush() has to be called before
+    the handler is abandoned.
+    """
+
+    def __init__(self, mongodb_client, buffer_size=WRITE_BUFFER_SIZE, flush_interval=WRITE_BUFFER_INTERVAL):
+        super(BufferedMongoDBHandler, self).__init__(mongodb_client)
+        self._buffer = WriteBuffer(self._collection, self._entry_added, self._entry_removed, buffer_size,
+                                   flush_interval)
+
+    def save_entry(self, data):
+        entry = dict(data, url_hash=data.get(URL_HASH) or generate_url_hash(data['string']))
+        entry.setdefault('_id', ObjectId())
+        self._buffer.insert(entry)
+
+    def find_entry(self, id):
+        if self._buffer.is_deleted(id):
+            return None
+        entry = self._buffer.find(id)
+        if entry is None:
+            entry = super(BufferedMongoDBHandler, self).find_entry(id)
+        return entry
+
+    def delete_entry(self, id):
+        if self._buffer.is_deleted(id):
+            return 0
+        entry = self._buffer.find(id) or self._collection.find_one({'_id': id}, {'entity_set': 1, 'score': 1})
+        if entry is None:
+            return 0
+        self._buffer.delete(entry)
+        return 1
+
+    def delete_worst_entries(self, number):
+        if number > 0:
+            saved_entries = self._collection.find(
+                dict(self._scope, _id={'$nin': self._buffer.deleted_ids()}), {'entity_set': 1, 'score': 1}
+            ).sort('score', ASCENDING).limit(number)
+            # entries which are being written by another greenlet may already be saved as well
+            candidates = {entry['_id']: entry for entry in list(saved_entries) + self._buffer.inserted_entries()}
+            for entry in sorted(candidates.values(), key=lambda entry: entry['score'])[:number]:
+                self._buffer.delete(entry)
+
+    def delete_entries(self, entries):
+        for entry in entries:
+            self._buffer.delete(entry)
+
+    def delete_collection(self):
+        self._buffer.clear()
+        super(BufferedMongoDBHandler, self).delete_collection()
+
+    def find_best_entries(self, entity_set_name):
+        self.flush()
+        return super(BufferedMongoDBHandler, self).find_best_entries(entity_set_name)
+
+    def find_top_entries(self, number):
+        self.flush()
+        return super(BufferedMongoDBHandler, self).find_top_entries(number)
+
+    def find_all_entries(self):
+        self.flush()
+        return super(BufferedMongoDBHandler, self).find_all_entries()
+
+    def find_distinct_errorous_entity_names(self):
+        self.flush()
+        return super(BufferedMongoDBHandler, self).find_distinct_errorous_entity_names()
+
+    def flush(self):
+        self._buffer.flush()
+
+
+class WriteBuffer:
+    """Inserts and deletes which are written to the collection by a single bulk_write().
+
+    The buffer is flushed when it holds buffer_size operations or by a timer greenlet when the oldest operation has
+    been waiting for flush_interval seconds, even if no other operation arrives. The handler is notified
+    by entry_added and entry_removed as soon as an operation is buffered; inserts which turn out to be duplicates
+    are reported as removed on flush. Operations which are being written are still visible to find(), is_deleted(),
+    deleted_ids() and inserted_entries(), because other greenlets may use the handler meanwhile.
+    """
+
+    def __init__(self, collection, entry_added, entry_removed, buffer_size, flush_interval):
+        self._collection = collection
+        self._entry_added = entry_added
+        self._entry_removed = entry_removed
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._inserts = {}
+        self._inserted_hashes = set()
+        self._deletes = set()
+        self._written_inserts = {}
+        self._written_deletes = set()
+        self._flushing = Semaphore()
+        self._timer = None
+
+    def insert(self, entry):
+        if entry[URL_HASH] in self._inserted_hashes:
+            return
+        self._inserts[entry['_id']] = entry
+        self._inserted_hashes.add(entry[URL_HASH])
+        self._entry_added(entry)
+        self._added()
+
+    def delete(self, entry):
+        """Delete the pending or saved entry; the entry has to contain at least _id, entity_set and score."""
+        id = entry['_id']
+        if self.is_deleted(id):
+            return
+        self._entry_removed(entry)
+        inserted_entry = self._inserts.pop(id, None)
+        if inserted_entry is None:
+            self._deletes.add(id)
+            self._added()
+        else:
+            self._inserted_hashes.discard(inserted_entry[URL_HASH])
+
+    def find(self, id):
+        return self._inserts.get(id) or self._written_inserts.get(id)
+
+    def is_deleted(self, id):
+        return id in self._deletes or id in self._written_deletes
+
+    def deleted_ids(self):
+        return list(self._deletes | self._written_deletes)
+
+    def inserted_entries(self):
+        return list(self._inserts.values()) + list(self._written_inserts.values())
+
+    def clear(self):
+        self._inserts = {}
+        self._inserted_hashes = set()
+        self._deletes = set()
+        self._stop_timer()
+
+    def flush(self):
+        # operations buffered while another greenlet is writing are written by the next bulk_write()
+        with self._flushing:
+            if not self._inserts and not self._deletes:
+                return
+            # the pending operations are taken at once, so that another greenlet may keep adding new ones
+            self._written_inserts, self._written_deletes = self._inserts, self._deletes
+            self.clear()
+            try:
+                self._write(self._written_inserts, self._written_deletes)
+            finally:
+                self._written_inserts = {}
+                self._written_deletes = set()
+
+    def _write(self, inserts, deletes):
+        operations = []
+        if deletes:
+            operations.append(DeleteMany({'_id': {'$in': list(deletes)}}))
+        for entry in inserts.values():
+            operations.append(UpdateOne({URL_HASH: entry[URL_HASH]}, {'$setOnInsert': entry}, upsert=True))
+        try:
+            upserted_ids = set(self._collection.bulk_write(operations, ordered=False).upserted_ids.values())
+        except errors.BulkWriteError as bulk_error:
+            # entries with the same URL may have just been saved by another process
+            if any(error['code'] != DUPLICATE_KEY_ERROR for error in bulk_error.details['writeErrors']):
+                raise
+            upserted_ids = set(upserted['_id'] for upserted in bulk_error.details['upserted'])
+        for id, entry in inserts.items():
+            if id not in upserted_ids:
+                # an entry with the same URL had already been saved
+                self._entry_removed(entry)
+
+    def _added(self):
+        if len(self._inserts) + len(self._deletes) >= self._buffer_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = gevent.spawn_later(self._flush_interval, self._flush_in_time)
+
+    def _flush_in_time(self):
+        self._timer = None
+        self.flush()
+
+    def _stop_timer(self):
+        if self._timer is not None:
+            self._timer.kill(block=False)
+            self._timer = None
+
+
+class InMemoryDatabase:
+    """A client of populations kept in the process memory.
+
+    Populations are shared by collection names, so that a handler created later (e.g. by StatsPrinter) sees the
+    entries saved by the fuzzer, as it does with collections of MongoDB.
+    """
+
+    _collections = {}
+
+    def __init__(self, collection_name):
+        self._collection = self._collections.setdefault(collection_name, InMemoryCollection())
+
+    @property
+    def collection(self):
+        return self._collection
+
+
+class InMemoryCollection:
+    """Entries of a population indexed by _id, by URL hash and by entity set, and a heap of entries ordered by score."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.entries = {}
+        self.url_hashes = {}
+        # (score, order, _id); entries deleted in another way than by popping are skipped lazily
+        self.score_heap = []
+        self.order = itertools.count()
+        self.errors = {}
+        self.aggregates = PopulationAggregates()
+        self.crossover_pool = CrossoverPool()
+
+
+class InMemoryHandler(DatabaseOperationsHandler):
+    """A handler of a population kept in the process memory; no database server is needed."""
+
+    def __init__(self, in_memory_client):
+        self._collection = in_memory_client.collection
+        self._aggregates = self._collection.aggregates
+        self._crossover_pool = self._collection.crossover_pool
+
+    def save_entry(self, data):
+        url_hash = data.get(URL_HASH) or generate_url_hash(data['string'])
+        if url_hash in self._collection.url_hashes:
+            return
+        entry = deepcopy(data)
+        entry[URL_HASH] = url_hash
+        entry.setdefault('_id', ObjectId())
+        entry_id = entry['_id']
+
+        self._collection.entries[entry_id] = entry
+        self._collection.url_hashes[url_hash] = entry_id
+        heapq.heappush(self._collection.score_heap, (entry['score'], next(self._collection.order), entry_id))
+        self._entry_added(entry)
+        if entry['http'] == '500':
+            self._collection.errors.setdefault(entry['entity_set'], set()).add(entry_id)
+
+    def find_entry(self, id):
+        entry = self._collection.entries.get(id)
+        return deepcopy(entry) if entry else None
+
+    def delete_entry(self, id):
+        entry = self._collection.entries.pop(id, None)
+        if entry is None:
+            return 0
+        del self._collection.url_hashes[entry[URL_HASH]]
+        self._entry_removed(entry)
+        self._collection.errors.get(entry['entity_set'], set()).discard(id)
+        self._compact_heap()
+        return 1
+
+    def delete_worst_entries(self, number):
+        deleted_num = 0
+        while deleted_num < number and self._collection.score_heap:
+            _, _, entry_id = heapq.heappop(self._collection.score_heap)
+            deleted_num += self.delete_entry(entry_id)
+
+    def delete_collection(self):
+        self._collection.clear()
+        self._aggregates = self._collection.aggregates
+        self._crossover_pool = self._collection.crossover_pool
+
+    def find_best_entries(self, entity_set_name):
+        error_ids = self._collection.errors.get(entity_set_name, set())
+        entries = [self._collection.entries[entry_id] for entry_id in error_ids]
+        return deepcopy(heapq.nlargest(MAX_BEST_QUERIES, entries, key=lambda entry: entry['score']))
+
+    def find_top_entries(self, number):
+        entries = self._collection.entries.values()
+        return deepcopy(heapq.nlargest(number, entries, key=lambda entry: entry['score']))
+
+    def find_all_entries(self):
+        return deepcopy(list(self._collection.entries.values()))
+
+    def find_distinct_errorous_entity_names(self):
+        return [entity_set_name for entity_set_name, error_ids in self._collection.errors.items() if error_ids]
+
+    def _compact_heap(self):
+        # the heap is rebuilt when most of its items belong to deleted entries
+        if len(self._collection.score_heap) > 2 * len(self._collection.entries) + 1:
+            self._collection.score_heap = [item for item in self._collection.score_heap
+                                           if item[2] in self._collection.entries]
+            heapq.heapify(self._collection.score_heap)
+
+
+class SampleableSet:
+    """A set which supports removal and uniform random sampling in constant time per item."""
+
+    def __init__(self):
+        self._items = []
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        if item not in self._positions:
+            self._positions[item] = len(self._items)
+            self._items.append(item)
+
+    def discard(self, item):
+        position = self._positions.pop(item, None)
+        if position is None:
+            return
+        last_item = self._items.pop()
+        if position < len(self._items):
+            self._items[position] = last_item
+            self._positions[last_item] = position
+
+    def sample(self, size):
+        return random.sample(self._items, min(size, len(self._items)))
+
+
+def has_crossable_filter(entry):
+    """Tell whether the entry has enough $filter parts to be crossed with another entry of its entity set."""
+    filter_option = entry.get('_$filter')
+    if not isinstance(filter_option, dict):
+        return False
+    return len(filter_option.get('parts') or []) >= FILTER_PARTS_NUM
+
+
+class SQLiteDatabase:
+    """A client of populations stored in an embedded SQLite database file; every collection is a table.
+
+    The file is shared by all collections; its path is set by the environment variable ODFUZZ_SQLITE_PATH.
+    """
+
+    def __init__(self, collection_name, database_path=None):
+        database_path = database_path or os.getenv(ENV_SQLITE_PATH, DEFAULT_SQLITE_PATH)
+        self._connection = sqlite3.connect(database_path, timeout=SQLITE_TIMEOUT)
+        # readers (e.g. StatsPrinter) do not block the writer and vice versa
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._collection_name = collection_name
+
+    @property
+    def connection(self):
+        return self._connection
+
+    @property
+    def collection_name(self):
+        return self._collection_name
+
+
+class SQLiteHandler(DatabaseOperationsHandler):
+    """A handler of a population stored in an SQLite table.
+
+    Entries are stored as JSON documents next to the columns which are filtered and sorted by. Writes are grouped
+    in transactions, which are committed after transaction_size writes or by a timer greenlet when the oldest write
+    has been waiting for transaction_interval seconds. Uncommitted writes are visible to the handler itself, but not to other
+    processes; flush() has to be called before the handler is abandoned. The write lock of the whole file is held
+    until the transaction is committed, so the file cannot be shared by several fuzzing processes.
+    """
+
+    WORST_ENTRIES = 'SELECT id, entity_set, score FROM {} ORDER BY score ASC LIMIT ?'
+    BEST_ENTRIES = 'SELECT document FROM {} WHERE http = \'500\' AND entity_set = ? ORDER BY score DESC LIMIT ?'
+    TOP_ENTRIES = 'SELECT document FROM {} ORDER BY score DESC LIMIT ?'
+
+    def __init__(self, sqlite_client, transaction_size=WRITE_BUFFER_SIZE, transaction_interval=WRITE_BUFFER_INTERVAL):
+        self._connection = sqlite_client.connection
+        self._collection_name = sqlite_client.collection_name
+        self._table = quote_identifier(self._collection_name)
+        self._transaction_size = transaction_size
+        self._transaction_interval = transaction_interval
+        self._pending_num = 0
+        self._timer = None
+        self._aggregates = PopulationAggregates()
+        # the entries are looked up by the string representation of _id
+        self._crossover_pool = CrossoverPool(id_key=str)
+        self._create_table()
+        self._load_aggregates()
+        self._crossover_pool.load(self._connection.execute(
+            'SELECT id, entity_set, score FROM {} WHERE crossable = 1'.format(self._table)))
+
+    def _create_table(self):
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS {} (id TEXT PRIMARY KEY, url_hash TEXT NOT NULL UNIQUE, entity_set TEXT, '
+            'http TEXT, score NUMERIC, crossable INTEGER, document TEXT NOT NULL)'.format(self._table))
+        for suffix, columns in (('score', 'score'), ('entity_set_score', 'entity_set, score'),
+                                ('http_entity_set_score', 'http, entity_set, score')):
+            index_name = quote_identifier('{}_{}'.format(self._collection_name, suffix))
+            self._connection.execute('CREATE INDEX IF NOT EXISTS {} ON {} ({})'.format(index_name, self._table, columns))
+        self._connection.commit()
+
+    def _load_aggregates(self):
+        self._aggregates.load(self._connection.execute(
+            'SELECT entity_set, SUM(score), COUNT(*) FROM {} GROUP BY entity_set'.format(self._table)))
+
+    def save_entry(self, data):
+        """Save the entry unless an entry with the same URL is already saved."""
+        entry = dict(data, url_hash=data.get(URL_HASH) or generate_url_hash(data['string']))
+        entry.setdefault('_id', ObjectId())
+        cursor = self._connection.execute(
+            'INSERT OR IGNORE INTO {} (id, url_hash, entity_set, http, score, crossable, document) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)'.format(self._table),
+            (str(entry['_id']), entry[URL_HASH], entry['entity_set'], entry['http'], entry['score'],
+             int(has_crossable_filter(entry)), json_util.dumps(entry)))
+        if cursor.rowcount:
+            self._entry_added(entry)
+            self._written()
+
+    def find_entry(self, id):
+        row = self._connection.execute(
+            'SELECT document FROM {} WHERE id = ?'.format(self._table), (str(id),)).fetchone()
+        return json_util.loads(row[0]) if row else None
+
+    def delete_entry(self, id):
+        row = self._connection.execute(
+            'SELECT id, entity_set, score FROM {} WHERE id = ?'.format(self._table), (str(id),)).fetchone()
+        if row is None:
+            return 0
+        self._delete_rows([row])
+        return 1
+
+    def delete_worst_entries(self, number):
+        if number > 0:
+            rows = self._connection.execute(self.WORST_ENTRIES.format(self._table), (number,))
+            self._delete_rows(rows.fetchall())
+
+    def delete_entries(self, entries):
+        self._delete_rows([(str(entry['_id']), entry['entity_set'], entry['score']) for entry in entries])
+
+    def _delete_rows(self, rows):
+        self._connection.executemany('DELETE FROM {} WHERE id = ?'.format(self._table), [(row[0],) for row in rows])
+        for id, entity_set_name, score in rows:
+            self._entry_removed({'_id': id, 'entity_set': entity_set_name, 'score': score})
+        self._written()
+
+    def delete_collection(self):
+        self._connection.execute('DROP TABLE IF EXISTS {}'.format(self._table))
+        self._pending_num = 0
+        self._stop_timer()
+        self._aggregates.clear()
+        self._crossover_pool.clear()
+        self._create_table()
+
+    def find_best_entries(self, entity_set_name):
+        rows = self._connection.execute(self.BEST_ENTRIES.format(self._table), (entity_set_name, MAX_BEST_QUERIES))
+        return [json_util.loads(row[0]) for row in rows]
+
+    def find_top_entries(self, number):
+        rows = self._connection.execute(self.TOP_ENTRIES.format(self._table), (number,))
+        return [json_util.loads(row[0]) for row in rows]
+
+    def find_all_entries(self):
+        rows = self._connection.execute('SELECT document FROM {}'.format(self._table))
+        return (json_util.loads(row[0]) for row in rows)
+
+    def find_distinct_errorous_entity_names(self):
+        rows = self._connection.execute('SELECT DISTINCT entity_set FROM {} WHERE http = \'500\''.format(self._table))
+        return [row[0] for row in rows]
+
+    def explain(self, entity_set_name):
+        operations = {
+            'delete_worst_entries': (self.WORST_ENTRIES, (1,)),
+            'find_best_entries': (self.BEST_ENTRIES, (entity_set_name, MAX_BEST_QUERIES))
+        }
+        plans = {}
+        for name, (statement, parameters) in operations.items():
+            rows = self._connection.execute('EXPLAIN QUERY PLAN ' + statement.format(self._table), parameters)
+            plans[name] = '; '.join(row[-1] for row in rows)
+        return plans
+
+    def flush(self):
+        self._connection.commit()
+        self._pending_num = 0
+        self._stop_timer()
+
+    def _written(self):
+        self._pending_num += 1
+        if self._pending_num >= self._transaction_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = gevent.spawn_later(self._transaction_interval, self._flush_in_time)
+
+    def _flush_in_time(self):
+        self._timer = None
+        self.flush()
+
+    def _stop_timer(self):
+        if self._timer is not None:
+            self._timer.kill(block=False)
+            self._timer = None
+
+
+def quote_identifier(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+STORES = {
+    'mongodb': (BufferedMongoDBHandler, MongoDB),
+    'sqlite': (SQLiteHandler, SQLiteDatabase),
+    'memory': (InMemoryHandler, InMemoryDatabase)
+}
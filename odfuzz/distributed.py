@@ -0,0 +1,300 @@
+"""This module contains a coordinator that spreads one fuzzing campaign over workers on several machines.
+
+The coordinator builds the list of queryable entity sets once and hands out leases of the entity sets to workers.
+Workers talk to the coordinator over a simple JSON protocol on top of HTTP:
+
+    POST /lease      {"worker": ID}                              -> {"entity_sets": [...], "stop": false}
+    POST /heartbeat  {"worker": ID, "stats": {...}, "failures": [], "operators": [], "results": []} -> {"stop": false}
+    POST /release    {"worker": ID, "stats": {...}, "failures": [], "operators": [], "results": []} -> {"stop": true}
+
+A worker keeps its lease by sending heartbeats. The stats are cumulative counters of the worker, the failures are
+all clusters of server errors found by the worker (see FailureTriage), the operators are cumulative uses of
+mutation operators of the worker (see MutationOperators) and the results are queries that triggered HTTP 500 since
+the previous heartbeat.
+"""
+
+import json
+import math
+import time
+import uuid
+import signal
+import logging
+
+import gevent
+import requests
+
+from gevent.event import Event
+from gevent.pywsgi import WSGIServer
+
+from odfuzz.statistics import Stats
+from odfuzz.exceptions import CoordinatorError
+from odfuzz.constants import FUZZER_LOGGER, HEARTBEAT_INTERVAL, LEASE_TIMEOUT, COORDINATOR_TIMEOUT
+
+RESULT_FIELDS = ('http', 'error_code', 'error_message', 'entity_set', 'string', 'score')
+
+
+class LeaseTable:
+    """Leases of entity sets held by workers.
+
+    Every worker gets at most lease_size entity sets which are not leased by anybody else. A lease which was not
+    renewed for lease_timeout seconds expires and its entity sets can be handed out to another worker.
+    """
+
+    def __init__(self, entity_set_names, lease_size, lease_timeout=LEASE_TIMEOUT):
+        self._free = list(entity_set_names)
+        self._leases = {}
+        self._renewed = {}
+        self._lease_size = lease_size
+        self._lease_timeout = lease_timeout
+
+    @property
+    def holders(self):
+        return list(self._leases.keys())
+
+    def acquire(self, worker_id, now=None):
+        now = self._now(now)
+        self._expire(now)
+        if worker_id not in self._leases:
+            self._leases[worker_id] = self._free[:self._lease_size]
+            del self._free[:self._lease_size]
+        self._renewed[worker_id] = now
+        return self._leases[worker_id]
+
+    def renew(self, worker_id, now=None):
+        """Renew the lease of the worker; return False if the worker does not hold any lease."""
+        now = self._now(now)
+        self._expire(now)
+        if worker_id not in self._leases:
+            return False
+        self._renewed[worker_id] = now
+        return True
+
+    def release(self, worker_id):
+        self._free.extend(self._leases.pop(worker_id, []))
+        self._renewed.pop(worker_id, None)
+
+    def _expire(self, now):
+        for worker_id, renewed in list(self._renewed.items()):
+            if now - renewed > self._lease_timeout:
+                logging.getLogger(FUZZER_LOGGER).warning('The lease of the worker {} expired'.format(worker_id))
+                self.release(worker_id)
+
+    def _now(self, now):
+        return time.monotonic() if now is None else now
+
+
+class Coordinator:
+    """An HTTP server that hands out leases of entity sets and gathers runtime statistics and results of workers.
+
+    Results are saved to the coordinator's database, so StatsPrinter writes them as if they were found locally.
+    """
+
+    def __init__(self, entity_set_names, database, workers_num, lease_timeout=LEASE_TIMEOUT):
+        self._logger = logging.getLogger(FUZZER_LOGGER)
+        self._database = database
+        self._leases = LeaseTable(entity_set_names, math.ceil(len(entity_set_names) / workers_num), lease_timeout)
+        self._workers_stats = {}
+        self._workers_failures = {}
+        self._workers_operators = {}
+        self._stopping = False
+        self._released = Event()
+        self._routes = {
+            '/lease': self._lease,
+            '/heartbeat': self._heartbeat,
+            '/release': self._release
+        }
+
+    def run(self, address, stop_timeout=2 * HEARTBEAT_INTERVAL):
+        """Serve workers until the coordinator is interrupted (SIGINT, timeout).
+
+        Workers are asked to stop on their next heartbeat; the coordinator waits at most stop_timeout seconds
+        for their final statistics before the interruption is propagated.
+        """
+        # SIGINT has to interrupt the waiting in the main greenlet; statistics are not complete before the workers stop
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        server = WSGIServer(address, self.application, log=None)
+        server.start()
+        self._logger.info('Coordinator is listening at {}:{}'.format(*server.address))
+        try:
+            Event().wait()
+        finally:
+            self._stop(server, stop_timeout)
+
+    def _stop(self, server, stop_timeout):
+        self._stopping = True
+        if self._leases.holders:
+            self._released.clear()
+            self._released.wait(stop_timeout)
+        server.stop()
+        for worker_stats in self._workers_stats.values():
+            Stats.add_counters(worker_stats)
+        for worker_failures in self._workers_failures.values():
+            Stats.failures.merge(worker_failures)
+        for worker_operators in self._workers_operators.values():
+            Stats.mutation_operators.merge(worker_operators)
+
+    def application(self, environ, start_response):
+        handler = self._routes.get(environ.get('PATH_INFO'))
+        if handler is None or environ.get('REQUEST_METHOD') != 'POST':
+            start_response('404 Not Found', [('Content-Type', 'application/json')])
+            return [b'{}']
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+            message = json.loads(environ['wsgi.input'].read(length).decode('utf-8'))
+            worker_id = message['worker']
+        except (ValueError, KeyError) as ex:
+            self._logger.error('Coordinator received an invalid message: {}'.format(ex))
+            start_response('400 Bad Request', [('Content-Type', 'application/json')])
+            return [b'{}']
+
+        reply = handler(worker_id, message)
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [json.dumps(reply).encode('utf-8')]
+
+    def _lease(self, worker_id, message):
+        if self._stopping:
+            return {'entity_sets': [], 'stop': True}
+        entity_sets = self._leases.acquire(worker_id)
+        self._logger.info('Worker {} leased the entity sets {}'.format(worker_id, entity_sets))
+        if not entity_sets:
+            self._leases.release(worker_id)
+        return {'entity_sets': entity_sets, 'stop': False}
+
+    def _heartbeat(self, worker_id, message):
+        self._gather(worker_id, message)
+        leased = self._leases.renew(worker_id)
+        return {'stop': self._stopping or not leased}
+
+    def _release(self, worker_id, message):
+        self._gather(worker_id, message)
+        self._leases.release(worker_id)
+        self._logger.info('Worker {} released its entity sets'.format(worker_id))
+        if not self._leases.holders:
+            self._released.set()
+        return {'stop': True}
+
+    def _gather(self, worker_id, message):
+        self._workers_stats[worker_id] = message.get('stats', {})
+        self._workers_failures[worker_id] = message.get('failures', [])
+        self._workers_operators[worker_id] = message.get('operators', [])
+        for result in message.get('results', []):
+            self._database.save_entry(result)
+
+
+class CoordinatorClient:
+    """A client of the coordinator used by a worker."""
+
+    def __init__(self, url, timeout=COORDINATOR_TIMEOUT):
+        self._url = url.rstrip('/')
+        self._timeout = timeout
+        self._worker_id = uuid.uuid4().hex
+        self._session = requests.Session()
+
+    @property
+    def worker_id(self):
+        return self._worker_id
+
+    def lease(self):
+        reply = self._post('/lease', {})
+        return reply['entity_sets'], reply['stop']
+
+    def heartbeat(self, stats, results, failures=(), operators=()):
+        """Report the progress and renew the lease; return True if the worker should stop."""
+        return self._post('/heartbeat', {'stats': stats, 'failures': list(failures), 'operators': list(operators),
+                                         'results': results})['stop']
+
+    def release(self, stats, results, failures=(), operators=()):
+        self._post('/release', {'stats': stats, 'failures': list(failures), 'operators': list(operators),
+                                'results': results})
+
+    def _post(self, path, message):
+        message['worker'] = self._worker_id
+        try:
+            response = self._session.post(self._url + path, data=json.dumps(message), timeout=self._timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as ex:
+            raise CoordinatorError('Cannot communicate with the coordinator {}: {}'.format(self._url, ex))
+
+
+class CoordinatedWorker:
+    """A worker that fuzzes entity sets leased from the coordinator and reports its progress by heartbeats."""
+
+    def __init__(self, client, heartbeat_interval=HEARTBEAT_INTERVAL):
+        self._logger = logging.getLogger(FUZZER_LOGGER)
+        self._client = client
+        self._heartbeat_interval = heartbeat_interval
+
+    def lease(self):
+        """Wait until the coordinator hands out some entity sets; return an empty list if it is stopping."""
+        while True:
+            entity_sets, stop = self._client.lease()
+            if entity_sets or stop:
+                return entity_sets
+            self._logger.info('All entity sets are leased by other workers, waiting...')
+            gevent.sleep(self._heartbeat_interval)
+
+    def run(self, fuzz, results):
+        """Run the fuzzing until the coordinator stops the worker or the worker is interrupted."""
+        fuzzing = gevent.spawn(fuzz)
+        try:
+            while not fuzzing.dead:
+                fuzzing.join(timeout=self._heartbeat_interval)
+                if self._send_heartbeat(results):
+                    self._logger.info('Worker was stopped by the coordinator')
+                    break
+        finally:
+            fuzzing.kill()
+            self._release(results)
+        if fuzzing.exception is not None:
+            raise fuzzing.exception
+
+    def _send_heartbeat(self, results):
+        reported = results.peek()
+        try:
+            stop = self._client.heartbeat(Stats.counters(), reported, Stats.failures.records(),
+                                          Stats.mutation_operators.records())
+        except CoordinatorError as ex:
+            # the lease is kept by the coordinator for a while, the results are sent again by the next heartbeat
+            self._logger.warning(str(ex))
+            return False
+        results.discard(len(reported))
+        return stop
+
+    def _release(self, results):
+        reported = results.peek()
+        try:
+            self._client.release(Stats.counters(), reported, Stats.failures.records(),
+                                 Stats.mutation_operators.records())
+        except CoordinatorError as ex:
+            self._logger.error('{}; {} results were not reported'.format(ex, len(reported)))
+            return
+        results.discard(len(reported))
+
+
+class ReportedResults:
+    """A wrapper of a database handler which remembers saved queries that triggered HTTP 500.
+
+    The remembered queries are sent to the coordinator by CoordinatedWorker; they are discarded only after
+    the coordinator has received them.
+    """
+
+    def __init__(self, database):
+        self._database = database
+        self._results = []
+
+    def save_entry(self, data):
+        self._database.save_entry(data)
+        if data.get('http') == '500':
+            self._results.append({field: data.get(field) for field in RESULT_FIELDS})
+
+    def peek(self):
+        """Return the remembered queries in the order in which they were saved."""
+        return list(self._results)
+
+    def discard(self, number):
+        """Forget the first number of the remembered queries, e.g. after they were reported."""
+        del self._results[:number]
+
+    def __getattr__(self, name):
+        return getattr(self._database, name)
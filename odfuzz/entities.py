@@ -263,6 +263,24 @@ class QueryableEntities(object):
     def all(self):
         return self._entities
 
+    def subset(self, entity_set_names):
+        """Return entities of the given entity sets only."""
+        subset = QueryableEntities()
+        for query_group in self._entities:
+            if query_group.entity_set.name in entity_set_names:
+                subset.add(query_group)
+        return subset
+
+    def partition(self, parts_num):
+        """Split the entities to at most parts_num disjoint groups of similar sizes."""
+        partitions = []
+        for index in range(min(parts_num, len(self._entities))):
+            partition = QueryableEntities()
+            for query_group in self._entities[index::parts_num]:
+                partition.add(query_group)
+            partitions.append(partition)
+        return partitions
+
 
 class QueryGroupData:
     def __init__(self, entity_set, principal_entities, restrictions, dispatcher):
@@ -2104,6 +2122,19 @@ def remove_logical_from_group(option_value, group_id, logical_id):
         pass
 
 
+def is_removable(option_value, part_id):
+    for part in option_value['parts']:
+        if part['id'] == part_id:
+            return part.get('replaceable', True)
+
+    for logical in option_value['logicals']:
+        if logical.get('group_id', '') == part_id:
+            left_id = is_removable(option_value, logical['left_id'])
+            right_id = is_removable(option_value, logical['right_id'])
+            return right_id and left_id
+    return True
+
+
 def get_principal_entities(data_model, entity_set):
     principal_entities = []
     for association_set in data_model.association_sets:
@@ -21,6 +21,26 @@ class DispatcherError(ODfuzzException):
     pass
 
 
+class BatchError(ODfuzzException):
+    """An error occurred while splitting a response to the $batch request."""
+    pass
+
+
+class CoordinatorError(ODfuzzException):
+    """An error occurred while communicating with the coordinator of workers."""
+    pass
+
+
+class CheckpointError(ODfuzzException):
+    """An error occurred while loading a checkpoint of the fuzzer."""
+    pass
+
+
+class CorpusError(ODfuzzException):
+    """An error occurred while loading a seed corpus."""
+    pass
+
+
 class RestrictionsError(ODfuzzException):
     """An error occurred while initializing a restrictions object."""
     pass
@@ -2,30 +2,47 @@
 
 import random
 import io
+import re
 import sys
 import hashlib
 import logging
 import gevent
+import gevent.pool
 import requests
 import requests.adapters
 import json
+import math
+import time
+import sqlite3
 
 from copy import deepcopy
-from collections import namedtuple
+from functools import partial
+from collections import namedtuple, OrderedDict
 from abc import ABCMeta, abstractmethod
 from lxml import etree
-from gevent.pool import Pool
+from gevent.queue import Queue, JoinableQueue
+from gevent.event import Event
 from bson.objectid import ObjectId
 from pymongo.errors import ServerSelectionTimeoutError  #TODO leaky abstraction, should be new exception class in database.py, untied to specific database usage.
 
 from odfuzz.entities import DispatchedBuilder, FilterOptionBuilder, FilterOptionDeleter, FilterOption, \
-    OrderbyOptionBuilder, OrderbyOption, KeyValuesBuilder
+    OrderbyOptionBuilder, OrderbyOption, KeyValuesBuilder, is_removable
 from odfuzz.restrictions import RestrictionsGroup
 from odfuzz.statistics import Stats #TODO this is the part where computation of runtime statistic is done via module import
-from odfuzz.databases import MongoDB, MongoDBHandler
+from odfuzz.databases import STORES
+from odfuzz.checkpoints import Checkpoint, CheckpointFile
+from odfuzz.corpus import load_seed_corpus, redundant_entries
+from odfuzz.coverage import CoverageMap
+from odfuzz.minimizer import FailureMinimizer
+from odfuzz.scheduler import QueryGroupScheduler
+from odfuzz.triage import normalize_error_code
 from odfuzz.mutators import NumberMutator, StringMutator
 from odfuzz.output import StandardOutput, BindOutput
-from odfuzz.exceptions import DispatcherError
+from odfuzz.exceptions import DispatcherError, BatchError
+from odfuzz.batch import BatchRequestBuilder, BatchResponseParser
+from odfuzz.workers import WorkerPool
+from odfuzz.islands import Island, MigrationRing, island_collection_name
+from odfuzz.distributed import Coordinator, CoordinatorClient, CoordinatedWorker, ReportedResults
 from odfuzz.config import Config
 from odfuzz.utils import decode_string
 from odfuzz import __version__
@@ -33,6 +50,10 @@ from odfuzz import __version__
 # pylint: disable=wildcard-import
 from odfuzz.constants import *  
 
+# used for counting entries in a prefix of the response body that cannot be parsed
+XML_ENTRY_TAG = re.compile(rb'<(?:\w+:)?entry[\s>]')
+JSON_ENTITY_METADATA = b'"__metadata"'
+
 
 class Manager:
     """A class for managing the fuzzer runtime."""
@@ -40,11 +61,33 @@ class Manager:
     def __init__(self, bind, arguments, collection_name):
         Config.init()
 
-        self._dispatcher = Dispatcher(arguments)
+        self._restrictions = RestrictionsGroup(arguments.restrictions)
+        self._dispatcher = Dispatcher(arguments, self._restrictions.rate_limits())
         self._asynchronous = arguments.asynchronous
+        self._batch_size = arguments.batch or 0
+        self._db_explain = arguments.db_explain
+        self._workers_num = arguments.workers
+        self._islands_num = arguments.islands
+        self._migration_interval = arguments.migration_interval
+        self._migration_size = arguments.migration_size
+        self._migration_ring = None
+        self._coordinator = arguments.coordinator
+        self._port = arguments.port
+        self._coordinator_url = arguments.worker
         self._first_touch = arguments.first_touch
-        self._restrictions = RestrictionsGroup(arguments.restrictions)
         self._collection_name = collection_name
+        self._database_classes = STORES[arguments.store]
+        self._database = None
+        self._resume = arguments.resume is not None
+        self._seed_corpus_source = arguments.seed_corpus
+        self._seed_corpus = None
+        self._minimize = arguments.minimize
+        self._minimize_failures = arguments.minimize_failures
+        # a population kept in memory or spread among worker processes or islands cannot be resumed
+        self._checkpointing = arguments.store != 'memory' and arguments.workers == 1 and arguments.islands == 1 \
+            and not arguments.coordinator and not arguments.worker
+        self._checkpoints = None
+        self._fuzzer = None
         self._logger = logging.getLogger(FUZZER_LOGGER)
         
         self._using_encoder = Config.fuzzer.use_encoder
@@ -63,20 +106,165 @@ class Manager:
         self._output_handler.print_status('random.seed() is set to \'{}\''.format(seed))
         self._logger.info('random.seed() is set to \'{}\''.format(seed))
 
-        database = self.establish_database_connection(MongoDBHandler, MongoDB)
+        checkpoint = None
+        if self._checkpointing:
+            self._checkpoints = CheckpointFile(Stats.checkpoints_directory, self._collection_name)
+            if self._resume:
+                checkpoint = self._checkpoints.load()
+                self._output_handler.print_status('Resuming from the checkpoint {}'.format(self._checkpoints.path))
+                self._logger.info('Resuming from the checkpoint {}'.format(self._checkpoints.path))
+
+        self._database = self.establish_database_connection(*self._database_classes)
+        database = self._database
         entities = self.build_entities()
+        if self._seed_corpus_source and (checkpoint is None or not checkpoint.seed_completed):
+            self._seed_corpus = self._load_seed_corpus()
+        if checkpoint is None:
+            database.delete_collection()
+        if self._coordinator:
+            self._coordinate(database, entities)
+        elif self._coordinator_url:
+            self._fuzz_for_coordinator(database, entities)
+        elif self._workers_num > 1:
+            self._fuzz_in_workers(entities)
+        elif self._islands_num > 1:
+            self._fuzz_in_islands(entities)
+        else:
+            self._fuzz(database, entities, checkpoint)
+
+    def _fuzz(self, database, entities, checkpoint=None, island=None, seeded_entities=None):
         fuzzer = Fuzzer(self._dispatcher, entities, database, self._output_handler, self._asynchronous,
-                        self._using_encoder)
+                        self._using_encoder, self._batch_size, self._db_explain, self._checkpoints, self._seed_corpus,
+                        self._minimize, self._minimize_failures, island, seeded_entities)
+        if checkpoint is not None:
+            fuzzer.restore(checkpoint)
+        self._fuzzer = fuzzer
 
         self._output_handler.print_status('Fuzzing...')
-        fuzzer.run()
+        try:
+            fuzzer.run()
+        finally:
+            database.flush()
+
+    @property
+    def database_classes(self):
+        """A pair of classes of the database handler and the database client, e.g. for StatsPrinter."""
+        return self._database_classes
+
+    @property
+    def collection_names(self):
+        """Names of the collections holding the population, e.g. for StatsPrinter; every island has its own."""
+        if self._islands_num > 1:
+            return [island_collection_name(self._collection_name, index) for index in range(self._islands_num)]
+        return [self._collection_name]
+
+    def flush_database(self):
+        """Write changes buffered by the database handler, e.g. before the statistics are written."""
+        if self._database:
+            self._database.flush()
+
+    def save_checkpoint(self):
+        """Save a checkpoint of the running fuzzer, e.g. when it is interrupted, so that it can be resumed later."""
+        if self._fuzzer:
+            self._fuzzer.save_checkpoint()
+
+    def stop_fuzzing(self):
+        """Stop dispatching queries of the interrupted fuzzer, see Fuzzer.stop()."""
+        if self._fuzzer:
+            self._fuzzer.stop()
+
+    def finish_minimizations(self):
+        """Let minimizations of server errors finish for a while, e.g. before the failures are written."""
+        if self._fuzzer:
+            self._fuzzer.finish_minimizations()
+
+    def _load_seed_corpus(self):
+        seed_corpus = load_seed_corpus(self._seed_corpus_source, self._database_classes)
+        message = 'Loaded {} queries of the seed corpus {}'.format(len(seed_corpus), self._seed_corpus_source)
+        self._output_handler.print_status(message)
+        self._logger.info(message)
+        if self._minimize:
+            removed_num = seed_corpus.minimize()
+            self._logger.info('Seed corpus was minimized by {} queries to {}'.format(removed_num, len(seed_corpus)))
+        return seed_corpus
+
+    def _fuzz_in_workers(self, entities):
+        """Fork worker processes; every worker runs its own genetic loop over a partition of the entities.
+
+        Workers share the database collection, but every worker evolves the queries of its own entity sets only.
+        """
+        partitions = entities.partition(self._workers_num)
+        self._dispatcher.prepare_for_workers(len(partitions))
+        self._output_handler.print_status('Fuzzing in {} worker processes...'.format(len(partitions)))
+        self._logger.info('Fuzzing in {} worker processes'.format(len(partitions)))
+        WorkerPool().run(partitions, self._run_worker)
 
-    def establish_database_connection(self, database_handler, database_client):
-        self._output_handler.print_status('Connecting to the database - Collection: {}'.format(self._collection_name))
-        self._logger.info('Connecting to the database - Collection: {}'.format(self._collection_name))
+    def _fuzz_in_islands(self, entities):
+        """Fork island processes; every island runs its own genetic loop over all entities with its own population.
+
+        Every island seeds its population with its own partition of the entities, so the populations start diverse,
+        and islands exchange their best queries with their neighbours in a ring, see Island.
+        """
+        partitions = entities.partition(self._islands_num)
+        # there may be fewer entity sets than islands
+        seeded_partitions = [partitions[index % len(partitions)] for index in range(self._islands_num)]
+        self._migration_ring = MigrationRing(self._islands_num)
+        self._dispatcher.prepare_for_workers(self._islands_num, shared_entity_sets=True)
+        self._output_handler.print_status('Fuzzing in {} islands...'.format(self._islands_num))
+        self._logger.info('Fuzzing in {} islands, {} queries migrate after every {} generations'
+                          .format(self._islands_num, self._migration_size, self._migration_interval))
+        try:
+            WorkerPool().run(seeded_partitions, partial(self._run_island, entities))
+        finally:
+            self._migration_ring.close()
+
+    def _coordinate(self, database, entities):
+        entity_set_names = [queryable.entity_set.name for queryable in entities.all()]
+        coordinator = Coordinator(entity_set_names, database, self._workers_num)
+        self._output_handler.print_status('Coordinating workers on the port {}...'.format(self._port))
+        coordinator.run(('', self._port))
+
+    def _fuzz_for_coordinator(self, database, entities):
+        worker = CoordinatedWorker(CoordinatorClient(self._coordinator_url))
+        self._output_handler.print_status('Leasing entity sets from {}...'.format(self._coordinator_url))
+        entity_set_names = worker.lease()
+        if not entity_set_names:
+            self._output_handler.print_status('Coordinator is stopping. Exiting...')
+            return
+        self._logger.info('Leased entity sets: {}'.format(', '.join(entity_set_names)))
+        results = ReportedResults(database)
+        worker.run(lambda: self._fuzz(results, entities.subset(entity_set_names)), results)
+
+    def _run_worker(self, index, entities):
+        # workers would generate the same sequences of values otherwise
+        random.seed(random.getrandbits(64) + index)
+        self._database = self.establish_database_connection(*self._database_classes)
+        # the collection is shared, the worker deletes and counts only queries of its own entity sets
+        self._database.restrict([queryable.entity_set.name for queryable in entities.all()])
         try:
-            return database_handler(database_client(self._collection_name))
-        except ServerSelectionTimeoutError:
+            self._fuzz(self._database, entities)
+        finally:
+            # the failures are reported to the parent process when the worker exits
+            self.finish_minimizations()
+
+    def _run_island(self, entities, index, seeded_entities):
+        # islands would evolve the same populations otherwise
+        random.seed(random.getrandbits(64) + index)
+        island = Island(index, self._migration_ring.connect(index), self._migration_interval, self._migration_size)
+        self._database = self.establish_database_connection(
+            *self._database_classes, island_collection_name(self._collection_name, index))
+        try:
+            self._fuzz(self._database, entities, island=island, seeded_entities=seeded_entities)
+        finally:
+            self.finish_minimizations()
+
+    def establish_database_connection(self, database_handler, database_client, collection_name=None):
+        collection_name = collection_name or self._collection_name
+        self._output_handler.print_status('Connecting to the database - Collection: {}'.format(collection_name))
+        self._logger.info('Connecting to the database - Collection: {}'.format(collection_name))
+        try:
+            return database_handler(database_client(collection_name))
+        except (ServerSelectionTimeoutError, sqlite3.OperationalError):
             self._output_handler.print_status('Error: Cannot connect establish connection to the database.')
             sys.exit(1)
 
@@ -93,26 +281,52 @@ class Manager:
 class Fuzzer:
     """A main class that is responsible for the fuzzing process."""
 
-    def __init__(self, dispatcher, entities, database, output_handler, asynchronous, using_encoder):
+    def __init__(self, dispatcher, entities, database, output_handler, asynchronous, using_encoder, batch_size=0,
+                 db_explain=False, checkpoints=None, seed_corpus=None, minimize=False, minimize_failures=False,
+                 island=None, seeded_entities=None):
         self._logger = logging.getLogger(FUZZER_LOGGER)
         self._urls_logger = URLsLogger()
         self._stats_logger = StatsLogger()
         self._response_logger = ResponseTimeLogger()
         self._dispatcher = dispatcher
         self._entities = entities
+        # an island seeds only its own partition of the entities, but it evolves queries of all of them
+        self._seeded_entities = entities if seeded_entities is None else seeded_entities
         self._output_handler = output_handler
         self._database = database
 
         self._analyzer = Analyzer(database)
+        self._coverage = CoverageMap()
         self._selector = Selector(database, entities)
+        self._retry_policy = RetryPolicy(Config.dispatcher.retry_max_attempts, RETRY_BASE_DELAY, RETRY_TIMEOUT)
 
         self._asynchronous = asynchronous
+        self._batch_size = batch_size
+        self._db_explain = db_explain
+        self._checkpoints = checkpoints
+        self._seed_corpus = seed_corpus
+        self._minimize = minimize
+        self._minimize_failures = minimize_failures
+        self._island = island
+        # failures waiting for minimization are taken by at most MINIMIZERS_NUM greenlets
+        self._minimizations = JoinableQueue()
+        self._minimizers = gevent.pool.Pool(MINIMIZERS_NUM)
+        if minimize_failures:
+            for _ in range(MINIMIZERS_NUM):
+                self._minimizers.spawn(self._minimize_queued_failures)
+        self._last_checkpoint = time.monotonic()
+        self._seeded = {}
+        self._seed_completed = False
+        self._batch_errors_num = 0
+        self._queries_per_iteration = batch_size or Config.dispatcher.async_requests_num
         if asynchronous:
             self._queryable_factory = MultipleQueryable
-            self._dispatch = self._get_multiple_responses
+            self._pipeline = DispatchPipeline(self._send_chunk, dispatcher.concurrency.max_limit)
+            self._process = self._process_asynchronously
         else:
             self._queryable_factory = SingleQueryable
-            self._dispatch = self._get_single_response
+            self._pipeline = None
+            self._process = self._process_synchronously
 
         if not using_encoder:
             self._decode_queries = lambda *args: None
@@ -120,6 +334,13 @@ class Fuzzer:
         Stats.tests_num = 0
         Stats.fails_num = 0
         Stats.exceptions_num = 0
+        Stats.dropped_num = 0
+        Stats.signatures_num = 0
+        Stats.error_signatures_num = 0
+        Stats.minimized_failures_num = 0
+        Stats.minimization_requests_num = 0
+        Stats.failures.clear()
+        Stats.mutation_operators.clear()
 
         # This step is required to redirect printing of stack trace by greenlets. I haven't
         # found any other conventional way to suppress such a printing. In the past, it was
@@ -135,21 +356,33 @@ class Fuzzer:
 
     def run(self):
 
-        self._database.delete_collection()
-        self.seed_population()
+        if not self._seed_completed:
+            self.seed_population()
         if self._database.total_entries() == 0:
             self._logger.info('There are no queries generated yet.')
             sys.stdout.write('OData service does not contain any queryable entities. Exiting...\n')
             sys.exit(0)
 
-        self._selector.score_average = self._database.total_score() / self._database.total_entries()
+        if self._db_explain:
+            self._log_query_plans()
         self.evolve_population()
 
+    def _log_query_plans(self):
+        """Log how the database executes the operations of the genetic loop over the seeded population."""
+        entity_set_name = next(iter(self._entities.all())).entity_set.name
+        query_plans = self._database.explain(entity_set_name)
+        if not query_plans:
+            self._logger.info('The database does not provide query plans')
+        for operation, query_plan in query_plans.items():
+            self._logger.info('Query plan of {} (entity set {}): {}'.format(operation, entity_set_name, query_plan))
+
     def seed_population(self):
         """
         Initial and first half of the fuzzing process.
 
         Parses the $metadata from the server and generates URLs for *all* entities present (random values).
+        If a seed corpus of a previous run is given, its queries are sent instead of the random ones.
+        The seeded population may be minimized afterwards, see minimize_population().
 
         After finishing, we have touched each entity and it is time to employ the genetic sampling
         for better probability of hitting the server errors.
@@ -160,18 +393,57 @@ class Fuzzer:
         :return:
         """
         self._logger.info('Seeding population with requests...')
-        for queryable in self._entities.all():
-            entityset_urls_count = len(queryable.entity_set.entity_type.proprties()) * Config.fuzzer.urls_per_property
-            if self._asynchronous:
-                entityset_urls_count = round(entityset_urls_count / Config.dispatcher.async_requests_num)
-            self._logger.info('Population range for entity \'{}\' is set to {}'
-                              .format(queryable.entity_set.name, entityset_urls_count))
-            for _ in range(entityset_urls_count):
-                q = self._queryable_factory(queryable, self._logger, Config.dispatcher.async_requests_num)
-                queries = q.generate()
-                self._send_queries(queries)
-                self._analyze_queries(queries)
-                self._save_queries(queries)
+        if self._seed_corpus is None:
+            assigned_entries = [(queryable, []) for queryable in self._seeded_entities.all()]
+        else:
+            assigned_entries = self._seed_corpus.assign(self._seeded_entities)
+        for queryable, entries in assigned_entries:
+            if entries:
+                self._seed_from_corpus(queryable, entries)
+            else:
+                # e.g. entity sets introduced after the previous run
+                self._seed_randomly(queryable)
+        self._wait_for_pending_queries()
+        if self._minimize:
+            self.minimize_population()
+        self._seed_completed = True
+        self._selector.init_score_averages()
+
+    def minimize_population(self):
+        """Remove seeded queries whose responses and options are kept by other queries of the same entity sets."""
+        entity_set_names = {queryable.entity_set.name for queryable in self._seeded_entities.all()}
+        # other workers sharing the collection may still be seeding their own entity sets
+        entries = (entry for entry in self._database.find_all_entries() if entry['entity_set'] in entity_set_names)
+        redundant = redundant_entries(entries)
+        self._database.delete_entries(redundant)
+        self._logger.info('Population was minimized by {} queries to {}'
+                          .format(len(redundant), self._database.total_entries()))
+
+    def _seed_randomly(self, queryable):
+        entityset_urls_count = len(queryable.entity_set.entity_type.proprties()) * Config.fuzzer.urls_per_property
+        if self._asynchronous:
+            entityset_urls_count = round(entityset_urls_count / self._queries_per_iteration)
+        self._logger.info('Population range for entity \'{}\' is set to {}'
+                          .format(queryable.entity_set.name, entityset_urls_count))
+        q = self._queryable_factory(queryable, self._logger, self._queries_per_iteration, self._coverage)
+        self._seed_queryable(queryable, entityset_urls_count, lambda iteration: q.generate())
+
+    def _seed_from_corpus(self, queryable, entries):
+        self._logger.info('Seeding entity \'{}\' with {} queries of the seed corpus'
+                          .format(queryable.entity_set.name, len(entries)))
+        chunk_size = self._queries_per_iteration if self._asynchronous else 1
+        q = self._queryable_factory(queryable, self._logger, self._queries_per_iteration)
+        self._seed_queryable(queryable, math.ceil(len(entries) / chunk_size),
+                             lambda iteration: q.rebuild(entries[iteration * chunk_size:(iteration + 1) * chunk_size]))
+
+    def _seed_queryable(self, queryable, iterations_num, build_queries):
+        progress_key = query_group_key(queryable)
+        # iterations completed before the fuzzer was resumed are skipped
+        for iteration in range(self._seeded.get(progress_key, 0), iterations_num):
+            queries = build_queries(iteration)
+            self._process(queries, partial(self._handle_seeded_queries, queryable))
+            self._seeded[progress_key] = iteration + 1
+            self._checkpoint_if_due()
 
     def evolve_population(self):
         """
@@ -183,19 +455,99 @@ class Fuzzer:
             selection = self._selector.select()
             if selection.crossable:
                 self._logger.info('Crossing parents...')
-                q = self._queryable_factory(selection.queryable, self._logger, Config.dispatcher.async_requests_num)
+                self._analyzer.remember_parents(selection.crossable)
+                q = self._queryable_factory(selection.queryable, self._logger,
+                                             self._queries_per_iteration, self._coverage)
                 queries = q.crossover(selection.crossable)
-                self._send_queries(queries)
-                analyzed_queries = self._analyze_queries(queries)
-                self._remove_weak_queries(analyzed_queries, queries)
+                self._process(queries, partial(self._handle_crossed_queries, selection.queryable))
             else:
                 self._logger.info('Generating new queries...')
-                q = self._queryable_factory(selection.queryable, self._logger, Config.dispatcher.async_requests_num)
+                q = self._queryable_factory(selection.queryable, self._logger,
+                                             self._queries_per_iteration, self._coverage)
                 queries = q.generate()
-                self._send_queries(queries)
-                self._analyze_queries(queries)
-                self._slay_weakest_individuals(len(queries))
-            self._save_queries(queries)
+                self._process(queries, partial(self._handle_generated_queries, selection.queryable))
+            self._checkpoint_if_due()
+            if self._island is not None:
+                self._island.evolved(self._database)
+
+    def restore(self, checkpoint):
+        """Continue from the checkpoint; the population is already stored in the database."""
+        random.setstate(checkpoint.random_state)
+        # the counters of a new process are zeros
+        Stats.add_counters(checkpoint.counters)
+        self._selector.restore_state(checkpoint.selector_state)
+        self._seeded = dict(checkpoint.seeded)
+        self._seed_completed = checkpoint.seed_completed
+        self._coverage.restore_state(checkpoint.coverage_state)
+        Stats.failures.merge(checkpoint.failures)
+        Stats.mutation_operators.merge(checkpoint.mutation_operators)
+
+    def save_checkpoint(self):
+        if self._checkpoints is None:
+            return
+        # the seeding progress counts iterations as soon as their queries are submitted to the dispatch pipeline
+        self._wait_for_pending_queries()
+        # the population has to be stored before the state which refers to it
+        self._database.flush()
+        checkpoint = Checkpoint(self._checkpoints.collection_name, random.getstate(), Stats.counters(),
+                                self._selector.state(), self._seeded, self._seed_completed, self._coverage.state(),
+                                Stats.failures.records(), Stats.mutation_operators.records())
+        self._checkpoints.save(checkpoint)
+        self._last_checkpoint = time.monotonic()
+        self._logger.info('Checkpoint saved to {}'.format(self._checkpoints.path))
+
+    def _checkpoint_if_due(self):
+        if self._checkpoints is not None and time.monotonic() - self._last_checkpoint >= CHECKPOINT_INTERVAL:
+            self.save_checkpoint()
+
+    def _process_synchronously(self, queries, handler):
+        if self._send_queries(queries):
+            handler(queries)
+
+    def _process_asynchronously(self, queries, handler):
+        """Hand the queries over to the dispatch pipeline and handle all responses received so far.
+
+        Submitting blocks only while the pipeline is saturated, so the queries generated in the next
+        iteration are already queued while the slower requests of this iteration are still in flight.
+        When the $batch mode is enabled, the queries are submitted in chunks which are sent as a single request.
+        """
+        chunk_size = self._batch_size or 1
+        for index in range(0, len(queries), chunk_size):
+            self._pipeline.submit(queries[index:index + chunk_size], handler)
+        for chunk, chunk_handler in self._pipeline.completed():
+            chunk_handler(chunk)
+
+    def stop(self, timeout=PIPELINE_STOP_TIMEOUT):
+        """Stop dispatching once the genetic loop is stopped, e.g. when the fuzzer is interrupted.
+
+        Queries in flight get timeout seconds to complete and they are handled as usual; the others are dropped.
+        """
+        if self._pipeline is None:
+            return
+        dropped_num = self._pipeline.stop(timeout)
+        for chunk, chunk_handler in self._pipeline.completed():
+            chunk_handler(chunk)
+        if dropped_num:
+            self._logger.warning('{} requests in flight were dropped when the fuzzer stopped'.format(dropped_num))
+
+    def _wait_for_pending_queries(self):
+        if self._pipeline:
+            for chunk, chunk_handler in self._pipeline.join():
+                chunk_handler(chunk)
+
+    def _handle_seeded_queries(self, queryable, queries):
+        self._analyze_queries(queryable, queries)
+        self._save_queries(queries)
+
+    def _handle_crossed_queries(self, queryable, queries):
+        analyzed_queries = self._analyze_queries(queryable, queries)
+        self._remove_weak_queries(analyzed_queries, queries)
+        self._save_queries(queries)
+
+    def _handle_generated_queries(self, queryable, queries):
+        self._analyze_queries(queryable, queries)
+        self._slay_weakest_individuals(len(queries))
+        self._save_queries(queries)
 
     def _save_queries(self, queries):
         self._decode_queries(queries)
@@ -243,54 +595,198 @@ class Fuzzer:
             for key, value in accessible_keys.items():
                 accessible_keys[key] = decode_string(value)
 
+    def _send_chunk(self, chunk):
+        """Send a chunk of queries submitted to the dispatch pipeline, packed into a $batch request if enabled.
+
+        Queries that were given up are removed from the chunk, so only the sent ones are handled afterwards.
+        """
+        if len(chunk) == 1:
+            return self._send_queries(chunk[0])
+        if self._batch_size:
+            if not self._send_with_retries(chunk, self._get_batch_responses):
+                return False
+        else:
+            # the $batch mode was turned off while the chunk was waiting in the pipeline
+            chunk[:] = [query for query in chunk if self._send_queries(query)]
+        return bool(chunk)
+
     def _send_queries(self, queries):
-        while True:
-            success = self._dispatch(queries)
-            if success:
-                break
+        """Send the query and re-send it with a growing delay until it succeeds or the attempts are exhausted.
 
-    def _get_multiple_responses(self, queries):
-        pool = Pool(Config.dispatcher.async_requests_num)
-        for query in queries:
-            pool.spawn(self._get_response, query)
+        Return False if the query was given up; such a query has no response and must not be analyzed.
+        """
+        return self._send_with_retries(queries, self._get_single_response)
+
+    def _send_with_retries(self, queries, get_responses):
+        attempt = 1
+        while not get_responses(queries):
+            if not self._retry_policy.can_retry(attempt):
+                for query in queries:
+                    self._logger.error('Dropping \'{}\' after {} failed attempts'
+                                       .format(query[0].query_string, attempt))
+                Stats.dropped_num += len(queries)
+                return False
+            self._wait_before_retry(attempt)
+            attempt += 1
+        return True
+
+    def _get_single_response(self, queries):
         try:
-            pool.join(raise_error=True)
+            self._get_response(queries)
         except DispatcherError:
-            pool.kill()
             self._handle_dispatcher_exception()
             return False
         return True
 
-    def _get_single_response(self, queries):
+    def _get_batch_responses(self, chunk):
+        """Send the chunk as a single $batch request and assign the split responses to the queries.
+
+        If the service cannot process the $batch request, the queries are sent one by one instead and
+        the $batch mode is turned off after BATCH_ERRORS_LIMIT consecutive failures.
+        """
         try:
-            self._get_response(queries)
+            responses = self._dispatcher.batch([query[0].query_string for query in chunk],
+                                               [query[0].entity_name for query in chunk], timeout=REQUEST_TIMEOUT)
         except DispatcherError:
             self._handle_dispatcher_exception()
             return False
+        except BatchError as error:
+            self._handle_batch_error(error)
+            chunk[:] = [query for query in chunk if self._send_queries(query)]
+            return True
+
+        self._batch_errors_num = 0
+        for query, response in zip(chunk, responses):
+            self._handle_response(query, response)
         return True
 
+    def _handle_batch_error(self, error):
+        self._logger.warning('{}. Sending the queries one by one...'.format(error))
+        self._batch_errors_num += 1
+        if self._batch_errors_num >= BATCH_ERRORS_LIMIT and self._batch_size:
+            self._logger.warning('The $batch mode is turned off after {} failed $batch requests'
+                                 .format(self._batch_errors_num))
+            self._batch_size = 0
+
     def _get_response(self, query):
-        query[0].response = self._dispatcher.get(query[0].query_string, timeout=REQUEST_TIMEOUT)
+        response = self._dispatcher.get(query[0].query_string, entity_set_name=query[0].entity_name,
+                                        bytes_limit=Config.dispatcher.response_bytes_limit, timeout=REQUEST_TIMEOUT)
+        self._handle_response(query, response)
+
+    def _handle_response(self, query, response):
+        query[0].response = response
         if query[0].response.status_code != 200:
             self._set_error_attributes(query)
             Stats.fails_num += 1
+            if query[0].response.status_code == 500:
+                self._triage_failure(query[0])
         else:
             self._response_logger.log_response_time_and_data(query[0], Config.fuzzer.data_format)
             setattr(query[0].response, 'error_code', '')
             setattr(query[0].response, 'error_message', '')
 
+    def _triage_failure(self, query):
+        response = query.response
+        if Stats.failures.add(query.entity_name, response.error_code, response.error_message, query.query_string):
+            self._logger.info('A new cluster of server errors: {} {}'.format(response.error_code, query.query_string))
+            if self._minimize_failures:
+                entry = {option_key: deepcopy(query.options[option_key[1:]]) for option_key in query.order}
+                entry['order'] = list(query.order)
+                self._minimizations.put((query, entry))
+
+    def finish_minimizations(self, timeout=MINIMIZATION_JOIN_TIMEOUT):
+        """Give the queued minimizations up to timeout seconds to finish and stop the rest, e.g. before
+        the failures are written."""
+        if not len(self._minimizers):
+            return
+        if not self._minimizations.join(timeout):
+            self._logger.info('Minimizations of {} server errors were stopped unfinished'
+                              .format(self._minimizations.unfinished_tasks))
+        self._minimizers.kill()
+
+    def _minimize_queued_failures(self):
+        while True:
+            query, entry = self._minimizations.get()
+            try:
+                self._minimize_failure(query, entry)
+            except Exception as ex:  # pylint: disable=broad-except
+                # a dead minimizer would leave the queued failures unminimized
+                self._logger.error('Minimization of {} failed: {}'.format(query.query_string, ex))
+            finally:
+                self._minimizations.task_done()
+
+    def _minimize_failure(self, query, entry):
+        """Search for the shortest query which causes the same server error in the background.
+
+        The minimized query replaces the shortest URL of the failure's cluster.
+        """
+        response = query.response
+        minimizer = FailureMinimizer(partial(self._build_minimization_query, query.accessible_entity),
+                                     partial(self._reproduces_failure, error_code=response.error_code),
+                                     self._dispatcher.concurrency.max_limit)
+        minimized = minimizer.minimize(query, entry, query.is_option_deletable)
+        if minimized is not query:
+            Stats.failures.shorten(query.entity_name, response.error_code, response.error_message,
+                                   minimized.query_string)
+            Stats.minimized_failures_num += 1
+            self._logger.info('A server error {} was minimized to {}'.format(response.error_code,
+                                                                             minimized.query_string))
+
+    def _build_minimization_query(self, accessible_entity, entry):
+        query = Query(accessible_entity)
+        for option_key in entry['order']:
+            query.add_option(option_key[1:], entry[option_key])
+        query.build_string()
+        return query
+
+    def _reproduces_failure(self, query, error_code):
+        Stats.minimization_requests_num += 1
+        try:
+            query.response = self._dispatcher.get(query.query_string, entity_set_name=query.entity_name,
+                                                  bytes_limit=Config.dispatcher.response_bytes_limit,
+                                                  timeout=REQUEST_TIMEOUT)
+        except DispatcherError:
+            return False
+        if query.response.status_code != 500:
+            return False
+        try:
+            self._set_error_attributes((query,))
+        except (KeyError, TypeError, IndexError):
+            # the body of the response is not an OData error
+            return False
+        return normalize_error_code(query.response.error_code) == normalize_error_code(error_code)
+
     def _handle_dispatcher_exception(self):
         Stats.exceptions_num += 1
         self._output_handler.print_test_num()
-        self._logger.info('Retrying in {} seconds...'.format(RETRY_TIMEOUT))
-        gevent.sleep(RETRY_TIMEOUT)
 
-    def _analyze_queries(self, queries):
+    def _wait_before_retry(self, attempt):
+        delay = self._retry_policy.delay(attempt)
+        self._logger.info('Retrying in {:.2f} seconds...'.format(delay))
+        gevent.sleep(delay)
+
+    def _analyze_queries(self, queryable, queries):
+        """Analyze the queries of the query group and reward the group by the queries which covered new signatures
+        or scored better than their predecessors."""
         analyzed_offsprings = []
+        successes_num = 0
         for query in queries:
-            analyzed_offsprings.append(self._analyzer.analyze(query))
+            offspring = self._analyzer.analyze(query)
+            analyzed_offsprings.append(offspring)
+            new_num = self._update_coverage(query[0].dictionary)
+            if new_num or isinstance(offspring, BetterOffspring):
+                successes_num += 1
+        server_seconds = sum(query[0].response.elapsed.total_seconds() for query in queries)
+        self._selector.reward(queryable, successes_num, len(queries), server_seconds)
         return analyzed_offsprings
 
+    def _update_coverage(self, entry):
+        new_num = self._coverage.update(entry)
+        Stats.signatures_num += new_num
+        if entry['http'] == '500':
+            Stats.error_signatures_num += new_num
+        return new_num
+
     def _remove_weak_queries(self, analyzed_offsprings, queries):
         for offspring in analyzed_offsprings:
             offspring.slay_weak_individual(queries)
@@ -340,10 +836,11 @@ class Queryable:
 
     SelfMock = namedtuple('SelfMock', 'max_length')
 
-    def __init__(self, queryable, logger, async_requests_num):
+    def __init__(self, queryable, logger, async_requests_num, coverage=None):
         self._queryable = queryable
         self._logger = logger
         self._async_requests_num = async_requests_num
+        self._coverage = coverage
 
     def generate_query(self):
         accessible_entity, body_key_pairs = self._queryable.get_accessible_entity()
@@ -412,7 +909,7 @@ class Queryable:
 
     def generate_options(self, query):
         depending_data = {}
-        for option in self._queryable.random_options():
+        for option in self._select_options():
             generated_option = option.generate(depending_data)
             query.add_option(option.name, generated_option.data)
             depending_data[option.name] = option.get_depending_data()
@@ -420,6 +917,16 @@ class Queryable:
         query.build_string()
         self._logger.info('Generated query \'{}\''.format(query.query_string))
 
+    def _select_options(self):
+        """Return random options; with a coverage map, the combination of options which was sent the least times
+        out of a few random ones is preferred."""
+        if self._coverage is None:
+            return self._queryable.random_options()
+        entity_set_name = self._queryable.entity_set.name
+        candidates = [self._queryable.random_options() for _ in range(OPTIONS_CANDIDATES_NUM)]
+        return min(candidates, key=lambda options: self._coverage.combination_hits(
+            entity_set_name, [option.name for option in options]))
+
     def _crossover_queries(self, query1, query2):
         if is_filter_crossable(query1, query2):
             replaceable_parts = [part for part in query1['_$filter']['parts'] if part.get('replaceable', True)]
@@ -465,6 +972,13 @@ class Queryable:
 
         return query1
 
+    def rebuild_query(self, entry):
+        """Build the query of an entry imported from a previous run, e.g. from a seed corpus."""
+        query = self.build_offspring(entry)
+        query.build_string()
+        Stats.tests_num += 1
+        return query
+
     def build_offspring(self, offspring):
         accessible_entity = self._queryable.get_existing_accessible_entity(
             offspring['accessible_keys'], offspring['accessible_set'])
@@ -483,16 +997,24 @@ class Queryable:
         return query1
 
     def _mutate_query(self, query):
-        option_name, option_value = random.choice(list(query.options.items()))
-        if query.is_option_deletable(option_name) and len(query.order) > 1 and random.random() < OPTION_DEL_PROB:
+        """Mutate an option of the query; the option and the mutation are chosen by weights of mutation operators
+        learned from previous offspring, see MutationOperators."""
+        Stats.mutation_operators.start()
+        option_name = Stats.mutation_operators.choose('option', list(query.options))
+        option_value = query.options[option_name]
+        if query.is_option_deletable(option_name) and len(query.order) > 1 and Stats.mutation_operators.choose(
+                'action', ['delete', 'mutate'], [OPTION_DEL_PROB, 1 - OPTION_DEL_PROB]) == 'delete':
             query.delete_option(option_name)
         else:
             self._mutate_option(query, option_name, option_value)
+        query.mutations.extend(Stats.mutation_operators.take())
         Stats.created_by_mutation += 1
 
     def build_mutated_accessible_keys(self, accessible_keys, data_to_be_mutated):
+        Stats.mutation_operators.start()
         self._mutate_accessible_keys(accessible_keys, data_to_be_mutated)
         query = self.build_offspring(data_to_be_mutated)
+        query.mutations.extend(Stats.mutation_operators.take())
         query.add_predecessor(data_to_be_mutated['_id'])
         query.build_string()
         return query
@@ -530,7 +1052,8 @@ class Queryable:
             query.options[option_name] = self._mutate_value(NumberMutator, option_value)
 
     def _mutate_filter(self, option_value):
-        if option_value['logicals'] and random.random() < FILTER_DEL_PROB:
+        if option_value['logicals'] and Stats.mutation_operators.choose(
+                'filter', ['remove_part', 'mutate_part'], [FILTER_DEL_PROB, 1 - FILTER_DEL_PROB]) == 'remove_part':
             logical_index = round(random.random() * (len(option_value['logicals']) - 1))
             parts = self._get_removable_parts(option_value, logical_index)
             if parts:
@@ -596,7 +1119,7 @@ class Queryable:
 
     def _mutate_value(self, mutator_class, value, self_mock=None):
         mutators = self._get_mutators(mutator_class)
-        mutator = random.choice(mutators)
+        mutator = Stats.mutation_operators.choose(mutator_class.__name__, mutators)
         mutated_value = getattr(mutator_class, mutator)(self_mock, value)
         return mutated_value
 
@@ -638,6 +1161,9 @@ class MultipleQueryable(Queryable):
                     children.append(offspring)
         return children
 
+    def rebuild(self, entries):
+        return [(self.rebuild_query(entry), {}) for entry in entries]
+
 
 class SingleQueryable(Queryable):
     """
@@ -659,6 +1185,11 @@ class SingleQueryable(Queryable):
             query = self._crossover_queries(query1, query2)
         return [query]
 
+    def rebuild(self, entries):
+        # queries are sent one by one, the entries contain just one entry
+        query = self.rebuild_query(entries[0])
+        return [query, json.dumps({})]
+
 
 class URLsLogger:
     def __init__(self):
@@ -789,7 +1320,9 @@ class ResponseTimeLogger:
         self._data_logger.info(CSV_RESPONSES_HEADER)
 
     def log_response_time_and_data(self, query, data_type):
-        if data_type == 'xml':
+        if getattr(query.response, 'truncated', False):
+            self.log_truncated_data(query, data_type)
+        elif data_type == 'xml':
             self.log_xml_data(query)
         elif data_type == 'json':
             self.log_json_data(query)
@@ -805,6 +1338,23 @@ class ResponseTimeLogger:
             count = self.get_xml_data_count(parsed_xml)
             self.log_data(query, count)
 
+    def log_truncated_data(self, query, data_type):
+        """Log a response whose body was not read completely; only entries in the kept prefix are counted."""
+        if data_type == 'xml':
+            count = self.get_truncated_xml_data_count(query.response.content)
+        elif data_type == 'json':
+            count = self.get_truncated_json_data_count(query.response.content)
+        else:
+            self._main_logger.error('Format \'{}\' is not supported yet.'.format(data_type))
+            return
+        self.log_data(query, count)
+
+    def get_truncated_xml_data_count(self, content):
+        return len(XML_ENTRY_TAG.findall(content))
+
+    def get_truncated_json_data_count(self, content):
+        return content.count(JSON_ENTITY_METADATA)
+
     def get_xml_data_count(self, parsed_xml):
         count = len(parsed_xml.xpath("//atom:entry", namespaces=NAMESPACES))
         return count
@@ -841,12 +1391,16 @@ class ResponseTimeLogger:
 
     def log_data(self, query, count):
         elapsed_seconds = query.response.elapsed.total_seconds()
-        response_size = len(query.response.content)
+        response_size = response_length(query.response)
         entity_set_name = query.entity_name
         url = query.response.request.url
 
         query_options = '+'.join([query_option for query_option in query.options])
         brief_info = '{} {} ({})'.format(entity_set_name, query_options, count)
+        if getattr(query.response, 'elapsed_estimated', False):
+            brief_info += ' [estimated time]'
+        if getattr(query.response, 'truncated', False):
+            brief_info += ' [truncated]'
 
         self._data_logger.info('{};{};{};"{}";{}'.format(
             elapsed_seconds, response_size, entity_set_name, url.replace('"', '""'), brief_info))
@@ -860,43 +1414,67 @@ class Selector:
     def __init__(self, database, entities):
         self._logger = logging.getLogger(FUZZER_LOGGER)
         self._database = database
-        self._score_average = 0
-        self._passed_iterations = 0
+        self._score_averages = {}
+        self._passed_iterations = {}
         self._entities = entities
+        self._scheduler = QueryGroupScheduler({query_group_key(queryable): queryable
+                                               for queryable in entities.all()})
 
-    @property
-    def score_average(self):
-        return self._score_average
+    def init_score_averages(self):
+        for queryable in self._entities.all():
+            entity_set_name = queryable.entity_set.name
+            self._score_averages[entity_set_name] = self._score_average(entity_set_name)
+
+    def state(self):
+        return {'score_averages': self._score_averages, 'passed_iterations': self._passed_iterations,
+                'scheduler': self._scheduler.state()}
+
+    def restore_state(self, state):
+        self._score_averages = dict(state['score_averages'])
+        self._passed_iterations = dict(state['passed_iterations'])
+        self._scheduler.restore_state(state['scheduler'])
 
-    @score_average.setter
-    def score_average(self, value):
-        self._score_average = value
+    def reward(self, queryable, successes_num, queries_num, server_seconds):
+        """Report outcomes of queries of the queryable, see QueryGroupScheduler."""
+        self._scheduler.reward(query_group_key(queryable), successes_num, queries_num, server_seconds)
 
     def select(self):
-        if self._is_score_stagnating():
-            selection = Selection(None, random.choice(list(self._entities.all())))
+        queryable = self._select_queryable()
+        entity_set_name = queryable.entity_set.name
+        if self._is_score_stagnating(entity_set_name):
+            selection = Selection(None, queryable)
         else:
-            selection = self._crossable_selection()
-        self._passed_iterations += 1
+            selection = Selection(self._get_crossable(queryable), queryable)
+        self._passed_iterations[entity_set_name] = self._passed_iterations.get(entity_set_name, 0) + 1
 
         return selection
 
-    def _crossable_selection(self):
-        queryable = random.choice(list(self._entities.all()))
-        crossable = self._get_crossable(queryable)
-        selection = Selection(crossable, queryable)
-        return selection
+    def _select_queryable(self):
+        """Pick a queryable by the scheduler; queryables whose queries keep finding new responses quickly are
+        picked more often."""
+        return self._scheduler.select()
+
+    def _is_score_stagnating(self, entity_set_name):
+        """Tell whether the average score of the entity set has not risen enough since its previous check.
 
-    def _is_score_stagnating(self):
-        if self._passed_iterations > ITERATIONS_THRESHOLD:
-            self._passed_iterations = 0
-            current_average = self._database.total_score() / self._database.total_entries()
-            old_average = self._score_average
-            self._score_average = current_average
+        The check is made after every ITERATIONS_THRESHOLD selections of the entity set, so that crossing parents
+        of a stagnating entity set is replaced by generating new queries without regard to other entity sets.
+        """
+        if self._passed_iterations.get(entity_set_name, 0) > ITERATIONS_THRESHOLD:
+            self._passed_iterations[entity_set_name] = 0
+            current_average = self._score_average(entity_set_name)
+            old_average = self._score_averages.get(entity_set_name, 0)
+            self._score_averages[entity_set_name] = current_average
             if (current_average - old_average) < SCORE_EPS:
                 return True
         return False
 
+    def _score_average(self, entity_set_name):
+        entries_num = self._database.total_entries(entity_set_name)
+        if entries_num == 0:
+            return 0
+        return self._database.total_score(entity_set_name) / entries_num
+
     def _get_crossable(self, queryable):
         entity_set_name = queryable.entity_set.name
         parent1 = self._database.sample_filter_entry(entity_set_name, None)
@@ -932,30 +1510,65 @@ class Analyzer:
 
     def __init__(self, database):
         self._database = database
-        self._population_score = 0
+        self._predecessor_scores = ScoreCache(PREDECESSOR_CACHE_SIZE)
+
+    def remember_parents(self, parents):
+        """Cache scores of the parents selected for the crossover, so that their offspring are compared with them
+        without fetching the parents again."""
+        for parent in parents:
+            self._predecessor_scores.put(parent['_id'], parent['score'])
 
     def analyze(self, query):
         new_score = FitnessEvaluator.evaluate(query)
         query[0].score = new_score
-        self._update_population_score(new_score)
         predecessors_ids = query[0].dictionary['predecessors']
         if predecessors_ids:
             offspring = self._build_offspring_by_score(predecessors_ids, query[0], new_score)
         else:
             offspring = EmptyOffspring(self._database)
+        if query[0].mutations:
+            Stats.mutation_operators.reward(query[0].mutations, isinstance(offspring, BetterOffspring))
         return offspring
 
     def _build_offspring_by_score(self, predecessors_id, query, new_score):
         for predecessor_id in predecessors_id:
-            if self._database.find_entry(predecessor_id)['score'] < new_score:
+            predecessor_score = self._predecessor_score(predecessor_id)
+            if predecessor_score is not None and predecessor_score < new_score:
                 return BetterOffspring(self._database, predecessor_id)
         return WorseOffspring(query)
 
-    def _update_population_score(self, query_score):
-        if self._population_score == 0:
-            self._population_score = self._database.total_score()
-        else:
-            self._population_score += query_score
+    def _predecessor_score(self, predecessor_id):
+        score = self._predecessor_scores.get(predecessor_id)
+        if score is not None:
+            Stats.predecessor_cache_hits += 1
+            return score
+        Stats.predecessor_cache_misses += 1
+        predecessor = self._database.find_entry(predecessor_id)
+        if predecessor is None:
+            # the predecessor has already been slain
+            return None
+        self._predecessor_scores.put(predecessor_id, predecessor['score'])
+        return predecessor['score']
+
+
+class ScoreCache:
+    """A cache of scores of the least recently used entries; a score of a saved entry never changes."""
+
+    def __init__(self, size):
+        self._size = size
+        self._scores = OrderedDict()
+
+    def get(self, id):
+        score = self._scores.get(id)
+        if score is not None:
+            self._scores.move_to_end(id)
+        return score
+
+    def put(self, id, score):
+        self._scores[id] = score
+        self._scores.move_to_end(id)
+        if len(self._scores) > self._size:
+            self._scores.popitem(last=False)
 
 
 class Offspring(metaclass=ABCMeta):
@@ -1040,9 +1653,10 @@ class FitnessEvaluator:
 
     @staticmethod
     def eval_http_response_time(response):
-        if not response.headers.get('content-length'):
+        content_length = getattr(response, 'content_length', None) or response.headers.get('content-length')
+        if not content_length:
             return 0
-        if int(response.headers['content-length']) > CONTENT_LEN_SIZE:
+        if int(content_length) > CONTENT_LEN_SIZE:
             return -10
         total_seconds = response.elapsed.total_seconds()
         score = total_seconds / 10
@@ -1089,6 +1703,7 @@ class Query:
         self._dict = None
         self._score = None
         self._predecessors = []
+        self._mutations = []
         self._order = []
         self._response = None
         self._parts = 0
@@ -1134,6 +1749,10 @@ class Query:
     def predecessors(self):
         return self._predecessors
 
+    @property
+    def mutations(self):
+        return self._mutations
+
     @property
     def order(self):
         return self._order
@@ -1216,6 +1835,7 @@ class Query:
             'accessible_keys': self._accessible_entity.key_pairs,
             'predecessors': self._predecessors,
             'string': self._query_string,
+            'url_hash': self._url_hash,
             'score': self._score,
             'order': self._order,
             '_$orderby': self._options.get(ORDERBY),
@@ -1243,18 +1863,29 @@ class HashGenerator:
 class Dispatcher:
     """A dispatcher for sending HTTP requests to the particular OData service."""
 
-    def __init__(self, arguments):
+    def __init__(self, arguments, entity_set_rates=None):
         self._config = Config.dispatcher
 
         self._logger = logging.getLogger(FUZZER_LOGGER)
         self._service = arguments.service.rstrip('/') + '/'
 
+        if self._config.adaptive_concurrency:
+            min_limit = MIN_ASYNC_REQUESTS_NUM
+            max_limit = max(self._config.async_requests_max, self._config.async_requests_num)
+        else:
+            min_limit = max_limit = self._config.async_requests_num
+        self._concurrency = ConcurrencyController(self._config.async_requests_num, min_limit, max_limit)
+        self._max_rps = arguments.max_rps
+        self._entity_set_rates = entity_set_rates or {}
+        self._rate_limiter = RateLimiter(self._max_rps, self._entity_set_rates)
+
+        # connections are opened lazily, the pool is sized to the highest limit the controller may reach
         self._session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(pool_connections=self._config.async_requests_num,
-                                                pool_maxsize=self._config.async_requests_num)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_limit, pool_maxsize=max_limit)
         self._session.mount(ACCESS_PROTOCOL, adapter)
         self._session.verify = self._get_sap_certificate()
         self._session.headers.update({'user-agent': 'odfuzz/1.0'})
+        self._csrf_token = None
 
         self._init_auth_credentials(arguments.credentials)
 
@@ -1262,23 +1893,94 @@ class Dispatcher:
     def service(self):
         return self._service
 
-    def send(self, method, query, **kwargs):
+    @property
+    def concurrency(self):
+        return self._concurrency
+
+    def prepare_for_workers(self, workers_num, shared_entity_sets=False):
+        """Prepare the dispatcher to be inherited by forked worker processes.
+
+        Opened connections cannot be shared between processes, so they are closed and every worker opens its own.
+        The rate limit of the whole service is split among the workers. Rate limits of entity sets are split only if
+        every worker fuzzes all entity sets (islands); otherwise, every entity set is fuzzed by one worker only.
+        """
+        self._session.close()
+        max_rps = self._max_rps / workers_num if self._max_rps else None
+        entity_set_rates = self._entity_set_rates
+        if shared_entity_sets:
+            entity_set_rates = {name: rate / workers_num for name, rate in entity_set_rates.items()}
+        self._rate_limiter = RateLimiter(max_rps, entity_set_rates)
+
+    def send(self, method, query, entity_set_name=None, **kwargs):
+        self._rate_limiter.acquire(entity_set_name)
+        return self._request(method, query, **kwargs)
+
+    def get(self, query, **kwargs):
+        return self.send('GET', query, **kwargs)
+
+    def post(self, query, **kwargs):
+        return self.send('POST', query, **kwargs)
+
+    def batch(self, queries, entity_set_names, **kwargs):
+        """Send the GET queries as one multipart $batch request and return a list of responses to the queries."""
+        for entity_set_name in entity_set_names:
+            self._rate_limiter.acquire(entity_set_name)
+
+        builder = BatchRequestBuilder(queries)
+        body = builder.build()
+        headers = {'Content-Type': builder.content_type}
+        batch_response = self._send_modifying_request(self._batch_path(), body, headers, **kwargs)
+
+        urls = [self._service + query for query in queries]
+        responses = BatchResponseParser(batch_response, urls).parse()
+        for response in responses:
+            self._logger.info('Received HTTP {} from {} (response time estimated from $batch)'
+                              .format(response.status_code, response.url))
+        return responses
+
+    def _batch_path(self):
+        if Config.fuzzer.sap_client:
+            return '$batch?sap-client=' + Config.fuzzer.sap_client
+        return '$batch'
+
+    def _send_modifying_request(self, query, body, headers, **kwargs):
+        """POST the body with a CSRF token which SAP Gateway requires for all modifying requests."""
+        if self._csrf_token is None:
+            self._fetch_csrf_token()
+        if self._csrf_token:
+            headers['X-CSRF-Token'] = self._csrf_token
+        response = self._request('POST', query, data=body, headers=headers, **kwargs)
+        if response.status_code == 403 and response.headers.get('x-csrf-token', '').lower() == 'required':
+            self._fetch_csrf_token()
+            headers['X-CSRF-Token'] = self._csrf_token
+            response = self._request('POST', query, data=body, headers=headers, **kwargs)
+        return response
+
+    def _fetch_csrf_token(self):
+        response = self._request('GET', '', headers={'X-CSRF-Token': 'Fetch'}, timeout=REQUEST_TIMEOUT)
+        self._csrf_token = response.headers.get('x-csrf-token', '')
+
+    def _request(self, method, query, bytes_limit=None, **kwargs):
+        """Send the request; if bytes_limit is set, the body is streamed and only its first bytes_limit bytes are kept."""
         url = self._service + query
+        self._concurrency.acquire()
         try:
-            response = self._session.request(method, url, **kwargs)
+            if bytes_limit is None:
+                response = self._session.request(method, url, **kwargs)
+            else:
+                response = self._session.request(method, url, stream=True, **kwargs)
+                read_bounded_content(response, bytes_limit)
         except requests.exceptions.RequestException as requests_ex:
+            self._concurrency.record_failure()
             self._logger.error('An exception {} was raised'.format(requests_ex))
             raise DispatcherError('An exception was raised while sending HTTP {}: {}'
                                   .format(method, requests_ex))
+        finally:
+            self._concurrency.release()
+        self._concurrency.record_response(response.elapsed.total_seconds(), response.status_code)
         self._logger.info('Received HTTP {} from {}'.format(response.status_code, url))
         return response
 
-    def get(self, query, **kwargs):
-        return self.send('GET', query, **kwargs)
-
-    def post(self, query, **kwargs):
-        return self.send('POST', query, **kwargs)
-
     def _get_sap_certificate(self):
         certificate_path = None
         if self._config.has_certificate:
@@ -1299,6 +2001,242 @@ class Dispatcher:
             self._session.auth = (os.getenv(ENV_USERNAME), os.getenv(ENV_PASSWORD))
 
 
+class TokenBucket:
+    """A token bucket which paces callers to the given number of calls per second.
+
+    Every caller reserves a token immediately and sleeps until the reserved token would be refilled,
+    so concurrent greenlets are served in the order they asked and nobody polls the bucket.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self._rate = rate
+        self._capacity = capacity if capacity else max(1.0, rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def acquire(self):
+        self._refill()
+        self._tokens -= 1
+        if self._tokens < 0:
+            gevent.sleep(-self._tokens / self._rate)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """Rate limits for the whole service (--max-rps) and for particular entity sets (restrictions file)."""
+
+    def __init__(self, max_rps, entity_set_rates):
+        self._service_bucket = TokenBucket(max_rps) if max_rps else None
+        self._entity_set_buckets = {name: TokenBucket(rate) for name, rate in entity_set_rates.items()}
+
+    def acquire(self, entity_set_name=None):
+        entity_set_bucket = self._entity_set_buckets.get(entity_set_name)
+        if entity_set_bucket:
+            entity_set_bucket.acquire()
+        if self._service_bucket:
+            self._service_bucket.acquire()
+
+
+class ConcurrencyController:
+    """An AIMD controller of the number of requests which may be in flight at the same time.
+
+    The limit grows by one after every window of responses whose 95th percentile of response time stays
+    close to the usual one. It is cut by CONCURRENCY_DECREASE_FACTOR when a request fails, the server answers
+    with HTTP 429 or 503, or the response time rises. Overload signals of requests that were already in flight
+    during a decrease are ignored, so one burst of failures shrinks the limit only once.
+    """
+
+    def __init__(self, initial_limit, min_limit, max_limit):
+        self._logger = logging.getLogger(FUZZER_LOGGER)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._limit = min(max(initial_limit, min_limit), max_limit)
+        self._in_flight = 0
+        self._slot_released = Event()
+        self._window = []
+        self._latency_baseline = None
+        self._ignored_signals = 0
+
+    @property
+    def limit(self):
+        return self._limit
+
+    @property
+    def max_limit(self):
+        return self._max_limit
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self):
+        """Wait until the number of requests in flight drops below the current limit."""
+        while self._in_flight >= self._limit:
+            self._slot_released.clear()
+            self._slot_released.wait()
+        self._in_flight += 1
+
+    def release(self):
+        self._in_flight -= 1
+        self._slot_released.set()
+
+    def record_response(self, elapsed_seconds, status_code):
+        if self._ignored_signals:
+            self._ignored_signals -= 1
+            return
+        if status_code in OVERLOAD_STATUS_CODES:
+            self._decrease('HTTP {}'.format(status_code))
+            return
+        self._window.append(elapsed_seconds)
+        if len(self._window) >= max(self._limit, CONCURRENCY_WINDOW_SIZE):
+            self._evaluate_window()
+
+    def record_failure(self):
+        if self._ignored_signals:
+            self._ignored_signals -= 1
+            return
+        self._decrease('failed request')
+
+    def _evaluate_window(self):
+        latency = percentile(self._window, 95)
+        self._window = []
+        if self._latency_baseline is None:
+            self._latency_baseline = latency
+            return
+        if latency > self._latency_baseline * CONCURRENCY_LATENCY_TOLERANCE:
+            self._decrease('rising response time ({:.3f}s)'.format(latency))
+        else:
+            self._set_limit(self._limit + 1, 'stable response time ({:.3f}s)'.format(latency))
+        # a moving baseline absorbs lasting changes, e.g. when the fuzzer moves on to a slower entity set
+        self._latency_baseline += CONCURRENCY_BASELINE_WEIGHT * (latency - self._latency_baseline)
+
+    def _decrease(self, reason):
+        self._window = []
+        self._ignored_signals = self._in_flight
+        self._set_limit(math.floor(self._limit * CONCURRENCY_DECREASE_FACTOR), reason)
+
+    def _set_limit(self, limit, reason):
+        limit = min(max(limit, self._min_limit), self._max_limit)
+        if limit != self._limit:
+            self._logger.info('Concurrency limit changed from {} to {}: {}'.format(self._limit, limit, reason))
+            self._limit = limit
+            self._slot_released.set()
+
+
+class DispatchPipeline:
+    """A long-lived group of greenlets that keeps a fixed number of requests in flight.
+
+    Queries are submitted to a bounded work queue and picked up by the first idle greenlet. Completed
+    queries are collected separately together with the handler they were submitted with, so that the
+    caller can analyze them as they arrive instead of waiting for the slowest request of a batch.
+    """
+
+    def __init__(self, send_query, size):
+        self._send_query = send_query
+        self._pending = Queue(maxsize=size)
+        self._completed = Queue()
+        self._unfinished = 0
+        self._workers = [gevent.spawn(self._work) for _ in range(size)]
+
+    @property
+    def unfinished(self):
+        return self._unfinished
+
+    def submit(self, query, handler):
+        """Enqueue the query; block while the work queue is full."""
+        self._unfinished += 1
+        self._pending.put((query, handler))
+
+    def completed(self):
+        """Yield pairs (query, handler) of queries that are already completed, without blocking.
+
+        Queries which could not be sent at all are skipped.
+        """
+        while not self._completed.empty():
+            query, handler, sent = self._take_completed()
+            if sent:
+                yield query, handler
+
+    def join(self):
+        """Yield pairs (query, handler) until every submitted query is completed."""
+        while self._unfinished:
+            query, handler, sent = self._take_completed()
+            if sent:
+                yield query, handler
+
+    def stop(self, timeout=0):
+        """Stop sending queries; queries in flight get timeout seconds to complete, the others are dropped.
+
+        Queries which have not been picked up by a greenlet yet are dropped at once. Completed queries can still
+        be taken by completed(). Return the number of dropped queries.
+        """
+        while not self._pending.empty():
+            self._pending.get_nowait()
+        # every greenlet exits when it takes a stop mark instead of a query
+        for _ in self._workers:
+            self._pending.put_nowait(None)
+        gevent.joinall(self._workers, timeout=timeout)
+        gevent.killall(self._workers)
+        dropped_num = self._unfinished - self._completed.qsize()
+        self._unfinished -= dropped_num
+        return dropped_num
+
+    def _take_completed(self):
+        query, handler, sent, error = self._completed.get()
+        self._unfinished -= 1
+        if error:
+            raise error
+        return query, handler, sent
+
+    def _work(self):
+        while True:
+            submitted = self._pending.get()
+            if submitted is None:
+                return
+            query, handler = submitted
+            try:
+                sent = self._send_query(query)
+            except Exception as ex:  # pylint: disable=broad-except
+                # re-raised by the consumer, a dead worker would block join() forever
+                self._completed.put((query, handler, False, ex))
+            else:
+                self._completed.put((query, handler, sent, None))
+
+
+class RetryPolicy:
+    """Exponential backoff with a full jitter for re-sending queries that could not be dispatched.
+
+    Only the failed query is re-sent, responses of other queries are kept. Jitter spreads retries of
+    concurrently failed requests in time, so a struggling server is not hit by all of them at once.
+    """
+
+    def __init__(self, max_attempts, base_delay, max_delay):
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        # a separate generator keeps the sequence of generated queries reproducible by the seed
+        self._random = random.Random()
+
+    @property
+    def max_attempts(self):
+        return self._max_attempts
+
+    def can_retry(self, attempt):
+        return attempt < self._max_attempts
+
+    def delay(self, attempt):
+        upper_bound = min(self._max_delay, self._base_delay * 2 ** (attempt - 1))
+        return self._random.uniform(0, upper_bound)
+
+
 class LoggerErrorWritter:
     """ """
     def __init__(self, logger):
@@ -1325,6 +2263,50 @@ def is_filter_crossable(query1, query2):
     return crossable
 
 
+def read_bounded_content(response, bytes_limit):
+    """Read the streamed body of the response and keep only its first bytes_limit bytes as the content.
+
+    Reading stops as soon as the limit is exceeded and the connection is closed, so the rest of a longer body is
+    never downloaded. The attribute `truncated` tells whether the content is just a prefix of the body. The length
+    of the decoded body is stored in the attribute `content_length`. The length of a truncated body is known only
+    if the server declares it in the header Content-Length and the body is not compressed (the header counts
+    compressed bytes); otherwise, the number of bytes read is stored as a lower bound of the length.
+    """
+    prefix = bytearray()
+    read_length = 0
+    for chunk in response.iter_content(RESPONSE_CHUNK_SIZE):
+        read_length += len(chunk)
+        prefix.extend(chunk[:bytes_limit - len(prefix)])
+        if read_length > bytes_limit:
+            break
+    response.close()
+
+    response._content = bytes(prefix)  # pylint: disable=protected-access
+    response._content_consumed = True  # pylint: disable=protected-access
+    truncated = read_length > bytes_limit
+    content_length = read_length
+    declared_length = response.headers.get('content-length')
+    if truncated and declared_length and response.headers.get('content-encoding', 'identity') == 'identity':
+        content_length = max(int(declared_length), read_length)
+    setattr(response, 'content_length', content_length)
+    setattr(response, 'truncated', truncated)
+
+
+def response_length(response):
+    """Return the real length of the response body, even if only a prefix of the body was kept."""
+    content_length = getattr(response, 'content_length', None)
+    if content_length is None:
+        return len(response.content)
+    return content_length
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a non-empty sequence of values."""
+    ordered_values = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered_values))
+    return ordered_values[max(rank, 1) - 1]
+
+
 def build_filter_string(filter_data):
     filter_option = FilterOption(filter_data['logicals'],
                                  filter_data['parts'],
@@ -1341,14 +2323,6 @@ def build_xpath_format_string(*args):
     return xpath_string
 
 
-def is_removable(option_value, part_id):
-    for part in option_value['parts']:
-        if part['id'] == part_id:
-            return part.get('replaceable', True)
-
-    for logical in option_value['logicals']:
-        if logical.get('group_id', '') == part_id:
-            left_id = is_removable(option_value, logical['left_id'])
-            right_id = is_removable(option_value, logical['right_id'])
-            return right_id and left_id
-    return True
\ No newline at end of file
+def query_group_key(queryable):
+    """Identify the query group, e.g. in the seeding progress; one entity set is queried by several query groups."""
+    return '{}:{}'.format(type(queryable).__name__, queryable.entity_set.name)
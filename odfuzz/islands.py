@@ -0,0 +1,138 @@
+"""This module contains an island model of the population; islands evolve separately and exchange their best queries."""
+
+import os
+import logging
+
+from bson import json_util
+
+from odfuzz.statistics import Stats
+from odfuzz.constants import FUZZER_LOGGER, MIGRATION_INTERVAL, MIGRATION_SIZE, MIGRATION_READ_SIZE
+
+
+def island_collection_name(collection_name, index):
+    return '{}-island{}'.format(collection_name, index)
+
+
+class MigrationRing:
+    """Pipes which connect islands into a ring; every island sends its migrants to the next island.
+
+    The ring has to be created before the islands are forked. Every island keeps only the ends of its own channel,
+    the parent process closes all of them when the islands exit.
+    """
+
+    def __init__(self, islands_num):
+        self._pipes = [os.pipe() for _ in range(islands_num)]
+
+    def connect(self, index):
+        """Return the channel of the island; it is called in the process of the island."""
+        read_fd = self._pipes[index][0]
+        write_fd = self._pipes[(index + 1) % len(self._pipes)][1]
+        self._close({read_fd, write_fd})
+        return MigrationChannel(read_fd, write_fd)
+
+    def close(self):
+        self._close(set())
+
+    def _close(self, kept_fds):
+        for pipe in self._pipes:
+            for fd in pipe:
+                if fd not in kept_fds:
+                    os.close(fd)
+        self._pipes = []
+
+
+class MigrationChannel:
+    """Non-blocking ends of the ring held by an island; migrants are sent as lines of JSON.
+
+    The migration is best effort. Migrants are dropped if the previous ones have not been read yet, e.g. because
+    the next island has exited, so that neither the pipe nor the memory of the island can grow without bounds.
+    """
+
+    def __init__(self, read_fd, write_fd):
+        os.set_blocking(read_fd, False)
+        os.set_blocking(write_fd, False)
+        self._read_fd = read_fd
+        self._write_fd = write_fd
+        self._received = b''
+        self._unsent = b''
+
+    def send(self, entries):
+        """Send the entries to the next island; return False if they were dropped."""
+        self._write_unsent()
+        if self._unsent:
+            return False
+        self._unsent = json_util.dumps(entries).encode('utf-8') + b'\n'
+        self._write_unsent()
+        return True
+
+    def receive(self):
+        """Return all entries which have been received from the previous island since the last call."""
+        while True:
+            try:
+                data = os.read(self._read_fd, MIGRATION_READ_SIZE)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            self._received += data
+        *messages, self._received = self._received.split(b'\n')
+        return [entry for message in messages for entry in json_util.loads(message.decode('utf-8'))]
+
+    def _write_unsent(self):
+        try:
+            while self._unsent:
+                written_num = os.write(self._write_fd, self._unsent)
+                self._unsent = self._unsent[written_num:]
+        except BlockingIOError:
+            pass
+        except BrokenPipeError:
+            # the next island has exited
+            self._unsent = b''
+
+
+class Island:
+    """An island of the island model of the genetic algorithm.
+
+    Every island evolves its own population over all entity sets in its own process, so the islands do not contend
+    for one collection. The population is seeded with a partition of the entity sets only, so the populations of
+    islands start diverse. After every interval generations (iterations of the
+    genetic loop), the island sends copies of its size best queries to the next island of the ring and settles
+    the queries received from the previous one, which replace its weakest queries.
+    """
+
+    def __init__(self, index, channel, interval=MIGRATION_INTERVAL, size=MIGRATION_SIZE):
+        self._logger = logging.getLogger(FUZZER_LOGGER)
+        self._index = index
+        self._channel = channel
+        self._interval = interval
+        self._size = size
+        self._generations_num = 0
+
+    def evolved(self, database):
+        """Count a finished generation and exchange migrants if the migration is due."""
+        self._generations_num += 1
+        if self._generations_num % self._interval == 0:
+            self._emigrate(database)
+            self._immigrate(database)
+
+    def _emigrate(self, database):
+        migrants = database.find_top_entries(self._size)
+        if not self._channel.send(migrants):
+            self._logger.info('Island {} dropped its migrants, the next island does not take them in'
+                              .format(self._index))
+
+    def _immigrate(self, database):
+        migrants = self._channel.receive()
+        if not migrants:
+            return
+        entries_num = database.total_entries()
+        for migrant in migrants:
+            # the identifier is assigned by the population of this island; queries already present are skipped
+            migrant.pop('_id', None)
+            database.save_entry(migrant)
+        # buffered duplicates are discounted when they are written
+        database.flush()
+        settled_num = database.total_entries() - entries_num
+        database.delete_worst_entries(settled_num)
+        Stats.migrants_num += settled_num
+        self._logger.info('Island {} settled {} of {} migrants'.format(self._index, settled_num, len(migrants)))
@@ -13,7 +13,7 @@ from odfuzz.constants import FUZZER_LOGS_NAME, STATS_LOGS_NAME, FILTER_LOGS_NAME
 
 NONE_TYPE_POSSIBLE = 'n'
 
-Directories = namedtuple('directories', 'logs stats')
+Directories = namedtuple('directories', 'logs stats checkpoints')
 
 
 class DirectoriesCreator:
@@ -31,7 +31,9 @@ class DirectoriesCreator:
             stats_path = build_directory_path(self._stats_directory)
             make_directory(stats_path)
 
-        return Directories(logs_path, stats_path)
+        # checkpoints have to be found by the next run, which writes its statistics to a new subdirectory
+        checkpoints_path = self._stats_directory or os.getcwd()
+        return Directories(logs_path, stats_path, checkpoints_path)
 
 
 def init_loggers(logs_directory, stats_directory):
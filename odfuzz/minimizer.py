@@ -0,0 +1,155 @@
+"""This module contains a minimizer which reduces a query causing a server error to the shortest one causing it."""
+
+import re
+
+from copy import deepcopy
+
+import gevent.pool
+
+from odfuzz.entities import FilterOptionDeleter, is_removable
+from odfuzz.constants import FILTER, ORDERBY, EXPAND, SEARCH, MINIMIZATION_ROUNDS
+
+NUMBER_LITERAL = re.compile(r'^([-+]?)(\d+)(\.\d+)?([a-zA-Z]?)$')
+STRING_LITERAL = re.compile(r'^([\'"])(.*)\1$', re.DOTALL)
+
+
+class FailureMinimizer:
+    """Delta debugging of a query which caused a server error.
+
+    Every round derives queries which are one step smaller than the current one (a dropped option, a removed part of
+    the $filter option, a shortened operand, ...), sends them concurrently and continues with the shortest one which
+    still reproduces the failure. The minimization stops when none of them reproduces it or after the given number
+    of rounds.
+
+    The minimizer does not send the queries itself; `build_query` builds a query from an entry (the order of options
+    and their values, see smaller_entries()) and `reproduces` sends the query and tells whether the failure occurred.
+    """
+
+    def __init__(self, build_query, reproduces, concurrency, rounds=MINIMIZATION_ROUNDS):
+        self._build_query = build_query
+        self._reproduces = reproduces
+        self._concurrency = concurrency
+        self._rounds = rounds
+
+    def minimize(self, query, entry, is_option_deletable):
+        """Return the shortest query found which reproduces the failure of the query; the entry describes it."""
+        for _ in range(self._rounds):
+            candidates = self._build_candidates(query.query_string, entry, is_option_deletable)
+            if not candidates:
+                break
+            pool = gevent.pool.Pool(self._concurrency)
+            results = pool.map(lambda candidate: self._reproduces(candidate[1]), candidates)
+            reproducing = [candidate for candidate, reproduced in zip(candidates, results) if reproduced]
+            if not reproducing:
+                break
+            entry, query = min(reproducing, key=lambda candidate: len(candidate[1].query_string))
+        return query
+
+    def _build_candidates(self, query_string, entry, is_option_deletable):
+        candidates = {}
+        for smaller_entry in smaller_entries(entry, is_option_deletable):
+            candidate = self._build_query(smaller_entry)
+            if len(candidate.query_string) < len(query_string):
+                candidates.setdefault(candidate.query_string, (smaller_entry, candidate))
+        return list(candidates.values())
+
+
+def smaller_entries(entry, is_option_deletable):
+    """Yield copies of the entry which are smaller by one step.
+
+    The entry holds the order of query options (e.g. ['_$filter', '_$top']) and the values of the options stored
+    under the same keys, as entries of the population do. Names of the options are passed to is_option_deletable
+    without the leading underscore.
+    """
+    for option_key in entry['order']:
+        option_name = option_key[1:]
+        if is_option_deletable(option_name):
+            smaller_entry = deepcopy(entry)
+            smaller_entry['order'].remove(option_key)
+            smaller_entry[option_key] = None
+            yield smaller_entry
+
+        if option_name == FILTER:
+            values = smaller_filters(entry[option_key])
+        elif option_name in (ORDERBY, EXPAND):
+            values = smaller_lists(entry[option_key])
+        else:
+            value = shorten_value(entry[option_key])
+            if value is None and option_name == SEARCH:
+                value = shorten_string(entry[option_key])
+            values = [value] if value is not None else []
+        for value in values:
+            smaller_entry = deepcopy(entry)
+            smaller_entry[option_key] = value
+            yield smaller_entry
+
+
+def smaller_filters(filter_data):
+    """Yield copies of the $filter option without one removable part or with one shortened operand."""
+    for index, logical in enumerate(filter_data['logicals']):
+        for adjacent_id in ('left_id', 'right_id'):
+            if is_removable(filter_data, logical[adjacent_id]):
+                smaller_filter = deepcopy(filter_data)
+                smaller_logical = smaller_filter['logicals'].pop(index)
+                FilterOptionDeleter(smaller_filter, smaller_logical).remove_adjacent(adjacent_id)
+                yield smaller_filter
+
+    for index, part in enumerate(filter_data['parts']):
+        operand = shorten_value(part.get('operand'))
+        if operand is not None:
+            smaller_filter = deepcopy(filter_data)
+            smaller_filter['parts'][index]['operand'] = operand
+            yield smaller_filter
+        for param_index, param in enumerate(part.get('params') or []):
+            param = shorten_value(param)
+            if param is not None:
+                smaller_filter = deepcopy(filter_data)
+                smaller_filter['parts'][index]['params'][param_index] = param
+                yield smaller_filter
+
+
+def smaller_lists(values):
+    """Yield copies of the $orderby or $expand option without one item or without one sorting order."""
+    for index, value in enumerate(values):
+        if len(values) > 1:
+            yield values[:index] + values[index + 1:]
+        # items of the $orderby option are pairs [property, order]
+        if isinstance(value, list) and value[1]:
+            yield values[:index] + [[value[0], '']] + values[index + 1:]
+
+
+def shorten_value(value):
+    """Return a number or a string literal shortened by half, or None if the value cannot be shortened.
+
+    A number loses its fractional part first; a literal keeps its quotes, so the type of the value does not change.
+    Other values (e.g. true, datetime'...' or guid'...') are never shortened.
+    """
+    if not isinstance(value, str):
+        return None
+
+    number = NUMBER_LITERAL.match(value)
+    if number:
+        sign, digits, fraction, suffix = number.groups()
+        if fraction:
+            return sign + digits + suffix
+        if len(digits) > 1:
+            return sign + digits[:len(digits) // 2] + suffix
+        return None
+
+    literal = STRING_LITERAL.match(value)
+    if literal:
+        quote, content = literal.groups()
+        if not content:
+            return None
+        shortened = content[:len(content) // 2]
+        # a quote inside a literal is escaped by doubling it, an escaping quote cannot be left alone at the end
+        if (len(shortened) - len(shortened.rstrip(quote))) % 2:
+            shortened = shortened[:-1]
+        return quote + shortened + quote
+    return None
+
+
+def shorten_string(value):
+    if not isinstance(value, str) or len(value) < 2:
+        return None
+    return value[:len(value) // 2]
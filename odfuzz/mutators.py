@@ -5,6 +5,7 @@ from dateutil.relativedelta import relativedelta
 
 from odfuzz.constants import BASE_CHARSET, HEX_BINARY, INT_MAX
 from odfuzz.encoders import EncoderMixin
+from odfuzz.statistics import Stats
 
 
 class Mutator:
@@ -12,11 +13,11 @@ class Mutator:
 
     @classmethod
     def _mutate(cls, proprty, value):
-        """Select a random mutation function from the list of all available functions."""
+        """Select a mutation function from the list of all available functions by the learned weights."""
         if not cls._methods:
             cls._methods = [name for name in cls.__dict__ if not name.startswith('_')]
 
-        chosen_mutator = random.choice(cls._methods)
+        chosen_mutator = Stats.mutation_operators.choose(cls.__name__, cls._methods)
         mutated_value = getattr(cls, chosen_mutator)(proprty, value)
         return cls._normalize_format(cls._encode_value(mutated_value))
 
@@ -276,7 +277,7 @@ class DateTimeMutator:
     def _mutate(proprty, value):
         if not DateTimeMutator._methods:
             DateTimeMutator._methods = [func_name for func_name in DateTimeMutator.__dict__ if not func_name.startswith('_')]
-        func_name = random.choice(DateTimeMutator._methods)
+        func_name = Stats.mutation_operators.choose('DateTimeMutator', DateTimeMutator._methods)
         mutated_value = getattr(DateTimeMutator, func_name)(proprty, value)
         return mutated_value
 
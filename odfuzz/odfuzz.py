@@ -14,7 +14,7 @@ from odfuzz.arguments import ArgParser
 from odfuzz.fuzzer import Manager
 from odfuzz.statistics import Stats, StatsPrinter
 from odfuzz.loggers import init_loggers, DirectoriesCreator
-from odfuzz.databases import CollectionCreator, MongoDB, MongoDBHandler
+from odfuzz.databases import CollectionCreator
 from odfuzz.constants import INFINITY_TIMEOUT
 from odfuzz.exceptions import ArgParserError, ODfuzzException
 
@@ -35,15 +35,17 @@ def execute(arguments, bind=None):
     collection_name = create_collection_name(parsed_arguments)
     logging.info('Database\'s collection set to {}'.format(collection_name))
 
-    set_signal_handler(collection_name)
+    manager = Manager(bind, parsed_arguments, collection_name)
+    set_signal_handler()
 
-    run_fuzzer(bind, parsed_arguments, collection_name)
+    run_fuzzer(manager, parsed_arguments, collection_name)
 
 
 def init_logging(arguments):
     directories_creator = DirectoriesCreator(arguments.logs, arguments.stats)
     directories = directories_creator.create()
     init_basic_stats(directories.stats) #TODO refactor, this part exposes some inner state in Stats class
+    Stats.checkpoints_directory = directories.checkpoints
     init_loggers(directories.logs, directories.stats)
 
 
@@ -54,6 +56,8 @@ def init_basic_stats(stats_directory):
 
 # Sets MongoDB collection name to be used in current run.
 def create_collection_name(parsed_arguments):
+    if parsed_arguments.resume:
+        return parsed_arguments.resume
     service_parts = parsed_arguments.service.rstrip('/').rsplit('/', 1)
     if len(service_parts) == 1:
         service_name = service_parts[0]
@@ -64,19 +68,20 @@ def create_collection_name(parsed_arguments):
     return collection_name
 
 
-def set_signal_handler(db_collection_name):
-    gevent.signal_handler(signal.SIGINT, signal_handler, db_collection_name)
+def set_signal_handler():
+    # the fuzzing greenlet is interrupted and it stops the fuzzer itself (see run_fuzzer), so that no other greenlet
+    # takes responses of the dispatched queries meanwhile
+    gevent.signal_handler(signal.SIGINT, gevent.kill, gevent.getcurrent(), KeyboardInterrupt)
 
 
-def run_fuzzer(bind, parsed_arguments, collection_name):
+def run_fuzzer(manager, parsed_arguments, collection_name):
     """ This is the main gevent thread for the odfuzz process.)
 
-    :param bind: # Argument 'bind' can be used for binding the standard ooutput of this process instance to another process, e.g. celery (ODfuzz-server)
+    :param manager: # Manager of the fuzzer runtime; its argument 'bind' can be used for binding the standard ooutput of this process instance to another process, e.g. celery (ODfuzz-server)
     :param parsed_arguments:
     :param collection_name:
     :return:
     """
-    manager = Manager(bind, parsed_arguments, collection_name)
     try:
         if parsed_arguments.timeout == INFINITY_TIMEOUT:
             manager.start()
@@ -85,20 +90,26 @@ def run_fuzzer(bind, parsed_arguments, collection_name):
     except ODfuzzException as ex:
         sys.stderr.write(str(ex) + '\n')
         sys.exit(1)
-    except gevent.Timeout:
-        signal_handler(collection_name)
+    except (gevent.Timeout, KeyboardInterrupt):
+        signal_handler(collection_name, manager)
     except Exception:
         logging.error(traceback.format_exc())
         print(traceback.format_exc())
         sys.exit(1)
 
 
-def signal_handler(db_collection_name):
+def signal_handler(db_collection_name, manager):
     exit_message = 'Program interrupted. Exiting...'
     logging.info(exit_message)
     sys.stdout.write('\n' + exit_message + '\n')
 
-    stats = StatsPrinter(MongoDBHandler, MongoDB, db_collection_name)
+    manager.stop_fuzzing()
+    manager.finish_minimizations()
+    manager.flush_database()
+    manager.save_checkpoint()
+
+    database_handler, database_client = manager.database_classes
+    stats = StatsPrinter(database_handler, database_client, *manager.collection_names)
     stats.write()
 
     sys.exit(0)
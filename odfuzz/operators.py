@@ -0,0 +1,70 @@
+"""This module contains weights of mutation operators which are adapted to their success while the fuzzer runs."""
+
+import random
+
+from collections import Counter
+
+
+class MutationOperators:
+    """Success rates of mutation operators learned online, in the style of MOpt.
+
+    An operator is a choice made while a query is mutated, named by its group and its name, e.g. a mutation function
+    of a mutator (StringMutator.flip_bit), a query option picked for the mutation (option.$filter) or a deletion of
+    the option (action.delete). An operator succeeds if the mutated query scores better than its predecessor (see
+    Analyzer). Operators of a group are chosen with probabilities proportional to their success rates estimated by
+    (successes + 1) / (uses + 2), multiplied by their base weights, so rarely used operators are still tried.
+
+    Operators chosen while a query is being mutated are collected from start() until take() which returns them, so
+    that they can be rewarded when the response to the query is analyzed.
+    """
+
+    def __init__(self):
+        self._uses = Counter()
+        self._successes = Counter()
+        self._applied = []
+
+    def choose(self, group, names, base_weights=None):
+        """Choose one of the names of operators of the group and remember it as applied."""
+        operators = [group + '.' + name for name in names]
+        weights = [self.weight(operator) for operator in operators]
+        if base_weights is None and len(set(weights)) == 1:
+            # operators without a learned preference are chosen uniformly, as they were before weights were adapted
+            index = random.choice(range(len(names)))
+        else:
+            if base_weights is not None:
+                weights = [weight * base_weight for weight, base_weight in zip(weights, base_weights)]
+            index = random.choices(range(len(names)), weights)[0]
+        self._applied.append(operators[index])
+        return names[index]
+
+    def weight(self, operator):
+        return (self._successes[operator] + 1) / (self._uses[operator] + 2)
+
+    def start(self):
+        self._applied = []
+
+    def take(self):
+        applied, self._applied = self._applied, []
+        return applied
+
+    def reward(self, operators, success):
+        for operator in operators:
+            self._uses[operator] += 1
+            if success:
+                self._successes[operator] += 1
+
+    def records(self):
+        """Return the uses and successes of operators as JSON serializable records, sorted by the operators."""
+        return [{'operator': operator, 'uses': self._uses[operator], 'successes': self._successes[operator]}
+                for operator in sorted(self._uses)]
+
+    def merge(self, records):
+        """Add uses and successes reported by another process, e.g. by a worker process."""
+        for record in records:
+            self._uses[record['operator']] += record['uses']
+            self._successes[record['operator']] += record['successes']
+
+    def clear(self):
+        self._uses = Counter()
+        self._successes = Counter()
+        self._applied = []
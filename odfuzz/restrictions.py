@@ -3,7 +3,8 @@
 import yaml
 
 from odfuzz.exceptions import RestrictionsError
-from odfuzz.constants import EXCLUDE, INCLUDE, DRAFT_OBJECTS, QUERY_OPTIONS, FORBID_OPTION, VALUE, GLOBAL_ENTITY_SET
+from odfuzz.constants import EXCLUDE, INCLUDE, RATE_LIMIT, DRAFT_OBJECTS, QUERY_OPTIONS, FORBID_OPTION, VALUE, \
+    GLOBAL_ENTITY_SET
 
 
 class RestrictionsGroup:
@@ -15,12 +16,14 @@ class RestrictionsGroup:
         self._forbidden_options = []
         self._option_restrictions = {}
         self._excluded_options = {}
+        self._rate_limits = {}
 
         if self._restrictions_file:
             parsed_restrictions = self._parse_restrictions()
         else:
             parsed_restrictions = {}
         self._init_restrictions(parsed_restrictions)
+        self._init_rate_limits(parsed_restrictions)
 
         if exclusion_dict:
             modified_excluded_dict = self._build_exclusion_dict(exclusion_dict)
@@ -52,6 +55,14 @@ class RestrictionsGroup:
         self._init_draft_objects(include_restr)
         self._init_value_objects(include_restr)
 
+    def _init_rate_limits(self, restrictions_dict):
+        rate_limits = restrictions_dict.get(RATE_LIMIT) or {}
+        for entity_set_name, rate in rate_limits.items():
+            if isinstance(rate, bool) or not isinstance(rate, (int, float)) or rate <= 0:
+                raise RestrictionsError('A rate limit of the entity set \'{}\' has to be a positive number of requests '
+                                        'per second, got \'{}\''.format(entity_set_name, rate))
+            self._rate_limits[entity_set_name] = rate
+
     def _init_draft_objects(self, include_restr):
         restriction = QueryRestrictions({}, include_restr.get(DRAFT_OBJECTS, {}))
         self._option_restrictions[DRAFT_OBJECTS] = restriction
@@ -76,6 +87,9 @@ class RestrictionsGroup:
     def excluded_options(self):
         return self._excluded_options
 
+    def rate_limits(self):
+        return self._rate_limits
+
 
 class QueryRestrictions:
     """A set of restrictions applied to a query option."""
@@ -0,0 +1,78 @@
+"""This module contains a scheduler which decides which query group is fuzzed in the next iteration."""
+
+import random
+
+from odfuzz.constants import SCHEDULER_DISCOUNT
+
+
+class QueryGroupScheduler:
+    """A multi-armed bandit over query groups, balancing exploration and exploitation by Thompson sampling.
+
+    A query is a success if it covered a new signature or if it scored better than its predecessor. Every query
+    group (an arm) keeps discounted numbers of successes and failures and a discounted server time spent on its
+    queries. The outcomes are discounted once whenever the query group is selected, not on every reward, because
+    queries of one iteration may be rewarded one by one (in the asynchronous mode). In every selection, a success rate of every query group is drawn from its beta distribution and the
+    group with the highest rate per second of server time is selected, so query groups which keep finding new
+    responses quickly are preferred to barren or slow ones, while rarely selected groups are still tried.
+
+    Query groups are identified by keys; the list of query groups is built once and only scanned afterwards.
+    """
+
+    def __init__(self, query_groups, discount=SCHEDULER_DISCOUNT):
+        """query_groups is a dictionary of query groups by their keys."""
+        self._keys = list(query_groups)
+        self._query_groups = list(query_groups.values())
+        self._indexes = {key: index for index, key in enumerate(self._keys)}
+        self._discount = discount
+        # discounted [successes, failures, server seconds] of every query group, in the order of keys
+        self._arms = [[0.0, 0.0, 0.0] for _ in self._keys]
+        self._total_seconds = 0.0
+        self._total_queries = 0
+
+    def select(self):
+        mean_seconds = self._mean_seconds()
+        best_index = None
+        best_value = -1
+        for index, (successes, failures, seconds) in enumerate(self._arms):
+            success_rate = random.betavariate(successes + 1, failures + 1)
+            # one query of the average duration is assumed, so that unexplored query groups have a cost too
+            cost = (seconds + mean_seconds) / (successes + failures + 1)
+            value = success_rate / cost
+            if value > best_value:
+                best_index = index
+                best_value = value
+        self._arms[best_index] = [outcome * self._discount for outcome in self._arms[best_index]]
+        return self._query_groups[best_index]
+
+    def reward(self, key, successes_num, queries_num, server_seconds):
+        """Update the arm of the query group by outcomes of its queries which took server_seconds in total."""
+        index = self._indexes.get(key)
+        if index is None:
+            return
+        arm = self._arms[index]
+        arm[0] += successes_num
+        arm[1] += queries_num - successes_num
+        arm[2] += server_seconds
+        self._total_seconds += server_seconds
+        self._total_queries += queries_num
+
+    def state(self):
+        return {
+            'arms': {key: arm for key, arm in zip(self._keys, self._arms)},
+            'total_seconds': self._total_seconds,
+            'total_queries': self._total_queries
+        }
+
+    def restore_state(self, state):
+        for key, arm in state['arms'].items():
+            index = self._indexes.get(key)
+            if index is not None:
+                self._arms[index] = list(arm)
+        self._total_seconds = state['total_seconds']
+        self._total_queries = state['total_queries']
+
+    def _mean_seconds(self):
+        if self._total_queries == 0:
+            return 1.0
+        # a zero duration would make the cost of an unexplored query group zero
+        return max(self._total_seconds / self._total_queries, 1e-6)
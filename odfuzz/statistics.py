@@ -1,10 +1,13 @@
 """This module contains classes that store and print statistics."""
 
 import os
+import heapq
 
 from datetime import datetime
 
-from odfuzz.constants import RUNTIME_FILE_NAME
+from odfuzz.triage import FailureTriage
+from odfuzz.operators import MutationOperators
+from odfuzz.constants import RUNTIME_FILE_NAME, FAILURES_FILE_NAME, MAX_BEST_QUERIES
 
 #TODO refactor, class is not inicialized and used in some method parameter, but filled directly in import module calls.
 
@@ -18,37 +21,75 @@ class Stats:
     tests_num = 0
     fails_num = 0
     exceptions_num = 0
+    dropped_num = 0
     created_by_mutation = 0
     created_by_crossover = 0
+    predecessor_cache_hits = 0
+    predecessor_cache_misses = 0
+    signatures_num = 0
+    error_signatures_num = 0
+    minimized_failures_num = 0
+    minimization_requests_num = 0
+    migrants_num = 0
+    failures = FailureTriage()
+    mutation_operators = MutationOperators()
 
 
     directory = None
+    checkpoints_directory = None
     start_datetime = None
 
+    COUNTERS = ('tests_num', 'fails_num', 'exceptions_num', 'dropped_num', 'created_by_mutation',
+                'created_by_crossover', 'predecessor_cache_hits', 'predecessor_cache_misses', 'signatures_num',
+                'error_signatures_num', 'minimized_failures_num', 'minimization_requests_num',
+                'migrants_num')
+
+    @classmethod
+    def counters(cls):
+        return {name: getattr(cls, name) for name in cls.COUNTERS}
+
+    @classmethod
+    def add_counters(cls, counters):
+        """Add counters reported by another process, e.g. by a worker process."""
+        for name in cls.COUNTERS:
+            setattr(cls, name, getattr(cls, name) + counters.get(name, 0))
+
 
 class StatsPrinter:
     """A printer that writes all statistics to the defined output."""
 
-    def __init__(self, database_handler, database_client, collection_name):
-        self._database = database_handler(database_client(collection_name))
+    def __init__(self, database_handler, database_client, *collection_names):
+        """Every island (--islands) has its own collection; otherwise, there is only one."""
+        self._databases = [database_handler(database_client(collection_name)) for collection_name in collection_names]
         self._stats = Stats()
 
     def write(self):
         self._write_sorted_entities()
+        self._write_failures()
         self._write_runtime_stats()
 
     def _write_sorted_entities(self):
         """ Writes subset of all generated URLs that triggered Error/Exception on server from DB,
             based on best fitness score from the genetic algorithm.
         """
-        for entity in self._database.find_distinct_errorous_entity_names():
+        best_queries = {}
+        for database in self._databases:
+            for entity in database.find_distinct_errorous_entity_names():
+                for query in database.find_best_entries(entity):
+                    # migrants are found in several populations
+                    best_queries.setdefault(entity, {}).setdefault(query['string'], query)
+        for entity, queries in best_queries.items():
             file_path = os.path.join(self._stats.directory, 'EntitySet_' + entity + '.txt')
             with open(file_path, 'a', encoding='utf-8') as entity_file:
-                for query in self._database.find_best_entries(entity):
+                for query in heapq.nlargest(MAX_BEST_QUERIES, queries.values(), key=lambda query: query['score']):
                     info_line = query['http'] + ':' + query['error_code'] + ':' + query['string'] + '\n'
                     entity_file.write(info_line)
 
 
+    def _write_failures(self):
+        """Writes clusters of requests that triggered Error/Exception on server, the largest clusters first."""
+        self._stats.failures.write(os.path.join(self._stats.directory, FAILURES_FILE_NAME))
+
     def _write_runtime_stats(self):
         """ Writes runtime statistic that were updated trough Stats class.
 
@@ -58,9 +99,31 @@ class StatsPrinter:
             'Generated tests: ' + str(self._stats.tests_num) + '\n'
             'Failed tests: ' + str(self._stats.fails_num) + '\n'
             'Raised exceptions: ' + str(self._stats.exceptions_num) + '\n'
+            'Dropped tests: ' + str(self._stats.dropped_num) + '\n'
             'Created by mutation: ' + str(self._stats.created_by_mutation) + '\n'
             'Created by crossover: ' + str(self._stats.created_by_crossover) + '\n'
+            'Predecessor score cache hits: ' + str(self._stats.predecessor_cache_hits) + '\n'
+            'Predecessor score cache misses: ' + str(self._stats.predecessor_cache_misses) + '\n'
+            'Covered signatures: ' + str(self._stats.signatures_num) + '\n'
+            'Covered signatures of server errors: ' + str(self._stats.error_signatures_num) + '\n'
+            'Clusters of server errors: ' + str(len(self._stats.failures)) + '\n'
+            'Minimized clusters of server errors: ' + str(self._stats.minimized_failures_num) + '\n'
+            'Requests sent by the minimizer: ' + str(self._stats.minimization_requests_num) + '\n'
+            'Migrants settled on islands: ' + str(self._stats.migrants_num) + '\n'
             'Runtime: ' + str(datetime.now() - self._stats.start_datetime) + '\n'
         )
+        formatted_output += self._format_mutation_operators()
         with open(file_path, 'a', encoding='utf-8') as overall_file:
             overall_file.write(formatted_output)
+
+    def _format_mutation_operators(self):
+        """Format the learned weights of mutation operators with their successes and uses."""
+        records = self._stats.mutation_operators.records()
+        if not records:
+            return ''
+        formatted_output = 'Mutation operators (weight successes/uses):\n'
+        for record in records:
+            weight = self._stats.mutation_operators.weight(record['operator'])
+            formatted_output += '    {}: {:.3f} {}/{}\n'.format(record['operator'], weight, record['successes'],
+                                                              record['uses'])
+        return formatted_output
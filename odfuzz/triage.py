@@ -0,0 +1,95 @@
+"""This module contains a triage of server failures which clusters HTTP 500 responses caused by the same bug."""
+
+import re
+import csv
+
+from datetime import datetime
+
+GUID = re.compile(r'\b[0-9A-Fa-f]{8}-?[0-9A-Fa-f]{4}-?[0-9A-Fa-f]{4}-?[0-9A-Fa-f]{4}-?[0-9A-Fa-f]{12}\b')
+# a quote inside a literal of OData is escaped by doubling it
+QUOTED_LITERAL = re.compile(r'\'(?:[^\']|\'\')*\'|"(?:[^"]|"")*"')
+NUMBER = re.compile(r'(?<![\w/])[-+]?\d+(?:\.\d+)?(?![\w/])')
+
+FAILURES_HEADER = ('Count', 'FirstSeen', 'EntitySet', 'ErrorCode', 'ErrorMessage', 'ShortestURL')
+
+
+class FailureTriage:
+    """Clusters of failures keyed by signatures (entity set, normalized error code, normalized error message).
+
+    Every cluster keeps a number of its failures, the time when the first one was seen and the shortest URL which
+    caused it, so that thousands of failures of one bug are reported once.
+    """
+
+    def __init__(self):
+        self._clusters = {}
+
+    def __len__(self):
+        return len(self._clusters)
+
+    def add(self, entity_set_name, error_code, error_message, url, seen=None):
+        """Assign the failure to its cluster; return True if the failure started a new cluster."""
+        signature = failure_signature(entity_set_name, error_code, error_message)
+        seen = seen or datetime.now().isoformat(timespec='seconds')
+        cluster = self._clusters.get(signature)
+        if cluster is None:
+            self._clusters[signature] = {'count': 1, 'first_seen': seen, 'url': url}
+            return True
+        cluster['count'] += 1
+        if len(url) < len(cluster['url']):
+            cluster['url'] = url
+        return False
+
+    def shorten(self, entity_set_name, error_code, error_message, url):
+        """Replace the shortest URL of the failure's cluster by a shorter one, e.g. by a minimized one."""
+        cluster = self._clusters.get(failure_signature(entity_set_name, error_code, error_message))
+        if cluster is not None and len(url) < len(cluster['url']):
+            cluster['url'] = url
+
+    def records(self):
+        """Return the clusters as JSON serializable records, the largest clusters first."""
+        records = [{'entity_set': signature[0], 'error_code': signature[1], 'error_message': signature[2],
+                    'count': cluster['count'], 'first_seen': cluster['first_seen'], 'url': cluster['url']}
+                   for signature, cluster in self._clusters.items()]
+        return sorted(records, key=lambda record: (-record['count'], record['first_seen']))
+
+    def merge(self, records):
+        """Add clusters reported by another process, e.g. by a worker process."""
+        for record in records:
+            signature = (record['entity_set'], record['error_code'], record['error_message'])
+            cluster = self._clusters.get(signature)
+            if cluster is None:
+                self._clusters[signature] = {'count': record['count'], 'first_seen': record['first_seen'],
+                                             'url': record['url']}
+                continue
+            cluster['count'] += record['count']
+            cluster['first_seen'] = min(cluster['first_seen'], record['first_seen'])
+            if len(record['url']) < len(cluster['url']):
+                cluster['url'] = record['url']
+
+    def clear(self):
+        self._clusters = {}
+
+    def write(self, file_path):
+        with open(file_path, 'w', encoding='utf-8', newline='') as failures_file:
+            writer = csv.writer(failures_file, delimiter=';')
+            writer.writerow(FAILURES_HEADER)
+            for record in self.records():
+                writer.writerow((record['count'], record['first_seen'], record['entity_set'], record['error_code'],
+                                 record['error_message'], record['url']))
+
+
+def failure_signature(entity_set_name, error_code, error_message):
+    return entity_set_name, normalize_error_code(error_code), normalize_error_message(error_message)
+
+
+def normalize_error_code(error_code):
+    """Replace GUIDs and quoted literals; numbers are kept, they are usually a part of the code (e.g. SY/530)."""
+    normalized = GUID.sub('<guid>', str(error_code or ''))
+    return QUOTED_LITERAL.sub('<literal>', normalized)
+
+
+def normalize_error_message(error_message):
+    """Replace GUIDs, quoted literals and numbers, which differ among failures caused by the same bug."""
+    normalized = normalize_error_code(error_message)
+    normalized = NUMBER.sub('<number>', normalized)
+    return ' '.join(normalized.split())
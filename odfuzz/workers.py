@@ -0,0 +1,113 @@
+"""This module contains a pool of worker processes that fuzz disjoint partitions of queryable entities."""
+
+import os
+import sys
+import json
+import signal
+import logging
+import traceback
+import gevent
+
+from odfuzz.statistics import Stats
+from odfuzz.constants import FUZZER_LOGGER
+
+
+class WorkerPool:
+    """A pool of forked worker processes.
+
+    Every worker runs the given target with its own partition and reports its runtime statistics back to the parent
+    process through a pipe when it exits, no matter whether it was interrupted, timed out or failed. The parent
+    process adds the reported counters, clusters of failures and uses of mutation operators to Stats, so
+    StatsPrinter prints the overall numbers.
+    """
+
+    def __init__(self):
+        self._logger = logging.getLogger(FUZZER_LOGGER)
+        self._workers = {}
+
+    def run(self, partitions, target):
+        """Fork a worker for every partition and wait until all of them exit.
+
+        If the waiting is interrupted (SIGINT, timeout), the workers are terminated and their statistics
+        are collected before the interruption is propagated.
+        """
+        # SIGINT has to interrupt the waiting in the main greenlet; statistics are not complete before the workers exit
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        for index, partition in enumerate(partitions):
+            self._fork(index, partition, target)
+        try:
+            self.join()
+        finally:
+            self.terminate()
+            self.join()
+
+    def terminate(self):
+        for pid in self._workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def join(self):
+        while self._workers:
+            pid, status = os.waitpid(-1, 0)
+            read_fd = self._workers.pop(pid, None)
+            if read_fd is None:
+                continue
+            self._collect_stats(pid, read_fd)
+            self._logger.info('Worker {} exited with the status {}'.format(pid, status))
+
+    def _fork(self, index, partition, target):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            self._work(index, partition, target, write_fd)
+        os.close(write_fd)
+        self._workers[pid] = read_fd
+        self._logger.info('Worker {} started with the process ID {}'.format(index, pid))
+
+    def _work(self, index, partition, target, write_fd):
+        # the signal watchers inherited from the parent process have to be overridden
+        signal.signal(signal.SIGINT, exit_worker)
+        signal.signal(signal.SIGTERM, exit_worker)
+        self._workers = {}
+        inherited_counters = Stats.counters()
+        Stats.failures.clear()
+        Stats.mutation_operators.clear()
+        exit_code = 0
+        try:
+            target(index, partition)
+        except SystemExit as system_exit:
+            exit_code = system_exit.code if isinstance(system_exit.code, int) else 0
+        except gevent.Timeout:
+            # the timeout of the whole fuzzing is inherited from the parent process
+            pass
+        except BaseException:  # pylint: disable=broad-except
+            self._logger.error(traceback.format_exc())
+            exit_code = 1
+        finally:
+            with os.fdopen(write_fd, 'w') as stats_pipe:
+                counters = Stats.counters()
+                stats_pipe.write(json.dumps({
+                    'counters': {name: counters[name] - inherited_counters[name] for name in counters},
+                    'failures': Stats.failures.records(),
+                    'mutation_operators': Stats.mutation_operators.records()
+                }))
+            sys.stdout.flush()
+            os._exit(exit_code)  # pylint: disable=protected-access
+
+    def _collect_stats(self, pid, read_fd):
+        with os.fdopen(read_fd) as stats_pipe:
+            reported_stats = stats_pipe.read()
+        if not reported_stats:
+            self._logger.error('Worker {} did not report its statistics'.format(pid))
+            return
+        reported_stats = json.loads(reported_stats)
+        Stats.add_counters(reported_stats['counters'])
+        Stats.failures.merge(reported_stats['failures'])
+        Stats.mutation_operators.merge(reported_stats['mutation_operators'])
+
+
+def exit_worker(signum, frame):
+    raise SystemExit(0)
@@ -0,0 +1,196 @@
+import uuid
+
+from bson import ObjectId
+
+from odfuzz.databases import InMemoryHandler, InMemoryDatabase, SampleableSet, CrossoverPool
+
+
+def create_handler(*entries):
+    memory_handler = InMemoryHandler(InMemoryDatabase(str(uuid.uuid4())))
+    for entry in entries:
+        memory_handler.save_entry(entry)
+    return memory_handler
+
+
+def ids(entries):
+    return [entry['_id'] for entry in entries]
+
+
+def test_memory_insert_same(data_three_filter_logicals_company_code):
+    memory_handler = create_handler(data_three_filter_logicals_company_code, data_three_filter_logicals_company_code)
+
+    assert memory_handler.total_entries() == 1
+
+
+def test_memory_insert_same_url(data_single_filter_logical_company_code):
+    rescored_entry = dict(data_single_filter_logical_company_code, _id=ObjectId(), score=1000)
+    memory_handler = create_handler(data_single_filter_logical_company_code, rescored_entry)
+
+    assert memory_handler.total_entries() == 1
+    assert memory_handler.total_score() == data_single_filter_logical_company_code['score']
+
+
+def test_memory_population_is_shared_by_collection_name(data_single_filter_logical_company_code):
+    collection_name = str(uuid.uuid4())
+    InMemoryHandler(InMemoryDatabase(collection_name)).save_entry(data_single_filter_logical_company_code)
+
+    memory_handler = InMemoryHandler(InMemoryDatabase(collection_name))
+
+    assert memory_handler.find_entry(data_single_filter_logical_company_code['_id'])
+
+
+def test_memory_find_non_existing():
+    memory_handler = create_handler()
+
+    assert memory_handler.find_entry(ObjectId("5c61a1295f627d1db904dd37")) is None
+
+
+def test_memory_delete_entry(data_single_filter_logical_company_code):
+    memory_handler = create_handler(data_single_filter_logical_company_code)
+
+    assert memory_handler.delete_entry(data_single_filter_logical_company_code['_id']) == 1
+    assert memory_handler.delete_entry(data_single_filter_logical_company_code['_id']) == 0
+    assert memory_handler.total_entries() == 0
+    assert memory_handler.total_score() == 0
+
+
+def test_memory_delete_worst_entries(data_single_filter_logical_company_code, data_three_filter_logicals_company_code,
+                                     data_search_output_set_error):
+    memory_handler = create_handler(data_three_filter_logicals_company_code, data_search_output_set_error,
+                                    data_single_filter_logical_company_code)
+
+    memory_handler.delete_worst_entries(2)
+
+    assert memory_handler.total_entries() == 1
+    assert memory_handler.find_entry(data_search_output_set_error['_id'])
+
+
+def test_memory_delete_worst_entries_skips_deleted(data_single_filter_logical_company_code,
+                                                   data_three_filter_logicals_company_code):
+    memory_handler = create_handler(data_three_filter_logicals_company_code, data_single_filter_logical_company_code)
+
+    memory_handler.delete_entry(data_single_filter_logical_company_code['_id'])
+    memory_handler.delete_worst_entries(1)
+
+    assert memory_handler.total_entries() == 0
+
+
+def test_memory_delete_entries(data_single_filter_logical_company_code, data_three_filter_logicals_company_code,
+                               data_search_output_set_error):
+    memory_handler = create_handler(data_three_filter_logicals_company_code, data_search_output_set_error,
+                                    data_single_filter_logical_company_code)
+
+    memory_handler.delete_entries([data_three_filter_logicals_company_code, data_single_filter_logical_company_code])
+
+    assert ids(memory_handler.find_all_entries()) == [data_search_output_set_error['_id']]
+    assert memory_handler.total_score() == data_search_output_set_error['score']
+
+
+def test_memory_total_score(data_single_filter_logical_company_code, data_three_filter_logicals_company_code):
+    memory_handler = create_handler(data_single_filter_logical_company_code, data_three_filter_logicals_company_code)
+
+    assert memory_handler.total_score() == 11
+
+
+def test_memory_sample_filter_entry(data_single_filter_logical_company_code, data_two_filter_logicals_company_code,
+                                    data_three_filter_logicals_company_code, data_search_output_set):
+    memory_handler = create_handler(data_single_filter_logical_company_code, data_two_filter_logicals_company_code,
+                                    data_three_filter_logicals_company_code, data_search_output_set)
+
+    entry = memory_handler.sample_filter_entry('C_CorrespondenceCompanyCodeVH',
+                                               data_two_filter_logicals_company_code['_id'])
+
+    assert entry['_id'] == data_three_filter_logicals_company_code['_id']
+
+
+def test_memory_sample_filter_entry_without_candidates(data_search_output_set):
+    memory_handler = create_handler(data_search_output_set)
+
+    assert memory_handler.sample_filter_entry('C_CorrespondenceOutputSet', None) is None
+
+
+def test_memory_find_best_three(data_two_filter_logicals_company_code, data_search_correspondence_company_code_error,
+                                data_inlinecount_correspondence_company_code_error,
+                                data_single_filter_logical_company_code_error):
+    memory_handler = create_handler(data_two_filter_logicals_company_code, data_search_correspondence_company_code_error,
+                                    data_single_filter_logical_company_code_error,
+                                    data_inlinecount_correspondence_company_code_error)
+
+    best_three_entries = memory_handler.find_best_entries('C_CorrespondenceCompanyCodeVH')
+
+    assert ids(best_three_entries) == ids([data_single_filter_logical_company_code_error,
+                                           data_search_correspondence_company_code_error,
+                                           data_inlinecount_correspondence_company_code_error])
+
+
+def test_memory_find_top_two(data_three_filter_logicals_company_code,
+                             data_search_correspondence_company_code_error,
+                             data_single_filter_logical_company_code_error):
+    memory_handler = create_handler(data_three_filter_logicals_company_code,
+                                    data_search_correspondence_company_code_error,
+                                    data_single_filter_logical_company_code_error)
+
+    top_two_entries = memory_handler.find_top_entries(2)
+
+    assert ids(top_two_entries) == ids([data_single_filter_logical_company_code_error,
+                                        data_search_correspondence_company_code_error])
+
+
+def test_memory_distinct_errorous_two_entities(data_single_filter_logical_company_code_error,
+                                               data_search_output_set_error, data_search_output_set):
+    memory_handler = create_handler(data_single_filter_logical_company_code_error, data_search_output_set_error,
+                                    data_search_output_set)
+
+    distinct_entities = memory_handler.find_distinct_errorous_entity_names()
+
+    assert set(distinct_entities) == set(['C_CorrespondenceOutputSet', 'C_CorrespondenceCompanyCodeVH'])
+
+
+def test_memory_delete_collection(data_single_filter_logical_company_code_error):
+    memory_handler = create_handler(data_single_filter_logical_company_code_error)
+
+    memory_handler.delete_collection()
+
+    assert memory_handler.total_entries() == 0
+    assert memory_handler.find_distinct_errorous_entity_names() == []
+
+
+def test_sampleable_set_discard():
+    sampleable_set = SampleableSet()
+    for item in range(5):
+        sampleable_set.add(item)
+
+    sampleable_set.discard(1)
+    sampleable_set.discard(4)
+    sampleable_set.discard(7)
+
+    assert len(sampleable_set) == 3
+    assert sorted(sampleable_set.sample(10)) == [0, 2, 3]
+
+
+def test_memory_entity_set_aggregates(data_single_filter_logical_company_code, data_three_filter_logicals_company_code,
+                                      data_search_output_set):
+    memory_handler = create_handler(data_single_filter_logical_company_code, data_three_filter_logicals_company_code,
+                                    data_search_output_set)
+
+    memory_handler.delete_worst_entries(1)
+
+    assert memory_handler.total_entries('C_CorrespondenceCompanyCodeVH') + \
+        memory_handler.total_entries('C_CorrespondenceOutputSet') == 2
+    assert memory_handler.total_score('C_CorrespondenceCompanyCodeVH') + \
+        memory_handler.total_score('C_CorrespondenceOutputSet') == memory_handler.total_score()
+    assert memory_handler.total_entries('EntitySetWithoutEntries') == 0
+
+
+def test_crossover_pool_tournament():
+    crossover_pool = CrossoverPool(id_key=str)
+    crossover_pool.load([('1', 'Products', 10), ('2', 'Products', 30), ('3', 'Products', 20), ('4', 'Orders', 50)])
+
+    assert crossover_pool.tournament('Products', None) == '2'
+    assert crossover_pool.tournament('Products', 2) == '3'
+
+    crossover_pool.remove(3)
+    crossover_pool.remove(2)
+    assert crossover_pool.tournament('Products', None) == '1'
+    assert crossover_pool.tournament('Products', '1') is None
+    assert crossover_pool.tournament('Customers', None) is None
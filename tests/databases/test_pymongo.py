@@ -1,9 +1,10 @@
+import gevent
 import pytest
 
 from bson import ObjectId
 from mongomock import MongoClient
 
-from odfuzz.databases import MongoDBHandler
+from odfuzz.databases import MongoDBHandler, BufferedMongoDBHandler, generate_url_hash, summarize_plan
 
 
 class MongoDBMock:
@@ -112,6 +113,17 @@ def test_database_delete_worst_entries_two_from_two(data_single_filter_logical_c
     assert mongo_mock.collection.find().count() == 0
 
 
+def test_database_delete_entries(data_single_filter_logical_company_code, data_three_filter_logicals_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_mock.collection.insert_many([data_single_filter_logical_company_code, data_three_filter_logicals_company_code])
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    mongo_handler.delete_entries([data_single_filter_logical_company_code])
+
+    assert mongo_mock.collection.find().count() == 1
+    assert mongo_handler.total_score() == data_three_filter_logicals_company_code['score']
+
+
 def test_database_delete_collection(data_single_filter_logical_company_code, data_three_filter_logicals_company_code):
     mongo_mock = MongoDBMock()
     mongo_mock.collection.insert_many([data_single_filter_logical_company_code, data_three_filter_logicals_company_code])
@@ -183,6 +195,21 @@ def test_database_find_best_three(data_single_filter_logical_company_code, data_
                                   data_inlinecount_correspondence_company_code_error]
 
 
+def test_database_find_top_two(data_single_filter_logical_company_code, data_three_filter_logicals_company_code,
+                               data_search_correspondence_company_code_error,
+                               data_single_filter_logical_company_code_error):
+    mongo_mock = MongoDBMock()
+    mongo_mock.collection.insert_many([data_single_filter_logical_company_code, data_three_filter_logicals_company_code,
+                                       data_search_correspondence_company_code_error,
+                                       data_single_filter_logical_company_code_error])
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    top_two_entries = mongo_handler.find_top_entries(2)
+
+    assert top_two_entries == [data_single_filter_logical_company_code_error,
+                               data_search_correspondence_company_code_error]
+
+
 def test_distinct_errorous_two_entities(data_single_filter_logical_company_code_error, data_search_output_set_error):
     mongo_mock = MongoDBMock()
     mongo_mock.collection.insert_many([data_single_filter_logical_company_code_error, data_search_output_set_error])
@@ -191,3 +218,280 @@ def test_distinct_errorous_two_entities(data_single_filter_logical_company_code_
     distinct_entities = mongo_handler.find_distinct_errorous_entity_names()
 
     assert set(distinct_entities) == set(['C_CorrespondenceOutputSet', 'C_CorrespondenceCompanyCodeVH'])
+
+
+def test_database_insert_same_url(data_single_filter_logical_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = MongoDBHandler(mongo_mock)
+    rescored_entry = dict(data_single_filter_logical_company_code, _id=ObjectId(), score=1000)
+
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+    mongo_handler.save_entry(rescored_entry)
+
+    assert mongo_mock.collection.find().count() == 1
+    assert mongo_mock.collection.find_one()['_id'] == data_single_filter_logical_company_code['_id']
+
+
+def test_database_insert_stores_url_hash(data_single_filter_logical_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+
+    assert mongo_mock.collection.find_one()['url_hash'] == generate_url_hash(
+        data_single_filter_logical_company_code['string'])
+
+
+def test_database_url_hash_index_survives_delete_collection():
+    mongo_mock = MongoDBMock()
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    mongo_handler.delete_collection()
+
+    index_keys = [index['key'] for index in mongo_mock.collection.index_information().values()]
+    assert [('url_hash', 1)] in index_keys
+
+
+def test_buffered_database_writes_on_flush(data_single_filter_logical_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = BufferedMongoDBHandler(mongo_mock)
+
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+    assert mongo_mock.collection.find().count() == 0
+
+    mongo_handler.flush()
+    assert mongo_mock.collection.find().count() == 1
+
+
+def test_buffered_database_writes_when_full(data_single_filter_logical_company_code,
+                                            data_three_filter_logicals_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = BufferedMongoDBHandler(mongo_mock, buffer_size=2)
+
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+    mongo_handler.save_entry(data_three_filter_logicals_company_code)
+
+    assert mongo_mock.collection.find().count() == 2
+
+
+def test_buffered_database_writes_after_interval_without_new_operations(data_single_filter_logical_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = BufferedMongoDBHandler(mongo_mock, flush_interval=0.01)
+
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+    assert mongo_mock.collection.find().count() == 0
+
+    gevent.sleep(0.1)
+    assert mongo_mock.collection.find().count() == 1
+
+
+def test_buffered_database_keeps_entries_being_written_visible(monkeypatch, data_single_filter_logical_company_code,
+                                                               data_three_filter_logicals_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = BufferedMongoDBHandler(mongo_mock)
+    bulk_write = mongo_mock.collection.bulk_write
+
+    def slow_bulk_write(*args, **kwargs):
+        gevent.sleep(0.05)
+        return bulk_write(*args, **kwargs)
+
+    monkeypatch.setattr(mongo_mock.collection, 'bulk_write', slow_bulk_write)
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+    mongo_handler.save_entry(data_three_filter_logicals_company_code)
+    flushing = gevent.spawn(mongo_handler.flush)
+    gevent.sleep(0)
+
+    assert mongo_handler.find_entry(data_three_filter_logicals_company_code['_id']) is not None
+    mongo_handler.delete_worst_entries(1)
+    flushing.join()
+    mongo_handler.flush()
+
+    assert [entry['_id'] for entry in mongo_mock.collection.find()] == [data_three_filter_logicals_company_code['_id']]
+    assert mongo_handler.total_entries() == 1
+
+
+def test_buffered_database_finds_pending_entry(data_single_filter_logical_company_code):
+    mongo_handler = BufferedMongoDBHandler(MongoDBMock())
+
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+
+    assert mongo_handler.find_entry(data_single_filter_logical_company_code['_id'])['score'] == \
+        data_single_filter_logical_company_code['score']
+
+
+def test_buffered_database_deletes_pending_entry(data_single_filter_logical_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = BufferedMongoDBHandler(mongo_mock)
+
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+    deleted_num = mongo_handler.delete_entry(data_single_filter_logical_company_code['_id'])
+    mongo_handler.flush()
+
+    assert deleted_num == 1
+    assert mongo_mock.collection.find().count() == 0
+
+
+def test_buffered_database_deletes_saved_entry(data_single_filter_logical_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_mock.collection.insert_one(data_single_filter_logical_company_code)
+    mongo_handler = BufferedMongoDBHandler(mongo_mock)
+
+    assert mongo_handler.delete_entry(data_single_filter_logical_company_code['_id']) == 1
+    assert mongo_handler.find_entry(data_single_filter_logical_company_code['_id']) is None
+    assert mongo_handler.delete_entry(data_single_filter_logical_company_code['_id']) == 0
+
+    mongo_handler.flush()
+    assert mongo_mock.collection.find().count() == 0
+
+
+def test_buffered_database_deletes_saved_and_pending_entries(data_single_filter_logical_company_code,
+                                                            data_three_filter_logicals_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_mock.collection.insert_one(data_three_filter_logicals_company_code)
+    mongo_handler = BufferedMongoDBHandler(mongo_mock)
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+
+    mongo_handler.delete_entries([data_three_filter_logicals_company_code, data_single_filter_logical_company_code])
+    mongo_handler.flush()
+
+    assert mongo_mock.collection.find().count() == 0
+    assert mongo_handler.total_entries() == 0
+
+
+def test_buffered_database_deletes_worst_of_saved_and_pending(data_single_filter_logical_company_code,
+                                                              data_three_filter_logicals_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_mock.collection.insert_one(data_three_filter_logicals_company_code)
+    mongo_handler = BufferedMongoDBHandler(mongo_mock)
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+
+    mongo_handler.delete_worst_entries(1)
+
+    assert mongo_handler.total_entries() == 1
+    remaining_entry = mongo_mock.collection.find_one()
+    assert remaining_entry['score'] == max(data_single_filter_logical_company_code['score'],
+                                           data_three_filter_logicals_company_code['score'])
+
+
+def test_buffered_database_counts_pending_entries(data_single_filter_logical_company_code):
+    mongo_handler = BufferedMongoDBHandler(MongoDBMock())
+
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+
+    assert mongo_handler.total_entries() == 1
+
+
+def test_database_entity_set_aggregates(data_single_filter_logical_company_code, data_three_filter_logicals_company_code,
+                                        data_search_output_set):
+    mongo_mock = MongoDBMock()
+    mongo_mock.collection.insert_many([data_single_filter_logical_company_code, data_search_output_set])
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    mongo_handler.save_entry(data_three_filter_logicals_company_code)
+    mongo_handler.save_entry(dict(data_three_filter_logicals_company_code, _id=ObjectId()))
+    mongo_handler.delete_entry(data_single_filter_logical_company_code['_id'])
+
+    assert mongo_handler.total_entries() == 2
+    assert mongo_handler.total_entries('C_CorrespondenceCompanyCodeVH') == 1
+    assert mongo_handler.total_score('C_CorrespondenceCompanyCodeVH') == data_three_filter_logicals_company_code['score']
+    assert mongo_handler.total_score('C_CorrespondenceOutputSet') == data_search_output_set['score']
+
+
+def test_buffered_database_aggregates_skip_saved_url(data_single_filter_logical_company_code,
+                                                     data_three_filter_logicals_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = BufferedMongoDBHandler(mongo_mock)
+    mongo_mock.collection.insert_one(dict(data_single_filter_logical_company_code,
+                                          url_hash=generate_url_hash(data_single_filter_logical_company_code['string'])))
+
+    mongo_handler.save_entry(data_single_filter_logical_company_code)
+    mongo_handler.save_entry(data_three_filter_logicals_company_code)
+    assert mongo_handler.total_entries() == 2
+    mongo_handler.flush()
+
+    assert mongo_handler.total_entries() == 1
+    assert mongo_handler.total_score() == data_three_filter_logicals_company_code['score']
+
+
+def test_database_creates_indexes():
+    mongo_mock = MongoDBMock()
+    MongoDBHandler(mongo_mock)
+
+    index_keys = [index['key'] for index in mongo_mock.collection.index_information().values()]
+
+    assert [('score', 1)] in index_keys
+    assert [('http', 1), ('entity_set', 1), ('score', -1)] in index_keys
+    assert [('entity_set', 1), ('score', -1)] in index_keys
+    assert [('entity_set', 1), ('score', 1)] in index_keys
+
+
+def test_summarize_plan_of_aggregation():
+    explanation = {'stages': [{'$cursor': {'queryPlanner': {'winningPlan': {
+        'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': 'crossable_entity_set_score'}}}}},
+        {'$sample': {'size': 30}}]}
+
+    assert summarize_plan(explanation) == 'FETCH <- IXSCAN(crossable_entity_set_score)'
+
+
+def test_database_sample_filter_entry_from_loaded_pool(data_single_filter_logical_company_code,
+                                                       data_two_filter_logicals_company_code,
+                                                       data_three_filter_logicals_company_code, data_search_output_set):
+    mongo_mock = MongoDBMock()
+    mongo_mock.collection.insert_many([data_single_filter_logical_company_code, data_two_filter_logicals_company_code,
+                                       data_three_filter_logicals_company_code, data_search_output_set])
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    entry = mongo_handler.sample_filter_entry('C_CorrespondenceCompanyCodeVH',
+                                              data_two_filter_logicals_company_code['_id'])
+
+    assert entry == data_three_filter_logicals_company_code
+    assert mongo_handler.sample_filter_entry('C_CorrespondenceOutputSet', None) is None
+
+
+def test_buffered_database_samples_pending_entries(data_two_filter_logicals_company_code,
+                                                   data_three_filter_logicals_company_code):
+    mongo_handler = BufferedMongoDBHandler(MongoDBMock())
+    mongo_handler.save_entry(data_two_filter_logicals_company_code)
+    mongo_handler.save_entry(data_three_filter_logicals_company_code)
+
+    mongo_handler.delete_entry(data_three_filter_logicals_company_code['_id'])
+    entry = mongo_handler.sample_filter_entry('C_CorrespondenceCompanyCodeVH', None)
+
+    assert entry['_id'] == data_two_filter_logicals_company_code['_id']
+    assert mongo_handler.sample_filter_entry('C_CorrespondenceCompanyCodeVH', entry['_id']) is None
+
+
+def test_database_sample_filter_entry_deleted_by_another_process(data_two_filter_logicals_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = MongoDBHandler(mongo_mock)
+    mongo_handler.save_entry(data_two_filter_logicals_company_code)
+
+    mongo_mock.collection.delete_many({})
+
+    assert mongo_handler.sample_filter_entry('C_CorrespondenceCompanyCodeVH', None) is None
+    assert mongo_handler.sample_filter_entry('C_CorrespondenceCompanyCodeVH', None) is None
+
+
+@pytest.mark.parametrize('handler_class', [MongoDBHandler, BufferedMongoDBHandler])
+def test_restricted_handlers_share_collection(handler_class, data_single_filter_logical_company_code,
+                                              data_three_filter_logicals_company_code, data_search_output_set):
+    mongo_mock = MongoDBMock()
+    mongo_mock.collection.insert_one(data_three_filter_logicals_company_code)
+    company_codes = handler_class(mongo_mock)
+    company_codes.restrict(['C_CorrespondenceCompanyCodeVH'])
+    output_sets = handler_class(mongo_mock)
+    output_sets.restrict(['C_CorrespondenceOutputSet'])
+
+    output_sets.save_entry(data_search_output_set)
+    company_codes.save_entry(data_single_filter_logical_company_code)
+    output_sets.flush()
+    company_codes.flush()
+    # the query of the other entity set has a lower score, but it is not counted by the handler
+    company_codes.delete_worst_entries(1)
+    company_codes.flush()
+
+    assert sorted(entry['_id'] for entry in mongo_mock.collection.find()) == \
+        sorted([data_three_filter_logicals_company_code['_id'], data_search_output_set['_id']])
+    assert (company_codes.total_entries(), company_codes.total_score()) == \
+        (1, data_three_filter_logicals_company_code['score'])
+    assert (output_sets.total_entries(), output_sets.total_score()) == (1, data_search_output_set['score'])
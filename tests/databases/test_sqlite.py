@@ -0,0 +1,224 @@
+import sqlite3
+import uuid
+
+import gevent
+import pytest
+from bson import ObjectId
+
+from odfuzz import databases
+from odfuzz.databases import SQLiteHandler, SQLiteDatabase
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return str(tmp_path / 'odfuzz.sqlite')
+
+
+def create_handler(database_path, *entries, collection_name=None):
+    sqlite_handler = SQLiteHandler(SQLiteDatabase(collection_name or str(uuid.uuid4()), database_path))
+    for entry in entries:
+        sqlite_handler.save_entry(entry)
+    return sqlite_handler
+
+
+def ids(entries):
+    return [entry['_id'] for entry in entries]
+
+
+def test_sqlite_insert_same(database_path, data_three_filter_logicals_company_code):
+    sqlite_handler = create_handler(database_path, data_three_filter_logicals_company_code,
+                                    data_three_filter_logicals_company_code)
+
+    assert sqlite_handler.total_entries() == 1
+
+
+def test_sqlite_insert_same_url(database_path, data_single_filter_logical_company_code):
+    rescored_entry = dict(data_single_filter_logical_company_code, _id=ObjectId(), score=1000)
+    sqlite_handler = create_handler(database_path, data_single_filter_logical_company_code, rescored_entry)
+
+    assert sqlite_handler.total_entries() == 1
+    assert sqlite_handler.total_score() == data_single_filter_logical_company_code['score']
+
+
+def test_sqlite_find_entry(database_path, data_three_filter_logicals_company_code):
+    sqlite_handler = create_handler(database_path, data_three_filter_logicals_company_code)
+
+    entry = sqlite_handler.find_entry(data_three_filter_logicals_company_code['_id'])
+
+    assert entry['_id'] == data_three_filter_logicals_company_code['_id']
+    assert entry['_$filter'] == data_three_filter_logicals_company_code['_$filter']
+    assert sqlite_handler.find_entry(ObjectId()) is None
+
+
+def test_sqlite_flushed_entries_are_visible_to_another_connection(database_path,
+                                                                  data_single_filter_logical_company_code_error):
+    collection_name = str(uuid.uuid4())
+    sqlite_handler = create_handler(database_path, data_single_filter_logical_company_code_error,
+                                    collection_name=collection_name)
+
+    assert create_handler(database_path, collection_name=collection_name).total_entries() == 0
+    sqlite_handler.flush()
+    reader = create_handler(database_path, collection_name=collection_name)
+    assert reader.total_entries() == 1
+    assert reader.find_distinct_errorous_entity_names() == ['C_CorrespondenceCompanyCodeVH']
+
+
+def test_sqlite_transaction_is_committed_when_full(database_path, data_single_filter_logical_company_code,
+                                                   data_three_filter_logicals_company_code):
+    collection_name = str(uuid.uuid4())
+    sqlite_handler = SQLiteHandler(SQLiteDatabase(collection_name, database_path), transaction_size=2)
+
+    sqlite_handler.save_entry(data_single_filter_logical_company_code)
+    assert create_handler(database_path, collection_name=collection_name).total_entries() == 0
+    sqlite_handler.save_entry(data_three_filter_logicals_company_code)
+    assert create_handler(database_path, collection_name=collection_name).total_entries() == 2
+
+
+def test_sqlite_transaction_is_committed_after_interval(database_path, data_single_filter_logical_company_code):
+    collection_name = str(uuid.uuid4())
+    sqlite_handler = SQLiteHandler(SQLiteDatabase(collection_name, database_path), transaction_interval=0.01)
+
+    sqlite_handler.save_entry(data_single_filter_logical_company_code)
+    assert create_handler(database_path, collection_name=collection_name).total_entries() == 0
+
+    gevent.sleep(0.1)
+    assert create_handler(database_path, collection_name=collection_name).total_entries() == 1
+
+
+def test_sqlite_handlers_sharing_file_write_in_turns(monkeypatch, database_path,
+                                                    data_single_filter_logical_company_code,
+                                                    data_three_filter_logicals_company_code):
+    # a blocked writer fails at once instead of waiting for the lock
+    monkeypatch.setattr(databases, 'SQLITE_TIMEOUT', 0)
+    first_handler = create_handler(database_path)
+    second_handler = create_handler(database_path)
+
+    first_handler.save_entry(data_single_filter_logical_company_code)
+    with pytest.raises(sqlite3.OperationalError, match='locked'):
+        second_handler.save_entry(data_three_filter_logicals_company_code)
+
+    first_handler.flush()
+    second_handler.save_entry(data_three_filter_logicals_company_code)
+    second_handler.flush()
+    first_handler.save_entry(data_three_filter_logicals_company_code)
+    first_handler.flush()
+
+    assert first_handler.total_entries() == 2
+    assert second_handler.total_entries() == 1
+
+
+def test_sqlite_delete_entry(database_path, data_single_filter_logical_company_code):
+    sqlite_handler = create_handler(database_path, data_single_filter_logical_company_code)
+
+    assert sqlite_handler.delete_entry(data_single_filter_logical_company_code['_id']) == 1
+    assert sqlite_handler.delete_entry(data_single_filter_logical_company_code['_id']) == 0
+    assert sqlite_handler.total_entries() == 0
+    assert sqlite_handler.total_score() == 0
+
+
+def test_sqlite_delete_worst_entries(database_path, data_single_filter_logical_company_code,
+                                     data_three_filter_logicals_company_code, data_search_output_set_error):
+    sqlite_handler = create_handler(database_path, data_three_filter_logicals_company_code,
+                                    data_search_output_set_error, data_single_filter_logical_company_code)
+
+    sqlite_handler.delete_worst_entries(2)
+
+    assert sqlite_handler.total_entries() == 1
+    assert sqlite_handler.find_entry(data_search_output_set_error['_id'])
+
+
+def test_sqlite_delete_entries(database_path, data_single_filter_logical_company_code,
+                               data_three_filter_logicals_company_code, data_search_output_set_error):
+    sqlite_handler = create_handler(database_path, data_three_filter_logicals_company_code,
+                                    data_search_output_set_error, data_single_filter_logical_company_code)
+
+    sqlite_handler.delete_entries([data_three_filter_logicals_company_code, data_single_filter_logical_company_code])
+
+    assert ids(sqlite_handler.find_all_entries()) == [data_search_output_set_error['_id']]
+    assert sqlite_handler.total_score() == data_search_output_set_error['score']
+
+
+def test_sqlite_total_score(database_path, data_single_filter_logical_company_code,
+                            data_three_filter_logicals_company_code):
+    sqlite_handler = create_handler(database_path, data_single_filter_logical_company_code,
+                                    data_three_filter_logicals_company_code)
+
+    assert sqlite_handler.total_score() == 11
+
+
+def test_sqlite_sample_filter_entry(database_path, data_single_filter_logical_company_code,
+                                    data_two_filter_logicals_company_code, data_three_filter_logicals_company_code,
+                                    data_search_output_set):
+    sqlite_handler = create_handler(database_path, data_single_filter_logical_company_code,
+                                    data_two_filter_logicals_company_code, data_three_filter_logicals_company_code,
+                                    data_search_output_set)
+
+    entry = sqlite_handler.sample_filter_entry('C_CorrespondenceCompanyCodeVH',
+                                               data_two_filter_logicals_company_code['_id'])
+
+    assert entry['_id'] == data_three_filter_logicals_company_code['_id']
+    assert sqlite_handler.sample_filter_entry('C_CorrespondenceOutputSet', None) is None
+
+
+def test_sqlite_find_best_three(database_path, data_two_filter_logicals_company_code,
+                                data_search_correspondence_company_code_error,
+                                data_inlinecount_correspondence_company_code_error,
+                                data_single_filter_logical_company_code_error):
+    sqlite_handler = create_handler(database_path, data_two_filter_logicals_company_code,
+                                    data_search_correspondence_company_code_error,
+                                    data_single_filter_logical_company_code_error,
+                                    data_inlinecount_correspondence_company_code_error)
+
+    best_three_entries = sqlite_handler.find_best_entries('C_CorrespondenceCompanyCodeVH')
+
+    assert ids(best_three_entries) == ids([data_single_filter_logical_company_code_error,
+                                           data_search_correspondence_company_code_error,
+                                           data_inlinecount_correspondence_company_code_error])
+
+
+def test_sqlite_find_top_two(database_path, data_three_filter_logicals_company_code,
+                             data_search_correspondence_company_code_error,
+                             data_single_filter_logical_company_code_error):
+    sqlite_handler = create_handler(database_path, data_three_filter_logicals_company_code,
+                                    data_search_correspondence_company_code_error,
+                                    data_single_filter_logical_company_code_error)
+
+    top_two_entries = sqlite_handler.find_top_entries(2)
+
+    assert ids(top_two_entries) == ids([data_single_filter_logical_company_code_error,
+                                        data_search_correspondence_company_code_error])
+
+
+def test_sqlite_delete_collection(database_path, data_single_filter_logical_company_code_error):
+    sqlite_handler = create_handler(database_path, data_single_filter_logical_company_code_error)
+
+    sqlite_handler.delete_collection()
+
+    assert sqlite_handler.total_entries() == 0
+    assert sqlite_handler.find_distinct_errorous_entity_names() == []
+
+
+def test_sqlite_entity_set_aggregates(database_path, data_single_filter_logical_company_code,
+                                      data_three_filter_logicals_company_code, data_search_output_set):
+    collection_name = str(uuid.uuid4())
+    sqlite_handler = create_handler(database_path, data_single_filter_logical_company_code,
+                                    data_three_filter_logicals_company_code, data_search_output_set,
+                                    collection_name=collection_name)
+    sqlite_handler.delete_entry(data_single_filter_logical_company_code['_id'])
+    sqlite_handler.flush()
+
+    reloaded_handler = create_handler(database_path, collection_name=collection_name)
+
+    for handler in (sqlite_handler, reloaded_handler):
+        assert handler.total_entries('C_CorrespondenceCompanyCodeVH') == 1
+        assert handler.total_score('C_CorrespondenceCompanyCodeVH') == data_three_filter_logicals_company_code['score']
+        assert handler.total_entries() == 2
+
+
+def test_sqlite_explain_uses_indexes(database_path):
+    sqlite_handler = create_handler(database_path)
+
+    query_plans = sqlite_handler.explain('C_CorrespondenceCompanyCodeVH')
+
+    assert 'USING INDEX' in query_plans['delete_worst_entries']
+    assert 'USING INDEX' in query_plans['find_best_entries']
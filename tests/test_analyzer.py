@@ -0,0 +1,81 @@
+from bson import ObjectId
+
+from odfuzz.fuzzer import Analyzer, ScoreCache, BetterOffspring, WorseOffspring
+from odfuzz.statistics import Stats
+
+
+class FakeDatabase:
+    def __init__(self, *entries):
+        self.entries = {entry['_id']: entry for entry in entries}
+        self.found_ids = []
+
+    def find_entry(self, id):
+        self.found_ids.append(id)
+        return self.entries.get(id)
+
+
+class FakeQuery:
+    def __init__(self, predecessors, mutations):
+        self.dictionary = {'predecessors': predecessors}
+        self.mutations = mutations
+        self.score = None
+
+
+def test_offspring_is_compared_with_remembered_parents():
+    parents = ({'_id': ObjectId(), 'score': 50}, {'_id': ObjectId(), 'score': 10})
+    database = FakeDatabase(*parents)
+    analyzer = Analyzer(database)
+    hits_num = Stats.predecessor_cache_hits
+
+    analyzer.remember_parents(parents)
+    offspring = analyzer._build_offspring_by_score([parent['_id'] for parent in parents], None, 20)
+
+    assert isinstance(offspring, BetterOffspring)
+    assert database.found_ids == []
+    assert Stats.predecessor_cache_hits == hits_num + 2
+
+
+def test_unknown_predecessor_is_fetched_once():
+    predecessor = {'_id': ObjectId(), 'score': 50}
+    database = FakeDatabase(predecessor)
+    analyzer = Analyzer(database)
+    misses_num = Stats.predecessor_cache_misses
+
+    for _ in range(2):
+        offspring = analyzer._build_offspring_by_score([predecessor['_id']], 'query', 20)
+        assert isinstance(offspring, WorseOffspring)
+
+    assert database.found_ids == [predecessor['_id']]
+    assert Stats.predecessor_cache_misses == misses_num + 1
+
+
+def test_slain_predecessor_is_skipped():
+    analyzer = Analyzer(FakeDatabase())
+
+    offspring = analyzer._build_offspring_by_score([ObjectId()], 'query', 20)
+
+    assert isinstance(offspring, WorseOffspring)
+
+
+def test_mutation_operators_of_better_offspring_are_rewarded(monkeypatch):
+    predecessor = {'_id': ObjectId(), 'score': 10}
+    analyzer = Analyzer(FakeDatabase(predecessor))
+    monkeypatch.setattr('odfuzz.fuzzer.FitnessEvaluator.evaluate', lambda query: 20)
+    Stats.mutation_operators.clear()
+
+    analyzer.analyze((FakeQuery([predecessor['_id']], ['option.$top', 'NumberMutator.increment_value']),))
+
+    assert [(record['operator'], record['successes']) for record in Stats.mutation_operators.records()] == \
+        [('NumberMutator.increment_value', 1), ('option.$top', 1)]
+
+
+def test_score_cache_evicts_least_recently_used():
+    score_cache = ScoreCache(2)
+    score_cache.put('a', 1)
+    score_cache.put('b', 2)
+    score_cache.get('a')
+    score_cache.put('c', 3)
+
+    assert score_cache.get('b') is None
+    assert score_cache.get('a') == 1
+    assert score_cache.get('c') == 3
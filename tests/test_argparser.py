@@ -19,6 +19,21 @@ def test_argument_parsing(argparser):
     assert parsed_arguments.first_touch
 
 
+def test_max_rps_value(argparser):
+    parsed_arguments = argparser.parse(['https://www.odata.org', '--max-rps', '12.5'])
+    assert parsed_arguments.max_rps == 12.5
+
+
+def test_default_max_rps_value(argparser):
+    parsed_arguments = argparser.parse(['https://www.odata.org'])
+    assert parsed_arguments.max_rps is None
+
+
+def test_inappropriate_max_rps_value(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--max-rps', '0'])
+
+
 def test_default_timeout_value(argparser):
     parsed_arguments = argparser.parse(['https://www.odata.org'])
     assert parsed_arguments.timeout == INFINITY_TIMEOUT
@@ -67,3 +82,118 @@ def test_help_with_other_arguments(argparser):
 def test_help_only_argument(argparser):
     with pytest.raises(SystemExit):
         argparser.parse(['--help'])
+
+
+def test_batch_value(argparser):
+    parsed_arguments = argparser.parse(['https://www.odata.org', '-a', '--batch', '10'])
+    assert parsed_arguments.batch == 10
+
+
+def test_batch_without_asynchronous_mode(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--batch', '10'])
+
+
+def test_inappropriate_batch_value(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '-a', '--batch', '1'])
+
+
+def test_workers_value(argparser):
+    parsed_arguments = argparser.parse(['https://www.odata.org', '--workers', '4'])
+    assert parsed_arguments.workers == 4
+
+
+def test_inappropriate_workers_value(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--workers', '0'])
+
+
+def test_coordinator_and_worker_are_exclusive(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--coordinator', '--worker', 'http://localhost:7900'])
+
+
+def test_worker_value(argparser):
+    parsed_arguments = argparser.parse(['https://www.odata.org', '--worker', 'http://localhost:7900'])
+    assert parsed_arguments.worker == 'http://localhost:7900'
+    assert not parsed_arguments.coordinator
+
+
+def test_default_store_value(argparser):
+    parsed_arguments = argparser.parse(['https://www.odata.org'])
+    assert parsed_arguments.store == 'mongodb'
+
+
+def test_memory_store_with_workers(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--store', 'memory', '--workers', '2'])
+
+
+@pytest.mark.parametrize('arguments', [['--workers', '2'], ['--islands', '2'], ['--coordinator'],
+                                       ['--worker', 'http://localhost:8077']])
+def test_sqlite_store_with_several_processes(argparser, arguments):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--store', 'sqlite'] + arguments)
+
+
+def test_db_explain_value(argparser):
+    assert not argparser.parse(['https://www.odata.org']).db_explain
+    assert argparser.parse(['https://www.odata.org', '--db-explain']).db_explain
+
+
+def test_resume_value(argparser):
+    parsed_arguments = argparser.parse(['https://www.odata.org', '--resume', 'Northwind-1'])
+    assert parsed_arguments.resume == 'Northwind-1'
+
+
+def test_resume_memory_store(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--resume', 'Northwind-1', '--store', 'memory'])
+
+
+def test_resume_with_workers(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--resume', 'Northwind-1', '--workers', '2'])
+
+
+def test_seed_corpus_value(argparser):
+    parsed_arguments = argparser.parse(['https://www.odata.org', '--seed-corpus', 'Northwind-1'])
+    assert parsed_arguments.seed_corpus == 'Northwind-1'
+
+
+def test_seed_corpus_with_coordinator(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--seed-corpus', 'Northwind-1', '--coordinator', '--workers', '2'])
+
+
+def test_minimize_value(argparser):
+    assert not argparser.parse(['https://www.odata.org']).minimize
+    assert argparser.parse(['https://www.odata.org', '--minimize']).minimize
+
+
+def test_minimize_failures_value(argparser):
+    assert not argparser.parse(['https://www.odata.org']).minimize_failures
+    assert argparser.parse(['https://www.odata.org', '--minimize-failures']).minimize_failures
+
+
+def test_islands_values(argparser):
+    parsed_arguments = argparser.parse(['https://www.odata.org', '--islands', '4', '--migration-interval', '10',
+                                        '--migration-size', '3'])
+    assert (parsed_arguments.islands, parsed_arguments.migration_interval, parsed_arguments.migration_size) == \
+        (4, 10, 3)
+
+
+def test_islands_with_workers(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--islands', '2', '--workers', '2'])
+
+
+def test_memory_store_with_islands(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--store', 'memory', '--islands', '2'])
+
+
+def test_inappropriate_migration_interval_value(argparser):
+    with pytest.raises(ArgParserError):
+        argparser.parse(['https://www.odata.org', '--islands', '2', '--migration-interval', '0'])
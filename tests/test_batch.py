@@ -0,0 +1,130 @@
+import sys
+
+from datetime import timedelta
+
+import pytest
+import requests
+
+from odfuzz.batch import BatchRequestBuilder, BatchResponseParser
+from odfuzz.config import Config
+from odfuzz.entities import QueryableEntities
+from odfuzz.fuzzer import Fuzzer
+from odfuzz.exceptions import BatchError
+
+BATCH_RESPONSE = (
+    b'--batchresponse_1\r\n'
+    b'Content-Type: application/http\r\n'
+    b'Content-Transfer-Encoding: binary\r\n'
+    b'\r\n'
+    b'HTTP/1.1 200 OK\r\n'
+    b'Content-Type: application/json\r\n'
+    b'Content-Length: 11\r\n'
+    b'\r\n'
+    b'{"d": null}\r\n'
+    b'--batchresponse_1\r\n'
+    b'Content-Type: application/http\r\n'
+    b'Content-Transfer-Encoding: binary\r\n'
+    b'\r\n'
+    b'HTTP/1.1 500 Internal Server Error\r\n'
+    b'Content-Type: application/xml\r\n'
+    b'\r\n'
+    b'<error/>\r\n'
+    b'--batchresponse_1--\r\n'
+)
+URLS = ['Customers?$top=1', 'Orders?$skip=2']
+
+
+def build_batch_response(content, content_type='multipart/mixed; boundary=batchresponse_1'):
+    response = requests.Response()
+    response.status_code = 202
+    response.headers['Content-Type'] = content_type
+    response._content = content
+    response.elapsed = timedelta(seconds=1)
+    return response
+
+
+def test_batch_request_contains_all_queries():
+    builder = BatchRequestBuilder(URLS)
+    body = builder.build().decode('utf-8')
+    boundary = builder.content_type.split('boundary=')[1]
+
+    assert builder.content_type.startswith('multipart/mixed')
+    assert body.count('--{}\r\n'.format(boundary)) == 2
+    assert 'GET Customers?$top=1 HTTP/1.1\r\n' in body
+    assert 'GET Orders?$skip=2 HTTP/1.1\r\n' in body
+    assert body.endswith('--{}--\r\n'.format(boundary))
+
+
+def test_batch_request_lines_are_encoded():
+    body = BatchRequestBuilder(['Customers?$filter=City ne \'Berlin\'&$orderby=City asc']).build().decode('utf-8')
+
+    assert 'GET Customers?$filter=City%20ne%20\'Berlin\'&$orderby=City%20asc HTTP/1.1\r\n' in body
+
+
+def test_batch_response_is_split_to_parts():
+    responses = BatchResponseParser(build_batch_response(BATCH_RESPONSE), URLS).parse()
+
+    assert [response.status_code for response in responses] == [200, 500]
+    assert responses[0].content == b'{"d": null}'
+    assert responses[1].content == b'<error/>'
+    assert responses[1].reason == 'Internal Server Error'
+    assert responses[0].request.url == 'Customers?$top=1'
+
+
+def test_batch_response_parts_have_estimated_elapsed_time():
+    responses = BatchResponseParser(build_batch_response(BATCH_RESPONSE), URLS).parse()
+
+    for response in responses:
+        assert response.elapsed == timedelta(seconds=0.5)
+        assert response.elapsed_estimated
+
+
+def test_batch_response_parts_have_content_length():
+    responses = BatchResponseParser(build_batch_response(BATCH_RESPONSE), URLS).parse()
+
+    assert responses[0].headers['Content-Length'] == '11'
+    assert responses[1].headers['Content-Length'] == '8'
+
+
+def test_batch_response_without_multipart_content():
+    batch_response = build_batch_response(b'<error/>', 'application/xml')
+    with pytest.raises(BatchError):
+        BatchResponseParser(batch_response, URLS).parse()
+
+
+def test_batch_response_with_missing_parts():
+    with pytest.raises(BatchError):
+        BatchResponseParser(build_batch_response(BATCH_RESPONSE), URLS + ['Products']).parse()
+
+
+class FakeQuery:
+    def __init__(self, query_string):
+        self.query_string = query_string
+        self.entity_name = 'Customers'
+        self.response = None
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.sent = []
+
+    def get(self, query_string, **kwargs):
+        self.sent.append(query_string)
+        response = requests.Response()
+        response.status_code = 404
+        response._content = b'{"error": {"code": "E", "message": {"value": "Not found"}}}'
+        return response
+
+
+def test_queued_chunk_is_sent_one_by_one_after_batch_mode_is_off(monkeypatch):
+    # the fuzzer redirects the standard error output to its log
+    monkeypatch.setattr(sys, 'stderr', sys.stderr)
+    Config.init()
+    dispatcher = FakeDispatcher()
+    fuzzer = Fuzzer(dispatcher, QueryableEntities(), None, None, False, False, batch_size=len(URLS))
+    chunk = [[FakeQuery(url)] for url in URLS]
+    fuzzer._batch_size = 0
+
+    assert fuzzer._send_chunk(chunk)
+    assert dispatcher.sent == URLS
+    assert [query[0].response.status_code for query in chunk] == [404, 404]
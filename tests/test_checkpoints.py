@@ -0,0 +1,186 @@
+import sys
+import random
+import subprocess
+
+import gevent
+import pytest
+import requests
+
+from odfuzz.checkpoints import Checkpoint, CheckpointFile
+from odfuzz.config import Config
+from odfuzz.entities import QueryableEntities
+from odfuzz.exceptions import CheckpointError
+from odfuzz.fuzzer import Fuzzer, ConcurrencyController
+
+
+def create_checkpoint():
+    return Checkpoint('Northwind-1', random.getstate(), {'tests_num': 42},
+                      {'score_averages': {'Products': 12.5}, 'passed_iterations': {'Products': 3}},
+                      {'QueryGroupMultiple:Products': 7}, False,
+                      {'signatures': [['Products', '', '', '$top', '200', '', 3]], 'combinations': []},
+                      [], [{'operator': 'option.$top', 'uses': 5, 'successes': 2}])
+
+
+def test_checkpoint_is_saved_and_loaded(tmp_path):
+    checkpoint_file = CheckpointFile(str(tmp_path), 'Northwind-1')
+    checkpoint = create_checkpoint()
+    expected_values = [random.random() for _ in range(3)]
+
+    checkpoint_file.save(checkpoint)
+    loaded_checkpoint = checkpoint_file.load()
+    random.setstate(loaded_checkpoint.random_state)
+
+    assert [random.random() for _ in range(3)] == expected_values
+    assert loaded_checkpoint.collection_name == 'Northwind-1'
+    assert loaded_checkpoint.counters == {'tests_num': 42}
+    assert loaded_checkpoint.selector_state['score_averages'] == {'Products': 12.5}
+    assert loaded_checkpoint.seeded == {'QueryGroupMultiple:Products': 7}
+    assert not loaded_checkpoint.seed_completed
+    assert loaded_checkpoint.coverage_state['signatures'] == [['Products', '', '', '$top', '200', '', 3]]
+    assert loaded_checkpoint.mutation_operators == [{'operator': 'option.$top', 'uses': 5, 'successes': 2}]
+
+
+def test_checkpoint_is_replaced(tmp_path):
+    checkpoint_file = CheckpointFile(str(tmp_path), 'Northwind-1')
+    checkpoint_file.save(create_checkpoint())
+
+    checkpoint_file.save(Checkpoint('Northwind-1', random.getstate(), {}, {}, {'Products': 10}, True, {}, [], []))
+
+    assert checkpoint_file.load().seed_completed
+    assert [path.name for path in tmp_path.iterdir()] == ['checkpoint_Northwind-1.json']
+
+
+def test_missing_checkpoint(tmp_path):
+    with pytest.raises(CheckpointError):
+        CheckpointFile(str(tmp_path), 'Northwind-1').load()
+
+
+def test_invalid_checkpoint(tmp_path):
+    checkpoint_file = CheckpointFile(str(tmp_path), 'Northwind-1')
+    with open(checkpoint_file.path, 'w') as invalid_file:
+        invalid_file.write('{"collection_name": "Northwind-1"}')
+
+    with pytest.raises(CheckpointError):
+        checkpoint_file.load()
+
+
+# odfuzz.odfuzz patches the standard library by gevent, so every run is started in its own interpreter
+RUN_SCRIPT = """
+import sys
+import random
+from odfuzz.odfuzz import create_collection_name, init_logging
+from odfuzz.arguments import ArgParser
+from odfuzz.checkpoints import Checkpoint, CheckpointFile
+from odfuzz.statistics import Stats
+
+arguments = ArgParser().parse(sys.argv[1:])
+collection_name = create_collection_name(arguments)
+init_logging(arguments)
+checkpoint_file = CheckpointFile(Stats.checkpoints_directory, collection_name)
+if arguments.resume:
+    print(checkpoint_file.load().counters['tests_num'])
+else:
+    checkpoint_file.save(Checkpoint(collection_name, random.getstate(), {'tests_num': 42}, {}, {}, True, {}, [], []))
+    print(collection_name)
+"""
+
+
+INTERRUPTED_RUN_SCRIPT = """
+import os
+import sys
+import signal
+import gevent
+
+from odfuzz.odfuzz import init_logging, set_signal_handler, run_fuzzer
+from odfuzz.arguments import ArgParser
+from odfuzz.databases import STORES
+
+
+class FakeManager:
+    database_classes = STORES['memory']
+    collection_names = ['Northwind-1']
+    fuzzing = False
+
+    def start(self):
+        self.fuzzing = True
+        gevent.spawn_later(0.1, os.kill, os.getpid(), signal.SIGINT)
+        try:
+            gevent.sleep(10)
+        finally:
+            self.fuzzing = False
+
+    def stop_fuzzing(self):
+        print('stop_fuzzing', self.fuzzing)
+
+    def finish_minimizations(self):
+        pass
+
+    def flush_database(self):
+        pass
+
+    def save_checkpoint(self):
+        print('save_checkpoint', self.fuzzing)
+
+
+arguments = ArgParser().parse(sys.argv[1:])
+init_logging(arguments)
+set_signal_handler()
+run_fuzzer(FakeManager(), arguments, 'Northwind-1')
+"""
+
+
+def run(*arguments, script=RUN_SCRIPT):
+    process = subprocess.run([sys.executable, '-c', script, 'https://www.odata.org/Northwind.svc'] +
+                             list(arguments), stdout=subprocess.PIPE, check=True, universal_newlines=True)
+    return process.stdout.strip().splitlines()[-1]
+
+
+def test_checkpoint_is_found_by_resumed_run(tmp_path):
+    collection_name = run('-s', str(tmp_path), '-l', str(tmp_path))
+
+    assert run('-s', str(tmp_path), '-l', str(tmp_path), '--resume', collection_name) == '42'
+
+
+def test_checkpoint_of_interrupted_run_is_saved_after_fuzzing_stops(tmp_path):
+    process = subprocess.run([sys.executable, '-c', INTERRUPTED_RUN_SCRIPT, 'https://www.odata.org/Northwind.svc',
+                              '-s', str(tmp_path), '-l', str(tmp_path)],
+                             stdout=subprocess.PIPE, check=True, universal_newlines=True, timeout=60)
+
+    assert process.stdout.split('\n')[-3:-1] == ['stop_fuzzing False', 'save_checkpoint False']
+
+
+class FakeQuery:
+    def __init__(self, query_string):
+        self.query_string = query_string
+        self.entity_name = 'Customers'
+        self.response = None
+
+
+class SlowDispatcher:
+    concurrency = ConcurrencyController(2, 1, 2)
+
+    def get(self, query_string, **kwargs):
+        gevent.sleep(0.01)
+        response = requests.Response()
+        response.status_code = 404
+        response._content = b'{"error": {"code": "E", "message": {"value": "Not found"}}}'
+        return response
+
+
+class FakeDatabase:
+    def flush(self):
+        pass
+
+
+def test_checkpoint_waits_for_queries_in_flight(tmp_path, monkeypatch):
+    # the fuzzer redirects the standard error output to its log
+    monkeypatch.setattr(sys, 'stderr', sys.stderr)
+    Config.init()
+    checkpoints = CheckpointFile(str(tmp_path), 'Northwind-1')
+    fuzzer = Fuzzer(SlowDispatcher(), QueryableEntities(), FakeDatabase(), None, True, False, checkpoints=checkpoints)
+    handled = []
+
+    fuzzer._process([[FakeQuery('Customers?$top={}'.format(index))] for index in range(4)], handled.extend)
+    fuzzer.save_checkpoint()
+
+    assert len(handled) == 4
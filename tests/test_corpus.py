@@ -0,0 +1,158 @@
+import logging
+
+from pathlib import Path
+
+import pytest
+
+from odfuzz.corpus import SeedCorpus, FilterParser, parse_query_string, load_seed_corpus, redundant_entries
+from odfuzz.databases import InMemoryHandler, InMemoryDatabase
+from odfuzz.entities import DirectBuilder, QueryableEntities
+from odfuzz.exceptions import CorpusError
+from odfuzz.fuzzer import SingleQueryable, build_filter_string
+from odfuzz.restrictions import RestrictionsGroup
+
+NORTHWIND_METADATA = Path(__file__).parent.joinpath('integration', 'url_generator_only', 'metadata-northwind-v2.xml')
+
+
+@pytest.fixture
+def entities():
+    queryable_entities = QueryableEntities()
+    for queryable in DirectBuilder(NORTHWIND_METADATA.read_bytes(), RestrictionsGroup(None), 'GET').build():
+        queryable_entities.add(queryable)
+    return queryable_entities
+
+
+def create_entry(string, http='200', error_code='', entity_set='Customers', order=('_$top',), score=0):
+    return {'string': string, 'http': http, 'error_code': error_code, 'entity_set': entity_set, 'order': list(order),
+            'score': score}
+
+
+def rebuild_assigned(seed_corpus, entities):
+    rebuilt = []
+    for queryable, entries in seed_corpus.assign(entities):
+        for entry in entries:
+            query = SingleQueryable(queryable, logging.getLogger(), 1).rebuild_query(entry)
+            rebuilt.append((type(queryable).__name__, query.query_string))
+    return rebuilt
+
+
+@pytest.mark.parametrize('filter_string', [
+    'City eq \'Berlin\'',
+    'City eq \'Berlin\' and Region eq \'BE\' or Fax eq \'1\'',
+    'City eq \'Berlin\' and (Region eq \'BE\' or (Fax eq \'1\' and Phone ne \'2\'))',
+    '(City eq \'Berlin\' or Region eq \'BE\') and Fax eq datetime\'2000-01-01T00:00\'',
+    'substringof(City, \'a b)\') eq true or replace(City, \'x\', \'y\') ne \'it\'\'s\''
+])
+def test_filter_is_built_back_from_parsed_parts(filter_string):
+    assert build_filter_string(FilterParser(filter_string).parse()) == filter_string
+
+
+def test_filter_parts_are_cross_referenced():
+    filter_data = FilterParser('(City eq \'Berlin\' or Region eq \'BE\') and round(Freight) gt 3').parse()
+    city, region, freight = filter_data['parts']
+    outer_logical, inner_logical = filter_data['logicals']
+    group = filter_data['groups'][0]
+
+    assert (inner_logical['left_id'], inner_logical['right_id']) == (city['id'], region['id'])
+    assert inner_logical['group_id'] == group['id'] and group['logicals'] == [inner_logical['id']]
+    assert (outer_logical['left_id'], outer_logical['right_id']) == (group['id'], freight['id'])
+    assert freight['func'] == 'round' and freight['proprties'] == ['Freight'] and freight['params'] is None
+    assert freight['return_type'] == 'Edm.Int32' and freight['operand'] == '3'
+
+
+@pytest.mark.parametrize('filter_string', [
+    'City eq \'Berlin',
+    '(City eq \'Berlin\' or Region eq \'BE\'',
+    'City like \'Berlin\'',
+    'unknown(City) eq 1'
+])
+def test_invalid_filter_is_not_parsed(filter_string):
+    with pytest.raises(CorpusError):
+        FilterParser(filter_string).parse()
+
+
+def test_query_string_is_parsed():
+    entry = parse_query_string('Customers(CustomerID=\'ALFKI\')/Orders?$orderby=Freight desc,ShipCity&$top=5'
+                               '&sap-client=500&$format=json')
+
+    assert entry['accessible_set'] == 'Customers'
+    assert entry['accessible_keys'] == {'CustomerID': '\'ALFKI\''}
+    assert entry['order'] == ['_$orderby', '_$top']
+    assert entry['_$orderby'] == [['Freight', 'desc'], ['ShipCity', '']]
+    assert entry['_$top'] == '5'
+
+
+def test_urls_file_is_loaded(tmp_path):
+    urls_file = tmp_path.joinpath('list_urls.txt')
+    urls_file.write_text('hash1:Customers?$top=1\n'
+                         'hash1:Customers?$top=1\n'
+                         'hash2:Customers?$filter=City eq \'Berlin\n'
+                         'hash3:Customers(CustomerID=\'ALFKI\')\n', encoding='utf-8')
+
+    seed_corpus = load_seed_corpus(str(urls_file), None)
+
+    assert len(seed_corpus) == 2
+
+
+def test_parsed_urls_are_rebuilt_by_matching_query_groups(entities):
+    seed_corpus = SeedCorpus([parse_query_string(query_string) for query_string in [
+        'Customers?$filter=Country eq \'Germany\' and (City eq \'Berlin\' or substringof(City, \'Ber\') eq true)'
+        '&$top=5&sap-client=500&$format=json',
+        'Customers(CustomerID=\'ALFKI\')?$expand=Orders&sap-client=500&$format=json',
+        'Customers(CustomerID=\'ALFKI\')/Orders?$filter=Freight gt 1.5m&sap-client=500&$format=json',
+        'Customers?$filter=Unknown eq 1&sap-client=500&$format=json',
+        'Suppliers2?$top=1&sap-client=500&$format=json'
+    ]])
+
+    assert rebuild_assigned(seed_corpus, entities) == [
+        ('QueryGroupSingle', 'Customers(CustomerID=\'ALFKI\')?$expand=Orders&sap-client=500&$format=json'),
+        ('QueryGroupMultiple', 'Customers?$filter=Country eq \'Germany\' and (City eq \'Berlin\' or '
+                               'substringof(City, \'Ber\') eq true)&$top=5&sap-client=500&$format=json'),
+        ('QueryGroupAssociationSet', 'Customers(CustomerID=\'ALFKI\')/Orders?$filter=Freight gt 1.5m'
+                                     '&sap-client=500&$format=json')
+    ]
+
+
+def test_entries_of_collection_are_rebuilt(entities):
+    database = InMemoryHandler(InMemoryDatabase('corpus-collection'))
+    database.delete_collection()
+    entry = parse_query_string('Customers?$top=5&sap-client=500&$format=json')
+    database.save_entry(dict(entry, http='200', entity_set='Customers', score=0))
+
+    seed_corpus = load_seed_corpus('corpus-collection', (InMemoryHandler, InMemoryDatabase))
+
+    assert rebuild_assigned(seed_corpus, entities) == [
+        ('QueryGroupMultiple', 'Customers?$top=5&sap-client=500&$format=json')
+    ]
+
+
+def test_empty_corpus_is_rejected():
+    with pytest.raises(CorpusError):
+        load_seed_corpus('empty-collection', (InMemoryHandler, InMemoryDatabase))
+
+
+def test_redundant_entries_keep_every_signature():
+    entries = [
+        create_entry('Customers?$top=10'),
+        create_entry('Customers?$top=1'),
+        create_entry('Customers?$top=100'),
+        create_entry('Customers?$top=2&$skip=1', order=('_$top', '_$skip')),
+        create_entry('Customers?$top=-1', http='400', error_code='SY/530'),
+        create_entry('Orders?$top=1', entity_set='Orders'),
+        create_entry('Customers?$top=1000', http='500', score=5),
+        create_entry('Customers?$top=1001', http='500', score=3),
+        create_entry('Customers?$top=10000', http='500', score=8)
+    ]
+
+    redundant = redundant_entries(entries, signature_entries_num=2)
+
+    assert [entry['string'] for entry in redundant] == ['Customers?$top=1001', 'Customers?$top=100']
+
+
+def test_corpus_is_minimized_by_known_responses():
+    seed_corpus = SeedCorpus([create_entry('Customers?$top=1'), create_entry('Customers?$top=2'),
+                              create_entry('Customers?$top=3'), parse_query_string('Customers?$top=4'),
+                              parse_query_string('Customers?$top=5')])
+
+    assert seed_corpus.minimize() == 1
+    assert len(seed_corpus) == 4
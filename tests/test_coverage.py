@@ -0,0 +1,73 @@
+import logging
+
+from collections import namedtuple
+
+from odfuzz.coverage import CoverageMap, filter_features, options_combination
+from odfuzz.fuzzer import SingleQueryable
+
+EntitySet = namedtuple('EntitySet', 'name')
+QueryOption = namedtuple('QueryOption', 'name')
+
+
+class FakeQueryGroup:
+    def __init__(self, *options_sequence):
+        self.entity_set = EntitySet('Customers')
+        self._options_sequence = list(options_sequence)
+
+    def random_options(self):
+        return [QueryOption(option_name) for option_name in self._options_sequence.pop(0)]
+
+
+def create_entry(http='200', error_code='', order=('_$filter',), parts=None):
+    return {'entity_set': 'Customers', 'http': http, 'error_code': error_code, 'order': list(order),
+            '_$filter': {'groups': [], 'logicals': [], 'parts': parts} if parts else None}
+
+
+def test_new_signatures_are_counted():
+    coverage = CoverageMap()
+    parts = [{'name': 'City', 'operator': 'eq'}, {'func': 'substringof', 'proprties': ['City'], 'operator': 'eq'}]
+
+    assert coverage.update(create_entry(parts=parts)) == 2
+    assert coverage.update(create_entry(parts=parts)) == 0
+    assert coverage.update(create_entry(http='500', error_code='SY/530', parts=parts[:1])) == 1
+    assert coverage.update(create_entry(order=('_$top',))) == 1
+    assert len(coverage) == 4
+
+
+def test_features_of_filter_parts():
+    parts = [{'name': 'City', 'operator': 'ne'}, {'func': 'concat', 'proprties': ['City', 'Region'], 'operator': 'eq'}]
+
+    assert filter_features({'parts': parts}) == [('City', 'ne'), ('City', 'concat'), ('Region', 'concat')]
+    assert filter_features(None) == [('', '')]
+
+
+def test_combinations_are_counted_regardless_of_order():
+    coverage = CoverageMap()
+    coverage.update(create_entry(order=('_$top', '_search')))
+
+    assert options_combination(['_search', '_$top']) == options_combination(['$top', 'search'])
+    assert coverage.combination_hits('Customers', ['search', '$top']) == 1
+    assert coverage.combination_hits('Customers', ['$top']) == 0
+
+
+def test_state_is_restored():
+    coverage = CoverageMap()
+    coverage.update(create_entry(parts=[{'name': 'City', 'operator': 'eq'}]))
+
+    restored_coverage = CoverageMap()
+    restored_coverage.restore_state(coverage.state())
+
+    assert len(restored_coverage) == 1
+    assert restored_coverage.update(create_entry(parts=[{'name': 'City', 'operator': 'eq'}])) == 0
+    assert restored_coverage.combination_hits('Customers', ['$filter']) == 2
+
+
+def test_least_sent_options_are_generated():
+    coverage = CoverageMap()
+    coverage.update(create_entry(order=('_$filter',)))
+    coverage.update(create_entry(order=('_$top',)))
+    query_group = FakeQueryGroup(['$filter'], ['$top', '$skip'], ['$top'])
+
+    queryable = SingleQueryable(query_group, logging.getLogger(), 1, coverage)
+
+    assert [option.name for option in queryable._select_options()] == ['$top', '$skip']
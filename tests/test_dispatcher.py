@@ -0,0 +1,266 @@
+import io
+import gzip
+import random
+import time
+import gevent
+import pytest
+import requests
+
+from odfuzz.constants import CONCURRENCY_WINDOW_SIZE, RESPONSE_CHUNK_SIZE
+from odfuzz.fuzzer import DispatchPipeline, RetryPolicy, ConcurrencyController, TokenBucket, RateLimiter, percentile, \
+    read_bounded_content, response_length
+
+
+def test_pipeline_yields_queries_in_order_of_completion():
+    delays = {'slow': 0.05, 'fast': 0.0}
+
+    def send_query(query):
+        gevent.sleep(delays[query])
+        return True
+
+    pipeline = DispatchPipeline(send_query, 2)
+
+    pipeline.submit('slow', None)
+    pipeline.submit('fast', None)
+    completed = [query for query, _ in pipeline.join()]
+
+    assert completed == ['fast', 'slow']
+    assert pipeline.unfinished == 0
+
+
+def test_pipeline_keeps_handler_of_submitted_query():
+    pipeline = DispatchPipeline(lambda query: True, 1)
+    handler = object()
+
+    pipeline.submit('query', handler)
+
+    assert list(pipeline.join()) == [('query', handler)]
+
+
+def test_pipeline_completed_does_not_block():
+    pipeline = DispatchPipeline(lambda query: gevent.sleep(10), 1)
+
+    pipeline.submit('query', None)
+
+    assert list(pipeline.completed()) == []
+    assert pipeline.unfinished == 1
+    pipeline.stop()
+
+
+def test_pipeline_stop_drops_queries_not_completed_in_time():
+    def send_query(query):
+        gevent.sleep(query)
+        return True
+
+    pipeline = DispatchPipeline(send_query, 2)
+    for query in (0.01, 10, 0):
+        pipeline.submit(query, None)
+
+    # the third query is still waiting for a free greenlet
+    assert pipeline.stop(timeout=0.5) == 2
+    assert [query for query, _ in pipeline.completed()] == [0.01]
+    assert pipeline.unfinished == 0
+    assert list(pipeline.join()) == []
+
+
+def test_pipeline_reraises_worker_exception():
+    def send_query(query):
+        raise KeyError(query)
+
+    pipeline = DispatchPipeline(send_query, 1)
+    pipeline.submit('query', None)
+
+    with pytest.raises(KeyError):
+        list(pipeline.join())
+    assert pipeline.unfinished == 0
+
+
+def test_pipeline_skips_queries_that_were_not_sent():
+    pipeline = DispatchPipeline(lambda query: query != 'dropped', 2)
+
+    pipeline.submit('dropped', None)
+    pipeline.submit('sent', None)
+
+    assert [query for query, _ in pipeline.join()] == ['sent']
+    assert pipeline.unfinished == 0
+
+
+def test_retry_policy_respects_attempts_cap():
+    policy = RetryPolicy(3, 1, 100)
+
+    assert policy.can_retry(1)
+    assert policy.can_retry(2)
+    assert not policy.can_retry(3)
+
+
+def test_retry_policy_delay_grows_exponentially_up_to_limit():
+    policy = RetryPolicy(10, 1, 5)
+
+    for _ in range(50):
+        assert 0 <= policy.delay(1) <= 1
+        assert 0 <= policy.delay(3) <= 4
+        assert 0 <= policy.delay(8) <= 5
+
+
+def test_retry_policy_does_not_consume_global_random_state():
+    policy = RetryPolicy(10, 1, 5)
+    random.seed(1)
+    expected = random.random()
+
+    random.seed(1)
+    policy.delay(2)
+
+    assert random.random() == expected
+
+
+def test_percentile_nearest_rank():
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([7], 95) == 7
+
+
+def record_window(controller, elapsed_seconds):
+    for _ in range(max(controller.limit, CONCURRENCY_WINDOW_SIZE)):
+        controller.record_response(elapsed_seconds, 200)
+
+
+def test_concurrency_controller_increases_limit_on_stable_latency():
+    controller = ConcurrencyController(5, 1, 10)
+
+    record_window(controller, 0.1)
+    record_window(controller, 0.1)
+    record_window(controller, 0.1)
+
+    assert controller.limit == 7
+
+
+def test_concurrency_controller_decreases_limit_on_rising_latency():
+    controller = ConcurrencyController(8, 1, 10)
+
+    record_window(controller, 0.1)
+    record_window(controller, 1.0)
+
+    assert controller.limit == 4
+
+
+def test_concurrency_controller_decreases_limit_once_per_burst_of_overloads():
+    controller = ConcurrencyController(8, 1, 10)
+    for _ in range(8):
+        controller.acquire()
+    for _ in range(8):
+        controller.release()
+        controller.record_response(0.1, 503)
+
+    assert controller.limit == 4
+
+
+def test_concurrency_controller_respects_bounds():
+    controller = ConcurrencyController(2, 2, 3)
+
+    controller.record_failure()
+    assert controller.limit == 2
+
+    for _ in range(5):
+        record_window(controller, 0.1)
+    assert controller.limit == 3
+
+
+def test_concurrency_controller_blocks_over_limit():
+    controller = ConcurrencyController(1, 1, 1)
+    controller.acquire()
+    waiting = gevent.spawn(controller.acquire)
+
+    gevent.sleep(0)
+    assert not waiting.dead
+
+    controller.release()
+    waiting.join(timeout=1)
+    assert waiting.dead
+    assert controller.in_flight == 1
+
+
+def test_token_bucket_allows_initial_burst():
+    bucket = TokenBucket(1000, capacity=5)
+    start = time.monotonic()
+
+    for _ in range(5):
+        bucket.acquire()
+
+    assert time.monotonic() - start < 0.05
+
+
+def test_token_bucket_paces_calls_over_capacity():
+    bucket = TokenBucket(50, capacity=1)
+    start = time.monotonic()
+
+    for _ in range(6):
+        bucket.acquire()
+
+    assert time.monotonic() - start >= 0.09
+
+
+def test_rate_limiter_uses_bucket_of_entity_set():
+    limiter = RateLimiter(None, {'Slow': 5})
+    start = time.monotonic()
+
+    for _ in range(6):
+        limiter.acquire('Fast')
+    assert time.monotonic() - start < 0.05
+
+    for _ in range(6):
+        limiter.acquire('Slow')
+    assert time.monotonic() - start >= 0.15
+
+
+def build_streamed_response(body, declared_length=True):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    if declared_length:
+        response.headers['Content-Length'] = str(len(body))
+    return response
+
+
+def test_bounded_content_keeps_whole_small_body():
+    response = build_streamed_response(b'{"d": []}')
+    read_bounded_content(response, 100)
+
+    assert response.content == b'{"d": []}'
+    assert not response.truncated
+    assert response_length(response) == 9
+
+
+def test_bounded_content_keeps_only_prefix_of_large_body():
+    body = b'x' * 200000
+    response = build_streamed_response(body)
+    read_bounded_content(response, 1000)
+
+    assert response.content == body[:1000]
+    assert response.truncated
+    assert response_length(response) == 200000
+
+
+def test_bounded_content_stops_reading_body_without_declared_length():
+    response = build_streamed_response(b'x' * 200000, declared_length=False)
+    read_bounded_content(response, 1000)
+
+    assert len(response.content) == 1000
+    assert response.truncated
+    assert response_length(response) == RESPONSE_CHUNK_SIZE
+
+
+def test_bounded_content_ignores_declared_length_of_compressed_body():
+    generator = random.Random(1)
+    body = gzip.compress(bytes(generator.getrandbits(8) for _ in range(200000)))
+    response = build_streamed_response(body)
+    response.headers['Content-Encoding'] = 'gzip'
+    read_bounded_content(response, 1000)
+
+    assert response.truncated
+    assert response_length(response) == RESPONSE_CHUNK_SIZE
+
+
+def test_response_length_of_fully_read_response():
+    response = requests.Response()
+    response._content = b'content'
+    assert response_length(response) == 7
@@ -0,0 +1,210 @@
+import io
+import json
+
+from odfuzz.distributed import LeaseTable, Coordinator, CoordinatedWorker, ReportedResults
+from odfuzz.exceptions import CoordinatorError
+from odfuzz.statistics import Stats
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.entries = []
+
+    def save_entry(self, data):
+        self.entries.append(data)
+
+    def total_entries(self):
+        return len(self.entries)
+
+
+def post(coordinator, path, message):
+    body = json.dumps(message).encode('utf-8')
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': path,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body)
+    }
+    statuses = []
+    reply = coordinator.application(environ, lambda status, headers: statuses.append(status))
+    return statuses[0], json.loads(b''.join(reply).decode('utf-8'))
+
+
+def test_leases_do_not_overlap():
+    leases = LeaseTable(['A', 'B', 'C'], 2)
+
+    assert leases.acquire('worker1', now=0) == ['A', 'B']
+    assert leases.acquire('worker2', now=0) == ['C']
+    assert leases.acquire('worker3', now=0) == []
+
+
+def test_repeated_lease_request_returns_same_entity_sets():
+    leases = LeaseTable(['A', 'B', 'C'], 2)
+
+    leases.acquire('worker1', now=0)
+
+    assert leases.acquire('worker1', now=1) == ['A', 'B']
+
+
+def test_expired_lease_is_handed_out_again():
+    leases = LeaseTable(['A', 'B'], 2, lease_timeout=10)
+
+    leases.acquire('worker1', now=0)
+
+    assert not leases.renew('worker1', now=11)
+    assert leases.acquire('worker2', now=11) == ['A', 'B']
+
+
+def test_renewed_lease_does_not_expire():
+    leases = LeaseTable(['A', 'B'], 2, lease_timeout=10)
+
+    leases.acquire('worker1', now=0)
+    assert leases.renew('worker1', now=8)
+
+    assert leases.acquire('worker2', now=16) == []
+
+
+def test_released_entity_sets_are_handed_out_again():
+    leases = LeaseTable(['A', 'B'], 1)
+
+    leases.acquire('worker1', now=0)
+    leases.release('worker1')
+
+    assert leases.holders == []
+    assert leases.acquire('worker2', now=0) == ['B']
+
+
+def test_coordinator_splits_entity_sets_among_workers():
+    coordinator = Coordinator(['A', 'B', 'C', 'D'], FakeDatabase(), 2)
+
+    _, first_reply = post(coordinator, '/lease', {'worker': 'worker1'})
+    _, second_reply = post(coordinator, '/lease', {'worker': 'worker2'})
+
+    assert first_reply == {'entity_sets': ['A', 'B'], 'stop': False}
+    assert second_reply == {'entity_sets': ['C', 'D'], 'stop': False}
+
+
+def test_coordinator_gathers_results():
+    database = FakeDatabase()
+    coordinator = Coordinator(['A'], database, 1)
+    result = {'http': '500', 'error_code': 'E', 'error_message': 'M', 'entity_set': 'A', 'string': 'A?$top=1',
+              'score': 100}
+
+    post(coordinator, '/lease', {'worker': 'worker1'})
+    _, reply = post(coordinator, '/heartbeat', {'worker': 'worker1', 'stats': {}, 'results': [result]})
+
+    assert reply == {'stop': False}
+    assert database.entries == [result]
+
+
+def test_coordinator_stops_worker_without_lease():
+    coordinator = Coordinator(['A'], FakeDatabase(), 1)
+
+    _, reply = post(coordinator, '/heartbeat', {'worker': 'unknown', 'stats': {}, 'results': []})
+
+    assert reply == {'stop': True}
+
+
+def test_coordinator_aggregates_latest_stats_of_workers():
+    coordinator = Coordinator(['A', 'B'], FakeDatabase(), 2)
+    tests_num = Stats.tests_num
+
+    post(coordinator, '/lease', {'worker': 'worker1'})
+    post(coordinator, '/lease', {'worker': 'worker2'})
+    post(coordinator, '/heartbeat', {'worker': 'worker1', 'stats': {'tests_num': 5}, 'results': []})
+    post(coordinator, '/release', {'worker': 'worker1', 'stats': {'tests_num': 10}, 'results': []})
+    post(coordinator, '/release', {'worker': 'worker2', 'stats': {'tests_num': 3}, 'results': []})
+
+    class FakeServer:
+        def stop(self):
+            pass
+
+    coordinator._stop(FakeServer(), 0)
+
+    assert Stats.tests_num - tests_num == 13
+
+
+def test_coordinator_rejects_invalid_message():
+    coordinator = Coordinator(['A'], FakeDatabase(), 1)
+
+    status, _ = post(coordinator, '/lease', {})
+
+    assert status.startswith('400')
+
+
+def test_reported_results_contain_only_server_errors():
+    database = FakeDatabase()
+    results = ReportedResults(database)
+
+    results.save_entry({'http': '200', 'entity_set': 'A', 'string': 'A'})
+    results.save_entry({'http': '500', 'entity_set': 'A', 'string': 'A?$top=1', '_id': 1})
+
+    assert results.total_entries() == 2
+    assert [result['string'] for result in results.peek()] == ['A?$top=1']
+    results.discard(1)
+    assert results.peek() == []
+
+
+def test_results_are_reported_again_after_failed_heartbeat():
+    class FakeClient:
+        def __init__(self):
+            self.heartbeats = 0
+            self.reported = []
+
+        def heartbeat(self, stats, results, failures=(), operators=()):
+            self.heartbeats += 1
+            if self.heartbeats == 1:
+                raise CoordinatorError('Cannot communicate with the coordinator')
+            self.reported.extend(result['string'] for result in results)
+            return False
+
+    client = FakeClient()
+    worker = CoordinatedWorker(client)
+    results = ReportedResults(FakeDatabase())
+    results.save_entry({'http': '500', 'entity_set': 'A', 'string': 'A?$top=1'})
+
+    assert not worker._send_heartbeat(results)
+    results.save_entry({'http': '500', 'entity_set': 'A', 'string': 'A?$top=2'})
+    assert not worker._send_heartbeat(results)
+
+    assert client.reported == ['A?$top=1', 'A?$top=2']
+    assert results.peek() == []
+
+
+def test_coordinator_merges_failures_of_workers():
+    coordinator = Coordinator(['A'], FakeDatabase(), 1)
+    Stats.failures.clear()
+    failure = {'entity_set': 'A', 'error_code': 'E', 'error_message': 'M', 'count': 2, 'first_seen': '2019-01-01',
+               'url': 'A?$top=1'}
+
+    post(coordinator, '/lease', {'worker': 'worker1'})
+    post(coordinator, '/heartbeat', {'worker': 'worker1', 'stats': {}, 'failures': [failure], 'results': []})
+    post(coordinator, '/release', {'worker': 'worker1', 'stats': {}, 'failures': [dict(failure, count=3)],
+                                   'results': []})
+
+    class FakeServer:
+        def stop(self):
+            pass
+
+    coordinator._stop(FakeServer(), 0)
+
+    assert [record['count'] for record in Stats.failures.records()] == [3]
+
+
+def test_coordinator_merges_mutation_operators_of_workers():
+    coordinator = Coordinator(['A'], FakeDatabase(), 1)
+    Stats.mutation_operators.clear()
+    operator = {'operator': 'option.$top', 'uses': 2, 'successes': 1}
+
+    post(coordinator, '/lease', {'worker': 'worker1'})
+    post(coordinator, '/heartbeat', {'worker': 'worker1', 'stats': {}, 'operators': [operator], 'results': []})
+    post(coordinator, '/release', {'worker': 'worker1', 'stats': {}, 'operators': [dict(operator, uses=5)],
+                                   'results': []})
+
+    class FakeServer:
+        def stop(self):
+            pass
+
+    coordinator._stop(FakeServer(), 0)
+
+    assert Stats.mutation_operators.records() == [{'operator': 'option.$top', 'uses': 5, 'successes': 1}]
@@ -0,0 +1,111 @@
+import os
+import sys
+import uuid
+from collections import namedtuple
+
+from bson import ObjectId
+
+from odfuzz.config import Config
+from odfuzz.databases import InMemoryHandler, InMemoryDatabase
+from odfuzz.entities import QueryableEntities
+from odfuzz.fuzzer import Fuzzer
+from odfuzz.islands import Island, MigrationChannel, island_collection_name
+from odfuzz.statistics import Stats
+
+EntitySet = namedtuple('EntitySet', 'name')
+Queryable = namedtuple('Queryable', 'entity_set')
+
+
+def create_entry(string, score):
+    return {'_id': ObjectId(), 'string': string, 'entity_set': 'Customers', 'http': '200', 'score': score}
+
+
+def create_population(*entries):
+    database = InMemoryHandler(InMemoryDatabase(str(uuid.uuid4())))
+    for entry in entries:
+        database.save_entry(entry)
+    return database
+
+
+def strings(database):
+    return sorted(entry['string'] for entry in database.find_all_entries())
+
+
+def create_islands(interval, size):
+    """Connect two islands into a ring."""
+    read_fd0, write_fd0 = os.pipe()
+    read_fd1, write_fd1 = os.pipe()
+    return (Island(0, MigrationChannel(read_fd0, write_fd1), interval, size),
+            Island(1, MigrationChannel(read_fd1, write_fd0), interval, size))
+
+
+def test_island_collection_name():
+    assert island_collection_name('Northwind-1', 2) == 'Northwind-1-island2'
+
+
+def test_entries_are_sent_through_channel():
+    read_fd, write_fd = os.pipe()
+    channel = MigrationChannel(read_fd, write_fd)
+    entries = [create_entry('Customers?$top=1', 5), create_entry('Customers?$top=2', 3)]
+
+    assert channel.receive() == []
+    channel.send(entries[:1])
+    channel.send(entries[1:])
+
+    assert channel.receive() == entries
+    assert channel.receive() == []
+
+
+def test_migrants_are_dropped_when_not_taken_in():
+    read_fd, write_fd = os.pipe()
+    channel = MigrationChannel(read_fd, write_fd)
+    entries = [create_entry('Customers?$filter=' + 'A' * 1000, index) for index in range(100)]
+
+    assert channel.send(entries)
+    assert not channel.send(entries)
+
+
+def test_best_queries_migrate_after_interval():
+    island0, island1 = create_islands(interval=2, size=1)
+    population0 = create_population(create_entry('Customers?$top=1', 50), create_entry('Customers?$top=2', 1))
+    population1 = create_population(create_entry('Customers?$skip=1', 10), create_entry('Customers?$skip=2', 2))
+    migrants_num = Stats.migrants_num
+
+    island0.evolved(population0)
+    island1.evolved(population1)
+    assert strings(population1) == ['Customers?$skip=1', 'Customers?$skip=2']
+
+    island0.evolved(population0)
+    island1.evolved(population1)
+
+    assert strings(population1) == ['Customers?$skip=1', 'Customers?$top=1']
+    assert Stats.migrants_num - migrants_num == 1
+
+
+def test_present_migrants_are_not_settled():
+    island0, island1 = create_islands(interval=1, size=1)
+    population0 = create_population(create_entry('Customers?$top=1', 50))
+    population1 = create_population(create_entry('Customers?$top=1', 50), create_entry('Customers?$skip=2', 2))
+
+    island0.evolved(population0)
+    island1.evolved(population1)
+
+    assert strings(population1) == ['Customers?$skip=2', 'Customers?$top=1']
+
+
+def test_island_seeds_only_its_partition(monkeypatch):
+    # the fuzzer redirects the standard error output to its log
+    monkeypatch.setattr(sys, 'stderr', sys.stderr)
+    Config.init()
+    entities = QueryableEntities()
+    for entity_set_name in ('Customers', 'Orders', 'Products', 'Suppliers'):
+        entities.add(Queryable(EntitySet(entity_set_name)))
+    partition = entities.partition(2)[1]
+    fuzzer = Fuzzer(None, entities, create_population(), None, False, False, seeded_entities=partition)
+    seeded = []
+    monkeypatch.setattr(fuzzer, '_seed_randomly', lambda queryable: seeded.append(queryable.entity_set.name))
+
+    fuzzer.seed_population()
+
+    assert seeded == ['Orders', 'Suppliers']
+    assert len(fuzzer._selector.state()['scheduler']['arms']) == 4
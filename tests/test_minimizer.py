@@ -0,0 +1,138 @@
+import sys
+from collections import namedtuple
+
+import gevent
+import pytest
+
+from odfuzz.config import Config
+from odfuzz.corpus import FilterParser
+from odfuzz.entities import QueryableEntities
+from odfuzz.fuzzer import Fuzzer, build_filter_string
+from odfuzz.minimizer import FailureMinimizer, smaller_entries, shorten_value
+
+FakeQuery = namedtuple('FakeQuery', 'query_string')
+
+
+def build_query(entry):
+    options = []
+    for option_key in entry['order']:
+        value = entry[option_key]
+        if option_key == '_$filter':
+            value = build_filter_string(value)
+        elif option_key == '_$orderby':
+            value = ','.join(' '.join(item).strip() for item in value)
+        options.append(option_key[1:] + '=' + value)
+    return FakeQuery('Customers?' + '&'.join(options))
+
+
+def create_entry(filter_string=None, **options):
+    entry = {'order': []}
+    if filter_string:
+        entry['order'].append('_$filter')
+        entry['_$filter'] = FilterParser(filter_string).parse()
+    for option_name, value in options.items():
+        entry['order'].append('_$' + option_name)
+        entry['_$' + option_name] = value
+    return entry
+
+
+@pytest.mark.parametrize('value,shortened', [
+    ('12345', '12'),
+    ('-12.5m', '-12m'),
+    ('7', None),
+    ('\'Berlin\'', '\'Ber\''),
+    ('\'it\'\'s\'', '\'it\''),
+    ('\'\'', None),
+    ('datetime\'2000-01-01T00:00\'', None),
+    ('true', None),
+    (None, None)
+])
+def test_values_are_shortened(value, shortened):
+    assert shorten_value(value) == shortened
+
+
+def test_smaller_entries_are_derived():
+    entry = create_entry('City eq \'Berlin\' and Region eq \'BE\'', top='10', orderby=[['City', 'desc']])
+
+    smaller_strings = [build_query(smaller).query_string for smaller in smaller_entries(entry, lambda name: True)]
+
+    assert smaller_strings == [
+        'Customers?$top=10&$orderby=City desc',
+        'Customers?$filter=Region eq \'BE\'&$top=10&$orderby=City desc',
+        'Customers?$filter=City eq \'Berlin\'&$top=10&$orderby=City desc',
+        'Customers?$filter=City eq \'Ber\' and Region eq \'BE\'&$top=10&$orderby=City desc',
+        'Customers?$filter=City eq \'Berlin\' and Region eq \'B\'&$top=10&$orderby=City desc',
+        'Customers?$filter=City eq \'Berlin\' and Region eq \'BE\'&$orderby=City desc',
+        'Customers?$filter=City eq \'Berlin\' and Region eq \'BE\'&$top=1&$orderby=City desc',
+        'Customers?$filter=City eq \'Berlin\' and Region eq \'BE\'&$top=10',
+        'Customers?$filter=City eq \'Berlin\' and Region eq \'BE\'&$top=10&$orderby=City'
+    ]
+
+
+def test_required_filter_is_not_deleted():
+    entry = create_entry('City eq \'Berlin\'', top='1')
+
+    smaller_strings = [build_query(smaller).query_string
+                       for smaller in smaller_entries(entry, lambda name: name != '$filter')]
+
+    assert smaller_strings == ['Customers?$filter=City eq \'Ber\'&$top=1', 'Customers?$filter=City eq \'Berlin\'']
+
+
+def test_failing_query_is_minimized():
+    entry = create_entry('City eq \'Berlin\' and (Region eq \'BE\' or Fax eq \'12345\')', top='100', skip='5')
+    reproduces = []
+
+    def reproduces_failure(query):
+        reproduces.append(query.query_string)
+        return 'Fax' in query.query_string
+
+    minimizer = FailureMinimizer(build_query, reproduces_failure, 4)
+    minimized = minimizer.minimize(build_query(entry), entry, lambda name: name != '$filter')
+
+    assert minimized.query_string == 'Customers?$filter=Fax eq \'\''
+    assert len(reproduces) == len(set(reproduces))
+
+
+def test_minimization_is_bounded_by_rounds():
+    entry = create_entry(top='123456789')
+
+    minimizer = FailureMinimizer(build_query, lambda query: '$top' in query.query_string, 1, rounds=2)
+    minimized = minimizer.minimize(build_query(entry), entry, lambda name: True)
+
+    assert minimized.query_string == 'Customers?$top=12'
+
+
+def create_minimizing_fuzzer(monkeypatch, duration):
+    # the fuzzer redirects the standard error output to its log
+    monkeypatch.setattr(sys, 'stderr', sys.stderr)
+    Config.init()
+    fuzzer = Fuzzer(None, QueryableEntities(), None, None, False, False, minimize_failures=True)
+    minimized = []
+
+    def minimize_failure(query, entry):
+        gevent.sleep(duration)
+        minimized.append(query.query_string)
+
+    fuzzer._minimize_failure = minimize_failure
+    return fuzzer, minimized
+
+
+def test_queued_minimizations_are_finished(monkeypatch):
+    fuzzer, minimized = create_minimizing_fuzzer(monkeypatch, 0.01)
+    for index in range(5):
+        fuzzer._minimizations.put((FakeQuery('Customers?$top={}'.format(index)), {}))
+
+    fuzzer.finish_minimizations(timeout=5)
+
+    assert sorted(minimized) == ['Customers?$top={}'.format(index) for index in range(5)]
+    assert len(fuzzer._minimizers) == 0
+
+
+def test_unfinished_minimizations_are_stopped(monkeypatch):
+    fuzzer, minimized = create_minimizing_fuzzer(monkeypatch, 10)
+    fuzzer._minimizations.put((FakeQuery('Customers?$top=1'), {}))
+
+    fuzzer.finish_minimizations(timeout=0.01)
+
+    assert minimized == []
+    assert len(fuzzer._minimizers) == 0
@@ -0,0 +1,59 @@
+import random
+
+from odfuzz.operators import MutationOperators
+
+
+def choose_many(operators, number, base_weights=None):
+    return [operators.choose('StringMutator', ['flip_bit', 'swap_chars'], base_weights) for _ in range(number)]
+
+
+def test_operators_are_chosen_uniformly_without_successes():
+    operators = MutationOperators()
+    random.seed(1)
+    chosen = choose_many(operators, 1000)
+
+    random.seed(1)
+    assert chosen == [random.choice(['flip_bit', 'swap_chars']) for _ in range(1000)]
+
+
+def test_successful_operators_are_preferred():
+    operators = MutationOperators()
+    operators.reward(['StringMutator.flip_bit'] * 10, True)
+    operators.reward(['StringMutator.swap_chars'] * 10, False)
+    random.seed(1)
+
+    assert choose_many(operators, 100).count('flip_bit') > 80
+
+
+def test_base_weights_are_respected():
+    operators = MutationOperators()
+    random.seed(1)
+
+    assert choose_many(operators, 1000, [0.1, 0.9]).count('flip_bit') < 150
+
+
+def test_applied_operators_are_taken():
+    operators = MutationOperators()
+    choose_many(operators, 1)
+    operators.start()
+    operators.choose('option', ['$filter'])
+    operators.choose('action', ['delete', 'mutate'], [0.0, 1.0])
+
+    assert operators.take() == ['option.$filter', 'action.mutate']
+    assert operators.take() == []
+
+
+def test_records_are_merged():
+    operators = MutationOperators()
+    operators.reward(['option.$top', 'NumberMutator.increment_value'], True)
+    reported_operators = MutationOperators()
+    reported_operators.reward(['option.$top'], False)
+
+    operators.merge(reported_operators.records())
+
+    assert operators.records() == [
+        {'operator': 'NumberMutator.increment_value', 'uses': 1, 'successes': 1},
+        {'operator': 'option.$top', 'uses': 2, 'successes': 1}
+    ]
+    assert operators.weight('option.$top') == 2 / 4
+    assert operators.weight('option.$skip') == 1 / 2
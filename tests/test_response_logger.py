@@ -53,3 +53,15 @@ def test_invalid_json_response_metadata_key(invalid_metadata_key_json):
         ResponseTimeLogger().get_json_data_count(invalid_metadata_key_json)
     except:
         assert False
+
+
+def test_truncated_xml_response_count():
+    content = b'<feed xmlns="http://www.w3.org/2005/Atom"><entry><id>1</id></entry><entry xml:base="/"><id>2</id></en'
+    count = ResponseTimeLogger().get_truncated_xml_data_count(content)
+    assert count == 2
+
+
+def test_truncated_json_response_count():
+    content = b'{"d": {"results": [{"__metadata": {"uri": "1"}}, {"__metadata": {"uri": "2"}}, {"__meta'
+    count = ResponseTimeLogger().get_truncated_json_data_count(content)
+    assert count == 2
@@ -0,0 +1,33 @@
+import pytest
+
+from odfuzz.restrictions import RestrictionsGroup
+from odfuzz.exceptions import RestrictionsError
+
+
+def write_restrictions(tmp_path, content):
+    restrictions_file = tmp_path / 'restrictions.yaml'
+    restrictions_file.write_text(content)
+    return str(restrictions_file)
+
+
+def test_rate_limits_are_parsed(tmp_path):
+    restrictions_file = write_restrictions(tmp_path, 'RateLimit:\n    Products: 5\n    Orders: 0.5\n')
+
+    restrictions = RestrictionsGroup(restrictions_file)
+
+    assert restrictions.rate_limits() == {'Products': 5, 'Orders': 0.5}
+
+
+def test_rate_limits_are_empty_by_default(tmp_path):
+    restrictions_file = write_restrictions(tmp_path, 'Exclude:\n    $FORBID$:\n        - $filter\n')
+
+    assert RestrictionsGroup(restrictions_file).rate_limits() == {}
+    assert RestrictionsGroup(None).rate_limits() == {}
+
+
+@pytest.mark.parametrize('rate', ['0', '-1', 'fast', 'true'])
+def test_invalid_rate_limit(tmp_path, rate):
+    restrictions_file = write_restrictions(tmp_path, 'RateLimit:\n    Products: {}\n'.format(rate))
+
+    with pytest.raises(RestrictionsError):
+        RestrictionsGroup(restrictions_file)
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from odfuzz.scheduler import QueryGroupScheduler
+
+
+def select_many(scheduler, number):
+    return [scheduler.select() for _ in range(number)]
+
+
+def test_unexplored_query_groups_are_selected_evenly():
+    random.seed(1)
+    scheduler = QueryGroupScheduler({'A': 'a', 'B': 'b'})
+
+    selected = select_many(scheduler, 1000)
+
+    assert 400 < selected.count('a') < 600
+
+
+def test_query_groups_finding_new_responses_are_preferred():
+    random.seed(1)
+    scheduler = QueryGroupScheduler({'A': 'a', 'B': 'b'})
+    for _ in range(5):
+        scheduler.reward('A', 1, 10, 1.0)
+        scheduler.reward('B', 5, 10, 1.0)
+
+    assert select_many(scheduler, 100).count('b') > 90
+
+
+def test_fast_query_groups_are_preferred():
+    random.seed(1)
+    scheduler = QueryGroupScheduler({'A': 'a', 'B': 'b'})
+    for _ in range(5):
+        scheduler.reward('A', 5, 10, 10.0)
+        scheduler.reward('B', 5, 10, 1.0)
+
+    assert select_many(scheduler, 100).count('b') > 90
+
+
+def test_barren_query_group_loses_preference():
+    random.seed(1)
+    scheduler = QueryGroupScheduler({'A': 'a', 'B': 'b'})
+    for _ in range(5):
+        scheduler.reward('A', 10, 10, 1.0)
+        scheduler.reward('B', 2, 10, 1.0)
+    for _ in range(60):
+        scheduler.reward('A', 0, 10, 1.0)
+
+    assert select_many(scheduler, 100).count('b') > 90
+
+
+def test_rewards_are_not_discounted_between_selections():
+    scheduler = QueryGroupScheduler({'A': 'a', 'B': 'b'})
+    # queries of both query groups are rewarded one by one, as in the asynchronous mode
+    for index in range(40):
+        scheduler.reward('A', index % 2, 1, 0.1)
+        scheduler.reward('B', int(index % 4 == 0), 1, 0.1)
+
+    arms = scheduler.state()['arms']
+    posterior_means = {key: (successes + 1) / (successes + failures + 2)
+                       for key, (successes, failures, _) in arms.items()}
+    assert posterior_means == pytest.approx({'A': 21 / 42, 'B': 11 / 42})
+
+
+def test_selected_query_group_is_discounted_once():
+    scheduler = QueryGroupScheduler({'A': 'a'}, discount=0.5)
+    scheduler.reward('A', 4, 8, 2.0)
+
+    assert scheduler.select() == 'a'
+    scheduler.reward('A', 1, 1, 1.0)
+    scheduler.reward('A', 0, 1, 1.0)
+
+    assert scheduler.state()['arms']['A'] == [3.0, 3.0, 3.0]
+
+
+def test_state_is_restored():
+    scheduler = QueryGroupScheduler({'A': 'a', 'B': 'b'})
+    scheduler.reward('A', 3, 10, 2.0)
+    scheduler.reward('Unknown', 3, 10, 2.0)
+
+    restored_scheduler = QueryGroupScheduler({'A': 'a', 'B': 'b', 'C': 'c'})
+    restored_scheduler.restore_state(scheduler.state())
+
+    assert restored_scheduler.state() == {
+        'arms': {'A': [3.0, 7.0, 2.0], 'B': [0.0, 0.0, 0.0], 'C': [0.0, 0.0, 0.0]},
+        'total_seconds': 2.0,
+        'total_queries': 10
+    }
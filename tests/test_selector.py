@@ -0,0 +1,83 @@
+from collections import namedtuple
+
+from odfuzz.fuzzer import Selector
+from odfuzz.constants import ITERATIONS_THRESHOLD, SCORE_EPS
+
+EntitySet = namedtuple('EntitySet', 'name')
+Queryable = namedtuple('Queryable', 'entity_set')
+
+
+class FakeEntities:
+    def __init__(self, *entity_set_names):
+        self._queryables = [Queryable(EntitySet(name)) for name in entity_set_names]
+
+    def all(self):
+        return self._queryables
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.scores = {}
+
+    def total_entries(self, entity_set_name=None):
+        return 1
+
+    def total_score(self, entity_set_name=None):
+        return self.scores.get(entity_set_name, 0)
+
+    def sample_filter_entry(self, entity_set_name, exclude_id):
+        return None
+
+
+def select_many(selector, number):
+    return [selector.select() for _ in range(number)]
+
+
+def test_stagnation_is_detected_per_entity_set():
+    database = FakeDatabase()
+    selector = Selector(database, FakeEntities('Products'))
+    selector.init_score_averages()
+    select_many(selector, ITERATIONS_THRESHOLD + 1)
+
+    database.scores['Products'] = SCORE_EPS
+    assert selector._is_score_stagnating('Products') is False
+    assert selector._is_score_stagnating('Orders') is False
+
+    select_many(selector, ITERATIONS_THRESHOLD + 1)
+    assert selector._is_score_stagnating('Products') is True
+
+
+def test_restored_state_continues_stagnation_check():
+    database = FakeDatabase()
+    selector = Selector(database, FakeEntities('Products'))
+    selector.init_score_averages()
+    select_many(selector, ITERATIONS_THRESHOLD + 1)
+
+    restored_selector = Selector(database, FakeEntities('Products'))
+    restored_selector.restore_state(selector.state())
+
+    assert restored_selector._is_score_stagnating('Products') is True
+
+
+def test_rewarded_entity_sets_are_preferred():
+    entities = FakeEntities('Products', 'Orders')
+    selector = Selector(FakeDatabase(), entities)
+    products, orders = entities.all()
+    for _ in range(10):
+        selector.reward(products, 0, 10, 1.0)
+        selector.reward(orders, 5, 10, 1.0)
+
+    selected_names = [selection.queryable.entity_set.name for selection in select_many(selector, 200)]
+
+    assert selected_names.count('Orders') > 150
+
+
+def test_restored_state_continues_scheduling():
+    entities = FakeEntities('Products', 'Orders')
+    selector = Selector(FakeDatabase(), entities)
+    selector.reward(entities.all()[1], 10, 10, 1.0)
+
+    restored_selector = Selector(FakeDatabase(), FakeEntities('Products', 'Orders'))
+    restored_selector.restore_state(selector.state())
+
+    assert restored_selector.state()['scheduler'] == selector.state()['scheduler']
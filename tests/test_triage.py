@@ -0,0 +1,66 @@
+import csv
+
+from odfuzz.triage import FailureTriage, normalize_error_code, normalize_error_message
+
+
+def test_literals_and_guids_are_stripped():
+    assert normalize_error_message('Key \'ALFKI\' not found in 0050568D-393C-1ED4-B1A0-2C5E9A3CD4C0') == \
+        normalize_error_message('Key \'it\'\'s\' not found in 0050568D393C1ED4B1A02C5E9A3CD4C0') == \
+        'Key <literal> not found in <guid>'
+    assert normalize_error_message('Value  12.5 exceeds the limit 10') == 'Value <number> exceeds the limit <number>'
+    assert normalize_error_code('/IWBEP/CM_MGW_RT/022') == '/IWBEP/CM_MGW_RT/022'
+    assert normalize_error_code(None) == ''
+
+
+def test_failures_of_the_same_bug_are_clustered():
+    triage = FailureTriage()
+
+    assert triage.add('Customers', 'SY/530', 'Invalid value \'abc\'', 'Customers?$filter=City eq \'abc\'', '2019-01-01')
+    assert not triage.add('Customers', 'SY/530', 'Invalid value \'x\'', 'Customers?$filter=City eq \'x\'', '2019-01-02')
+    assert triage.add('Orders', 'SY/530', 'Invalid value \'x\'', 'Orders?$filter=ShipCity eq \'x\'', '2019-01-03')
+
+    assert triage.records() == [
+        {'entity_set': 'Customers', 'error_code': 'SY/530', 'error_message': 'Invalid value <literal>', 'count': 2,
+         'first_seen': '2019-01-01', 'url': 'Customers?$filter=City eq \'x\''},
+        {'entity_set': 'Orders', 'error_code': 'SY/530', 'error_message': 'Invalid value <literal>', 'count': 1,
+         'first_seen': '2019-01-03', 'url': 'Orders?$filter=ShipCity eq \'x\''}
+    ]
+
+
+def test_reported_clusters_are_merged():
+    triage = FailureTriage()
+    triage.add('Customers', 'E', 'M', 'Customers?$top=10', '2019-01-02')
+    reported_triage = FailureTriage()
+    reported_triage.add('Customers', 'E', 'M', 'Customers?$top=1', '2019-01-03')
+    reported_triage.add('Orders', 'E', 'M', 'Orders?$top=1', '2019-01-01')
+
+    triage.merge(reported_triage.records())
+
+    assert [(record['entity_set'], record['count'], record['first_seen'], record['url'])
+            for record in triage.records()] == [('Customers', 2, '2019-01-02', 'Customers?$top=1'),
+                                                ('Orders', 1, '2019-01-01', 'Orders?$top=1')]
+
+
+def test_cluster_is_shortened_by_minimized_url():
+    triage = FailureTriage()
+    triage.add('Customers', 'SY/530', 'Invalid value \'abc\'', 'Customers?$filter=City eq \'abc\'&$top=5')
+
+    triage.shorten('Customers', 'SY/530', 'Invalid value \'a\'', 'Customers?$filter=City eq \'a\'')
+    triage.shorten('Customers', 'SY/530', 'Invalid value \'a\'', 'Customers?$filter=City eq \'abcdef\'')
+    triage.shorten('Orders', 'SY/530', 'Invalid value \'a\'', 'Orders?$top=1')
+
+    assert [(record['count'], record['url']) for record in triage.records()] == [
+        (1, 'Customers?$filter=City eq \'a\'')]
+
+
+def test_clusters_are_written(tmp_path):
+    triage = FailureTriage()
+    triage.add('Customers', 'E', 'Invalid; value', 'Customers?$top=1', '2019-01-01')
+    file_path = tmp_path.joinpath('failures.csv')
+
+    triage.write(str(file_path))
+
+    with open(str(file_path), encoding='utf-8', newline='') as failures_file:
+        rows = list(csv.reader(failures_file, delimiter=';'))
+    assert rows == [['Count', 'FirstSeen', 'EntitySet', 'ErrorCode', 'ErrorMessage', 'ShortestURL'],
+                    ['1', '2019-01-01', 'Customers', 'E', 'Invalid; value', 'Customers?$top=1']]
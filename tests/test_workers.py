@@ -0,0 +1,66 @@
+import sys
+
+from odfuzz.entities import QueryableEntities
+from odfuzz.statistics import Stats
+from odfuzz.workers import WorkerPool
+
+
+def test_partitions_are_disjoint_and_complete():
+    entities = QueryableEntities()
+    for name in ['A', 'B', 'C', 'D', 'E']:
+        entities.add(name)
+
+    partitions = entities.partition(2)
+
+    assert [partition.all() for partition in partitions] == [['A', 'C', 'E'], ['B', 'D']]
+
+
+def test_partitions_are_not_empty():
+    entities = QueryableEntities()
+    entities.add('A')
+
+    assert len(entities.partition(4)) == 1
+
+
+def test_stats_of_workers_are_aggregated():
+    def target(index, partition):
+        Stats.tests_num += len(partition)
+        Stats.fails_num += index + 1
+
+    tests_num, fails_num = Stats.tests_num, Stats.fails_num
+    WorkerPool().run([['A', 'B'], ['C']], target)
+
+    assert Stats.tests_num - tests_num == 3
+    assert Stats.fails_num - fails_num == 3
+
+
+def test_stats_of_exited_workers_are_aggregated():
+    def target(index, partition):
+        Stats.dropped_num += 1
+        sys.exit(0)
+
+    dropped_num = Stats.dropped_num
+    WorkerPool().run([['A'], ['B']], target)
+
+    assert Stats.dropped_num - dropped_num == 2
+
+
+def test_failures_of_workers_are_merged():
+    def target(index, partition):
+        Stats.failures.add('A', 'E', 'Invalid value {}'.format(index), 'A?$top={}'.format(index))
+
+    Stats.failures.clear()
+    WorkerPool().run([['A'], ['B']], target)
+
+    assert [(record['error_message'], record['count']) for record in Stats.failures.records()] == \
+        [('Invalid value <number>', 2)]
+
+
+def test_mutation_operators_of_workers_are_merged():
+    def target(index, partition):
+        Stats.mutation_operators.reward(['option.$top'], index == 0)
+
+    Stats.mutation_operators.clear()
+    WorkerPool().run([['A'], ['B']], target)
+
+    assert Stats.mutation_operators.records() == [{'operator': 'option.$top', 'uses': 2, 'successes': 1}]